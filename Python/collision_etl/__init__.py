@@ -0,0 +1,37 @@
+"""
+Vehicle Collision ETL helpers
+Shared modules used by the cleaning (Script 1) and combining (Script 2) scripts
+The main entry points can be imported from the package itself; each one
+imports its module (and pandas) on first access, so importing the package
+costs nothing and has no side effects.
+"""
+
+import importlib
+
+# Public name -> module defining it, imported when the name is first used
+_EXPORTS = {
+    'load_config': 'collision_etl.config',
+    'check_headers': 'collision_etl.headers',
+    'require_headers': 'collision_etl.headers',
+    'transform_city': 'collision_etl.cleaning',
+    'clean_city': 'collision_etl.cleaning',
+    'clean_cities': 'collision_etl.cleaning',
+    'run_clean': 'collision_etl.cleaning',
+    'create_master_dataset': 'collision_etl.combining',
+    'filter_recent_years': 'collision_etl.combining',
+    'add_calculated_fields': 'collision_etl.combining',
+    'run_combine': 'collision_etl.combining',
+    'run_pipeline': 'collision_etl.pipeline',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,189 @@
+"""
+Pipeline benchmark on synthetic data
+Generates raw city files at several sizes, times each stage of Script 1 and
+Script 2 on them, stores the throughput as a baseline and fails a run whose
+throughput drops more than a threshold below that baseline
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from collision_etl.config import CITY_SCHEMAS
+from collision_etl.instrumentation import measure
+from collision_etl.intermediate import handoff_path
+from collision_etl.pipeline import SCRIPTS_DIR, load_script
+from collision_etl.synthetic import split_rows, write_raw
+
+DEFAULT_BASELINE = os.path.join(SCRIPTS_DIR, 'benchmark_baseline.json')
+DEFAULT_SIZES = (100_000, 1_000_000)
+
+# A stage fails when its rows/s falls more than this share below the baseline
+DEFAULT_THRESHOLD = 0.25
+
+
+def _record(record, rows):
+    return {
+        'stage': record['stage'],
+        'rows': rows,
+        'wall_s': record['wall_s'],
+        'rows_per_s': round(rows / max(record['wall_s'], 1e-9), 1),
+        'rss_growth_mb': record['rss_growth_mb'],
+    }
+
+
+def benchmark_size(total_rows, directory, clean, combine, chunksize=None, seed=0, verbose=False):
+    """Generate total_rows raw records and time every pipeline stage on them
+    
+    Rows are split across the cities like the real files. Returns a list of
+    stage records with wall seconds and rows/s; a stage's rows are the rows
+    it read (the raw rows for the cleaners, the loaded rows for Script 2).
+    """
+    results = []
+    cleaned = {}
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    
+    with output:
+        for city, rows in split_rows(total_rows).items():
+            raw = os.path.join(directory, f"{city}_Raw.csv")
+            start = time.perf_counter()
+            write_raw(city, raw, rows, CITY_SCHEMAS[city]['columns'], seed)
+            print(f"   - Generated {rows:,} {city} rows in {time.perf_counter() - start:.1f}s")
+            cleaned[city] = os.path.join(directory, f"{city}_Cleaned.csv")
+        
+        run_date = datetime.now()
+        for city in cleaned:
+            result, record = measure(f"clean_{city.lower()}", clean.clean_city, city,
+                                     os.path.join(directory, f"{city}_Raw.csv"), cleaned[city], chunksize,
+                                     run_date=run_date)
+            results.append(_record(record, clean.record_count(result)))
+        
+        inputs = [handoff_path(cleaned[city], 'parquet') for city in ('Austin', 'Chicago', 'NYC')]
+        frames, record = measure('load_and_standardize', combine.load_and_standardize, *inputs,
+                                 start_year=2022, end_year=2024)
+        results.append(_record(record, sum(df.attrs['rows_loaded'] for df in frames)))
+        
+        master, record = measure('create_master_dataset', combine.create_master_dataset, *frames)
+        results.append(_record(record, len(master)))
+        del frames
+        
+        built, record = measure('build_master_frame', combine.build_master_frame, *inputs,
+                                start_year=2022, end_year=2024)
+        results.append(_record(record, built.attrs['rows_loaded']))
+        del built
+        
+        for name, args in [('filter_recent_years', ()), ('add_calculated_fields', ()),
+                           ('save_master_file', (os.path.join(directory, 'Vehicle_Collisions_Master.csv'),))]:
+            rows = len(master)
+            master, record = measure(name, getattr(combine, name), master, *args)
+            results.append(_record(record, rows))
+    
+    return results
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, chunksize=None, seed=0, verbose=False, master_build=False):
+    """Benchmark every size in a fresh temporary directory
+    
+    Returns {size: [stage records]} with sizes as strings, as stored in the
+    baseline JSON. With master_build, the preallocated master build is also
+    compared with load + concat for time and peak memory at each size.
+    """
+    clean, combine = load_script('clean'), load_script('combine')
+    runs = {}
+    for size in sizes:
+        print(f"\nBenchmarking {size:,} raw records...")
+        with tempfile.TemporaryDirectory() as directory:
+            runs[str(size)] = benchmark_size(size, directory, clean, combine, chunksize, seed, verbose)
+            if master_build:
+                inputs = [handoff_path(os.path.join(directory, f"{city}_Cleaned.csv"), 'parquet')
+                          for city in ('Austin', 'Chicago', 'NYC')]
+                builds = combine.benchmark_master_build(*inputs)
+        for record in runs[str(size)]:
+            print(f"  {record['stage']:<24} {record['rows']:>11,} rows {record['wall_s']:>8.2f}s"
+                  f"  {record['rows_per_s']:>12,.0f} rows/s")
+        if master_build:
+            print("\n  Master build (time, tracemalloc peak and frame size):")
+            for line in builds.to_string(index=False).splitlines():
+                print(f"  {line}")
+    return runs
+
+
+def load_baseline(path):
+    """Stored baseline runs, or None when there is no baseline file yet"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(runs, path):
+    """Write runs as the baseline, keeping stored sizes that were not rerun"""
+    baseline = load_baseline(path) or {'sizes': {}}
+    baseline['sizes'].update(runs)
+    baseline['updated'] = datetime.now().isoformat(timespec='seconds')
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+    return path
+
+
+def compare(runs, baseline, threshold=DEFAULT_THRESHOLD):
+    """Stages slower than the baseline by more than threshold (a share)
+    
+    Returns a DataFrame with one row per regressed stage; sizes or stages
+    missing from the baseline are not compared.
+    """
+    regressions = []
+    for size, records in runs.items():
+        stored = {r['stage']: r for r in baseline.get('sizes', {}).get(size, [])}
+        for record in records:
+            base = stored.get(record['stage'])
+            if base is None or not base['rows_per_s']:
+                continue
+            change = record['rows_per_s'] / base['rows_per_s'] - 1
+            if change < -threshold:
+                regressions.append({'size': int(size), 'stage': record['stage'],
+                                    'baseline_rows_per_s': base['rows_per_s'],
+                                    'rows_per_s': record['rows_per_s'], 'change_pct': round(change * 100, 1)})
+    return pd.DataFrame(regressions, columns=['size', 'stage', 'baseline_rows_per_s', 'rows_per_s', 'change_pct'])
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark both pipeline scripts on synthetic raw data")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="total raw records per run, split across the cities (default: 100,000 1,000,000)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="stream the raw files through the cleaners in chunks of this many rows")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="baseline results JSON (default: benchmark_baseline.json next to the scripts)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed throughput drop vs the baseline as a share (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store this run as the new baseline instead of comparing against it")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the synthetic data")
+    parser.add_argument('--verbose', action='store_true', help="show the scripts' own progress output")
+    parser.add_argument('--master-build', action='store_true',
+                        help="also compare the preallocated master build with load + concat for peak memory")
+    args = parser.parse_args()
+    
+    runs = run_benchmark(args.sizes, args.chunksize, args.seed, args.verbose, args.master_build)
+    baseline = load_baseline(args.baseline)
+    
+    if args.update_baseline or baseline is None:
+        print(f"\n✓ Baseline saved to: {save_baseline(runs, args.baseline)}")
+        sys.exit(0)
+    
+    regressions = compare(runs, baseline, args.threshold)
+    if len(regressions):
+        print(f"\n❌ Throughput regressed more than {args.threshold:.0%} vs {args.baseline}:")
+        print(regressions.to_string(index=False))
+        sys.exit(1)
+    print(f"\n✓ No stage regressed more than {args.threshold:.0%} vs {args.baseline}")
@@ -0,0 +1,109 @@
+"""
+BridgeContributingFactor builder
+Melts every contributing-factor slot of a cleaned city frame into one
+(city, accident_id, slot, factor_code) row per recorded factor, with the
+slots stacked as arrays instead of looping over accidents
+"""
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.factors import factor_mask, map_factor_codes
+from collision_etl.incremental import CITY_KEYS
+from collision_etl.intermediate import CleanedWriter
+
+# Cleaned factor columns per city, in slot order (slot 1 = primary)
+FACTOR_SLOTS = {
+    'Austin': ['contrib_factr_p1_id', 'contrib_factr_p2_id'],
+    'Chicago': ['prim_contributory_cause', 'sec_contributory_cause'],
+    'NYC': ['contrib_factor_1', 'contrib_factor_2', 'contrib_factor_3'],
+}
+
+# Slot values that mean no factor was recorded (normalized keys)
+EMPTY_SLOTS = {'', 'UNSPECIFIED', 'UNKNOWN', 'NA', 'NAN'}
+
+
+def build_bridge(df, city):
+    """Long bridge rows for one cleaned city frame
+    
+    Empty slots ('Unspecified', 'UNKNOWN', missing) are dropped, and so are
+    values with no code in the city's factor file; their counts come back as
+    the second item of the result, as (bridge, unmapped).
+    """
+    slots = [col for col in FACTOR_SLOTS[city] if col in df.columns]
+    codes = np.full((len(df), len(slots)), -1, dtype=np.int16)
+    unmapped = pd.Series(dtype=np.int64, name=city)
+    
+    for i, col in enumerate(slots):
+        slot_codes, missed = map_factor_codes(df[col], city)
+        keep = slot_codes.notna().to_numpy() & ~factor_mask(df[col], EMPTY_SLOTS)
+        codes[keep, i] = slot_codes.to_numpy()[keep]
+        unmapped = missed.add(unmapped, fill_value=0) if len(unmapped) else missed
+    
+    # Row-major nonzero keeps each accident's slots together and in order
+    rows, slot_index = np.nonzero(codes >= 0)
+    ids = df[CITY_KEYS[city]['id']].to_numpy()
+    bridge = pd.DataFrame({
+        'city': pd.Categorical.from_codes(np.zeros(len(rows), dtype=np.int8), categories=[city]),
+        'accident_id': pd.Series(ids[rows]).astype(str).to_numpy(),
+        'slot': (slot_index + 1).astype(np.int8),
+        'factor_code': codes[rows, slot_index],
+    })
+    
+    return bridge, unmapped.astype(np.int64).sort_values(ascending=False)
+
+
+def write_bridge(frames, output_file, formats=('csv',)):
+    """Write bridge frames to one file per format and return the row count
+    
+    The CSV has a header row and plain integer codes, ready for BULK INSERT
+    or bcp; Parquet suits warehouse engines that ingest it directly.
+    """
+    with CleanedWriter(output_file, formats) as writer:
+        for bridge in frames:
+            writer.write(bridge)
+    return writer.rows
+
+
+def benchmark_bridge(rows=2_000_000, directory=None, seed=0):
+    """Build and write a bridge from rows synthetic NYC collisions
+    
+    Slot fill rates follow the README (most secondary and tertiary NYC
+    factors are empty). Returns a DataFrame with seconds and rows per second
+    for the build and the CSV write.
+    """
+    import os
+    import tempfile
+    import time
+    
+    from collision_etl.factors import load_factor_lookup
+    
+    keys, _ = load_factor_lookup()
+    names = np.array([key for key in keys['NYC'].index if key not in EMPTY_SLOTS], dtype=object)
+    
+    rng = np.random.default_rng(seed)
+    nyc = pd.DataFrame({'collision_id': np.arange(rows, dtype=np.int64) + 4_000_000})
+    for col, empty_rate in zip(FACTOR_SLOTS['NYC'], [0.3, 0.8, 0.95]):
+        values = names[rng.integers(0, len(names), rows)]
+        values[rng.random(rows) < empty_rate] = 'Unspecified'
+        nyc[col] = pd.Categorical(values)
+    
+    start = time.perf_counter()
+    bridge, _ = build_bridge(nyc, 'NYC')
+    build_s = time.perf_counter() - start
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_bridge([bridge], os.path.join(directory or tmp, 'NYC_Bridge.csv'))
+        write_s = time.perf_counter() - start
+    
+    return pd.DataFrame([
+        {'step': 'build', 'accidents': rows, 'bridge_rows': len(bridge), 'seconds': round(build_s, 3),
+         'rows_per_s': int(rows / build_s)},
+        {'step': 'write csv', 'accidents': rows, 'bridge_rows': len(bridge), 'seconds': round(write_s, 3),
+         'rows_per_s': int(len(bridge) / write_s)},
+    ])
+
+
+if __name__ == "__main__":
+    print(benchmark_bridge().to_string(index=False))
@@ -0,0 +1,210 @@
+"""
+Stage output cache
+Each cached stage is keyed on its input files (mtime + size, or a content
+hash), the source of the code it runs and its parameters. Frame outputs are
+pickled and file outputs copied into one entry directory per key, so a rerun
+with unchanged inputs, code and config loads the stage output instead of
+recomputing it. Least recently used entries are evicted past a size budget.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from collision_etl.config import DEFAULT_CACHE_MB, KEY_MODES
+
+META_FILE = 'meta.json'
+
+
+def _files(path):
+    """Files of a path: itself, or every file under a directory in a stable order"""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+
+
+def file_fingerprint(path, mode='mtime'):
+    """Fingerprint of a file or directory: mtime + size, or a content hash"""
+    digest = hashlib.sha256()
+    for name in _files(path):
+        digest.update(os.path.relpath(name, path).encode())
+        if mode == 'content':
+            with open(name, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        else:
+            stat = os.stat(name)
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def code_fingerprint(*objects):
+    """Hash of the source of functions, classes or modules"""
+    digest = hashlib.sha256()
+    for obj in objects:
+        obj = inspect.unwrap(obj)
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = obj.__code__.co_code.hex()
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def _size_bytes(path):
+    return sum(os.path.getsize(name) for name in _files(path) if os.path.exists(name))
+
+
+def cached_frames(cache, stage, compute, inputs=(), code=(), params=None):
+    """compute()'s frame(s) through cache, or just compute() when cache is None"""
+    if cache is None:
+        return compute()
+    return cache.frames(stage, cache.key(stage, inputs, code, params), compute)
+
+
+class StageCache:
+    """Stage outputs cached on disk under directory
+    
+    key() builds a stage key; frames() and files() return the cached output
+    for a key or compute and store it. Every lookup is recorded in events as
+    (stage, 'hit' or 'miss', seconds). Entries are evicted least recently
+    used first once the cache passes max_mb.
+    """
+    
+    def __init__(self, directory, max_mb=DEFAULT_CACHE_MB, mode='mtime'):
+        if mode not in KEY_MODES:
+            raise ValueError(f"Unknown cache key mode {mode!r}; expected one of {KEY_MODES}")
+        self.directory = directory
+        self.max_mb = max_mb
+        self.mode = mode
+        self.events = []
+        os.makedirs(directory, exist_ok=True)
+    
+    @classmethod
+    def from_config(cls, config, directory):
+        """The cache of a pipeline config, or None when caching is off"""
+        if not config.get('cache'):
+            return None
+        return cls(directory, config['cache_mb'], config['cache_key'])
+    
+    def key(self, stage, inputs=(), code=(), params=None):
+        """Key of a stage run from its input paths, code objects and parameters"""
+        digest = hashlib.sha256(stage.encode())
+        for path in inputs:
+            digest.update(path.encode())
+            digest.update(file_fingerprint(path, self.mode).encode() if os.path.exists(path) else b'missing')
+        digest.update(code_fingerprint(*code).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return f"{stage}-{digest.hexdigest()[:24]}"
+    
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+    
+    def _meta(self, key):
+        path = os.path.join(self._entry(key), META_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def _write_meta(self, key, meta):
+        meta['last_used'] = time.time()
+        tmp = os.path.join(self._entry(key), META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(self._entry(key), META_FILE))
+    
+    def _record(self, stage, hit, start):
+        self.events.append((stage, 'hit' if hit else 'miss', round(time.perf_counter() - start, 3)))
+        print(f"  Cache {'hit' if hit else 'miss'}: {stage}")
+    
+    def frames(self, stage, key, compute):
+        """compute()'s DataFrame (or tuple of DataFrames), from the cache when stored"""
+        start = time.perf_counter()
+        meta = self._meta(key)
+        if meta is not None:
+            frames = [pd.read_pickle(os.path.join(self._entry(key), name)) for name in meta['frames']]
+            self._write_meta(key, meta)
+            self._record(stage, True, start)
+            return tuple(frames) if meta['tuple'] else frames[0]
+        
+        result = compute()
+        entry = self._entry(key)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.makedirs(entry)
+        frames = result if isinstance(result, tuple) else (result,)
+        names = [f"frame{i}.pkl" for i in range(len(frames))]
+        for frame, name in zip(frames, names):
+            frame.to_pickle(os.path.join(entry, name), protocol=5)
+        self._write_meta(key, {'stage': stage, 'frames': names, 'tuple': isinstance(result, tuple),
+                               'bytes': _size_bytes(entry)})
+        self._record(stage, False, start)
+        self.evict()
+        return result
+    
+    def files(self, stage, key, outputs, compute):
+        """Run compute() to write the output paths, or restore them from the cache
+        
+        Outputs still matching what the cache stored are left untouched, so a
+        hit on an unchanged tree copies nothing. compute()'s return value
+        must be JSON serializable; it is stored and returned on a hit.
+        """
+        start = time.perf_counter()
+        meta = self._meta(key)
+        if meta is not None:
+            entry = self._entry(key)
+            for i, path in enumerate(outputs):
+                if os.path.exists(path) and file_fingerprint(path) == meta['outputs'][i]:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                cached = os.path.join(entry, f"output{i}")
+                (shutil.copytree if os.path.isdir(cached) else shutil.copyfile)(cached, path)
+                meta['outputs'][i] = file_fingerprint(path)
+            self._write_meta(key, meta)
+            self._record(stage, True, start)
+            return meta['result']
+        
+        result = compute()
+        entry = self._entry(key)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.makedirs(entry)
+        for i, path in enumerate(outputs):
+            cached = os.path.join(entry, f"output{i}")
+            (shutil.copytree if os.path.isdir(path) else shutil.copyfile)(path, cached)
+        self._write_meta(key, {'stage': stage, 'outputs': [file_fingerprint(path) for path in outputs],
+                               'result': result, 'bytes': _size_bytes(entry)})
+        self._record(stage, False, start)
+        self.evict()
+        return result
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_mb"""
+        entries = []
+        for key in os.listdir(self.directory):
+            meta = self._meta(key)
+            if meta is not None:
+                entries.append((meta['last_used'], meta['bytes'], key))
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_mb * 1e6:
+                break
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+    
+    def summary(self):
+        """Hits and misses per stage as a DataFrame"""
+        return pd.DataFrame(self.events, columns=['stage', 'result', 'seconds'])
+    
+    def print_summary(self):
+        if not self.events:
+            return
+        hits = sum(result == 'hit' for _, result, _ in self.events)
+        print(f"\nStage cache ({self.directory}): {hits} hit(s), {len(self.events) - hits} miss(es)")
+        for stage, result, seconds in self.events:
+            print(f"  {stage:<28} {result:<5} {seconds:>8.2f}s")
@@ -0,0 +1,365 @@
+"""
+Cleaning library (Script 1)
+Cleans raw data from Austin, Chicago, and NYC into 3 separate cleaned files
+(typed Parquet handoff for Script 2, with CSV as an optional export).
+Importing it has no side effects; "Cleaned Data.py" is its command line.
+"""
+
+import contextlib
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from collision_etl.cache import StageCache
+from collision_etl.config import CITY_SCHEMAS, city_paths, output_path
+from collision_etl.datetimes import format_time_of_day, parse_dates
+from collision_etl.derived_fields import flag_from_yn
+from collision_etl.headers import require_headers
+from collision_etl.incremental import CITY_KEYS, DeltaTracker, delta_path, load_state, merge_rows, save_state
+from collision_etl.instrumentation import measure
+from collision_etl.intermediate import (CleanedWriter, _arrow_schema, handoff_path, merge_parts, remove_handoff,
+                                       to_handoff_dtypes)
+from collision_etl.partitions import PartitionedWriter
+
+
+def clean_file(input_file, output_file, columns_to_keep, transform, chunksize=None, dtype=None,
+               shard=None, run_date=None, formats=('parquet',), row_filter=None):
+    """Read only the needed raw columns, apply a city transform and save
+    
+    With chunksize=None the whole file is cleaned in memory and the cleaned
+    DataFrame is returned. With a chunksize the raw file is streamed in chunks
+    of that many rows, each chunk is transformed and appended to the output,
+    and the number of records written is returned instead.
+    
+    shard is an optional (byte_offset, nrows) row range from plan_shards, so
+    one large file can be cleaned by several workers. formats lists the
+    output formats ('parquet', 'csv', 'partitioned'); output_file's
+    extension is swapped for each one. row_filter is an optional callable applied to each raw
+    chunk before the transform (e.g. a DeltaTracker keeping changed rows).
+    """
+    run_date = run_date or datetime.now()
+    options = dict(usecols=columns_to_keep, dtype=dtype, chunksize=chunksize, low_memory=False)
+    
+    with contextlib.ExitStack() as stack:
+        source = input_file
+        if shard is not None:
+            offset, nrows = shard
+            header = list(pd.read_csv(input_file, nrows=0).columns)
+            options.update(header=None, names=header, nrows=nrows)
+            source = stack.enter_context(open(input_file, 'rb'))
+            source.seek(offset)
+        reader = pd.read_csv(source, **options)
+        
+        if chunksize is None:
+            df = reader[columns_to_keep]
+            if row_filter is not None:
+                df = row_filter(df)
+            print(f"   - Loaded {len(df):,} records")
+            df = transform(df, run_date)
+            with CleanedWriter(output_file, formats) as writer:
+                writer.write(df)
+            print(f"   ✓ Saved {len(df):,} cleaned records")
+            return df
+        
+        total = 0
+        chunks = 0
+        with reader, CleanedWriter(output_file, formats) as writer:
+            for chunk in reader:
+                chunk = chunk[columns_to_keep]
+                if row_filter is not None:
+                    chunk = row_filter(chunk)
+                    if chunk.empty:
+                        continue
+                chunk = transform(chunk, run_date)
+                writer.write(chunk)
+                total += len(chunk)
+                chunks += 1
+    
+    print(f"   - Streamed {total:,} records in {chunks:,} chunks of {chunksize:,}")
+    print(f"   ✓ Saved {total:,} cleaned records")
+    return total
+
+
+def plan_shards(input_file, shards, block_size=1 << 20):
+    """Split a raw CSV into row ranges of roughly equal byte size
+    
+    Returns a list of (byte_offset, nrows) tuples, one per shard, for
+    clean_file. Boundaries are aligned on line breaks, so this assumes no
+    quoted field in the file spans several lines.
+    """
+    size = os.path.getsize(input_file)
+    with open(input_file, 'rb') as fh:
+        fh.readline()  # header
+        starts = [fh.tell()]
+        for i in range(1, shards):
+            fh.seek(max(size * i // shards, starts[-1]))
+            fh.readline()
+            starts.append(fh.tell())
+        starts.append(size)
+        
+        ranges = []
+        for start, stop in zip(starts[:-1], starts[1:]):
+            fh.seek(start)
+            remaining = stop - start
+            nrows = 0
+            while remaining > 0:
+                block = fh.read(min(block_size, remaining))
+                remaining -= len(block)
+                nrows += block.count(b'\n')
+            if stop == size and stop > start and not block.endswith(b'\n'):
+                nrows += 1  # last line without a trailing newline
+            if nrows:
+                ranges.append((start, nrows))
+    return ranges
+
+
+def record_count(result):
+    """Number of records from a cleaner result (DataFrame or streamed count)"""
+    return result if isinstance(result, int) else len(result)
+
+
+def transform_city(df, run_date, schema):
+    """Apply a city schema's transforms to the whole file or to one chunk"""
+    df.rename(columns=schema['rename'], inplace=True)
+    
+    df['crash_date'] = parse_dates(df['crash_date'], schema['date_format'])
+    if schema['time_from_date']:
+        df['crash_time'] = format_time_of_day(df['crash_date'])
+    df['year'] = df['crash_date'].dt.year
+    df['month'] = df['crash_date'].dt.month
+    df['day'] = df['crash_date'].dt.day
+    df['month_name'] = df['crash_date'].dt.month_name()
+    df['crash_date'] = df['crash_date'].dt.normalize()
+    
+    for col, value in schema['fill'].items():
+        df[col] = df[col].fillna(value)
+    
+    for col in schema['flags']:
+        df[col] = flag_from_yn(df[col])
+    
+    for col in schema['counts']:
+        df[col] = df[col].fillna(0).astype(int)
+    
+    df['city'] = schema['city']
+    df['di_process_id'] = schema['process_id'] + '_' + run_date.strftime('%Y%m%d')
+    df['di_current_date'] = run_date
+    
+    return df
+
+
+def clean_city(city, input_file, output_file, chunksize=None, shard=None, run_date=None,
+               formats=('parquet',), row_filter=None, schema=None):
+    """Clean one city's vehicle collision data
+    
+    The cleaner is built from the city's schema (collision_etl.config), so a
+    new city only needs a schema entry, not another clean_<city> function.
+    """
+    schema = schema or CITY_SCHEMAS[city]
+    order = list(CITY_SCHEMAS)
+    step = f"[{order.index(city) + 1}/{len(order)}] " if city in order else ""
+    print(f"\n{step}Cleaning {city} data...")
+    
+    transform = functools.partial(transform_city, schema=schema)
+    return clean_file(input_file, output_file, schema['columns'], transform, chunksize,
+                      schema['dtype'] or None, shard, run_date, formats, row_filter)
+
+
+# Code a cleaned file depends on, hashed into its stage cache key
+CLEAN_CODE = (clean_file, transform_city, clean_city, parse_dates, format_time_of_day, flag_from_yn,
+              CleanedWriter, to_handoff_dtypes, _arrow_schema, PartitionedWriter, handoff_path)
+
+
+def cached_clean(cache, stage, city, input_file, output_file, shard=None, formats=('parquet',), schema=None,
+                 **options):
+    """clean_city through a StageCache: an unchanged raw file, schema and
+    cleaning code restore the cleaned outputs instead of recleaning.
+    Returns the number of records."""
+    schema = schema or CITY_SCHEMAS[city]
+    key = cache.key(stage, [input_file], CLEAN_CODE,
+                    {'schema': schema, 'shard': shard, 'formats': list(formats)})
+    outputs = [handoff_path(output_file, fmt) for fmt in formats]
+    return cache.files(stage, key, outputs, lambda: record_count(
+        clean_city(city, input_file, output_file, shard=shard, formats=formats, schema=schema, **options)))
+
+
+def run_clean_task(city, input_file, output_file, chunksize=None, shard=None, run_date=None,
+                   formats=('parquet',), stage=None, trace_memory=False, profile_dir=None, schema=None,
+                   cache=None):
+    """Clean one city, or one shard of it, and return (records, seconds, stage record)
+    
+    The stage record (collision_etl.instrumentation.measure) is taken in the
+    process that did the cleaning, so it also covers pool workers. With a
+    StageCache the record also notes whether the cache was hit.
+    """
+    start = time.perf_counter()
+    stage = stage or f"clean_{city.lower()}"
+    if cache:
+        result, record = measure(stage, cached_clean, cache, stage, city, input_file, output_file, shard,
+                                 formats, schema, chunksize=chunksize, run_date=run_date,
+                                 trace_memory=trace_memory, profile_dir=profile_dir)
+        record['cache'] = cache.events[-1][1]
+    else:
+        result, record = measure(stage, clean_city, city, input_file, output_file, chunksize, shard, run_date,
+                                 formats, schema=schema, trace_memory=trace_memory, profile_dir=profile_dir)
+    record['rows_out'] = record_count(result)
+    return record_count(result), time.perf_counter() - start, record
+
+
+def clean_cities(jobs, workers=1, shards=None, chunksize=None, formats=('parquet',), report=None,
+                 schemas=None, cache=None):
+    """Clean several cities, concurrently when workers > 1
+    
+    jobs maps a city name to (input_file, output_file), where output_file's
+    extension is swapped for each format in formats. schemas optionally maps
+    a city to its schema (default: CITY_SCHEMAS). shards
+    optionally maps a city name to a number of row-range shards; the shards
+    are cleaned in parallel and merged back in order into the city's output.
+    Returns {city: (records, seconds)}, where seconds is the wall time until
+    that city's output was complete. With a RunReport, each clean_<city>
+    call (or shard) is added to it as a stage. With a StageCache, cities
+    whose raw file, schema and cleaning code are unchanged are restored
+    from it.
+    """
+    shards = shards or {}
+    schemas = schemas or {}
+    options = {'trace_memory': report.trace_memory, 'profile_dir': report.profile_dir} if report else {}
+    options['cache'] = cache
+    run_date = datetime.now()
+    start = time.perf_counter()
+    results = {}
+    
+    if workers <= 1 and all(n <= 1 for n in shards.values()):
+        for city, (input_file, output_file) in jobs.items():
+            records, seconds, record = run_clean_task(city, input_file, output_file, chunksize,
+                                                      run_date=run_date, formats=formats,
+                                                      schema=schemas.get(city), **options)
+            results[city] = (records, seconds)
+            if report:
+                report.add(record)
+        return results
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        parts = {}
+        for city, (input_file, output_file) in jobs.items():
+            ranges = plan_shards(input_file, shards[city]) if shards.get(city, 1) > 1 else []
+            if len(ranges) > 1:
+                root, ext = os.path.splitext(output_file)
+                parts[city] = [f"{root}.part{i}{ext}" for i in range(len(ranges))]
+                for i, (part, shard) in enumerate(zip(parts[city], ranges)):
+                    future = pool.submit(run_clean_task, city, input_file, part, chunksize, shard,
+                                         run_date, formats, f"clean_{city.lower()}_part{i}",
+                                         schema=schemas.get(city), **options)
+                    futures[future] = city
+            else:
+                future = pool.submit(run_clean_task, city, input_file, output_file, chunksize, None,
+                                     run_date, formats, schema=schemas.get(city), **options)
+                futures[future] = city
+        
+        pending = {city: list(futures.values()).count(city) for city in jobs}
+        counts = dict.fromkeys(jobs, 0)
+        for future in as_completed(futures):
+            city = futures[future]
+            records, _, record = future.result()
+            if cache:
+                # Workers hold their own copy of the cache
+                cache.events.append((record['stage'], record['cache'], record['wall_s']))
+            counts[city] += records
+            if report:
+                report.add(record)
+            pending[city] -= 1
+            if pending[city] == 0:
+                if city in parts:
+                    merge_parts(parts[city], jobs[city][1], formats)
+                results[city] = (counts[city], time.perf_counter() - start)
+    
+    return {city: results[city] for city in jobs}
+
+
+def refresh_city(city, input_file, output_file, state, state_file, chunksize=None,
+                 formats=('parquet',), full_refresh=False, schema=None):
+    """Clean only new or changed raw rows of one city and merge them in
+    
+    The rows are cleaned into a run delta, merged into the cleaned output
+    (replacing rows by id) and accumulated in a pending delta
+    (<output>.delta.<ext>) that Script 2 merges into the master file. With
+    full_refresh, or when there is no cleaned output yet, the whole file is
+    cleaned and the stored row fingerprints are rebuilt.
+    Returns (records cleaned, seconds).
+    """
+    start = time.perf_counter()
+    full_refresh = full_refresh or not os.path.exists(handoff_path(output_file, formats[0]))
+    tracker = DeltaTracker(city, state_file, full_refresh)
+    id_column = CITY_KEYS[city]['id']
+    pending = delta_path(output_file, 'delta')
+    
+    if full_refresh:
+        clean_city(city, input_file, output_file, chunksize, formats=formats, row_filter=tracker, schema=schema)
+        for fmt in formats:
+            remove_handoff(handoff_path(pending, fmt))
+        state['cities'].setdefault(city, {})['pending_delta'] = False
+        state['master']['full_rebuild'] = True
+    else:
+        run_delta = delta_path(output_file, 'new')
+        clean_city(city, input_file, run_delta, chunksize, formats=formats, row_filter=tracker, schema=schema)
+        if tracker.selected:
+            merge_rows(output_file, run_delta, id_column, formats, keep_rows=True)
+            merge_rows(pending, run_delta, id_column, formats)
+            state['cities'].setdefault(city, {})['pending_delta'] = True
+        else:
+            for fmt in formats:
+                remove_handoff(handoff_path(run_delta, fmt))
+    
+    print(f"   - {tracker.new_rows:,} new and {tracker.changed_rows:,} changed of {tracker.rows:,} raw records")
+    tracker.commit(state)
+    save_state(state, state_file)
+    return tracker.selected, time.perf_counter() - start
+
+
+def run_clean(config, report=None):
+    """Clean every city of a pipeline config (collision_etl.config.load_config)
+    
+    Runs a full clean, or a delta refresh with config['incremental'], prints
+    the summary and returns {city: (records, seconds)}. With config['cache']
+    full cleans go through the stage cache. Raises ValueError before any city
+    is loaded when a raw header lacks a schema column.
+    """
+    jobs = city_paths(config)
+    schemas = {city: config['schemas'][city] for city in jobs}
+    formats = tuple(config['formats'])
+    cache = StageCache.from_config(config, output_path(config, 'cache'))
+    require_headers(config)
+    
+    start = time.perf_counter()
+    if config['incremental']:
+        state_file = output_path(config, 'state')
+        state = load_state(state_file)
+        results = {}
+        for i, (city, (input_file, output_file)) in enumerate(jobs.items(), 1):
+            print(f"\n[{i}/{len(jobs)}] Refreshing {city} data...")
+            refresh = report.wrap(refresh_city, f"refresh_{city.lower()}") if report else refresh_city
+            results[city] = refresh(city, input_file, output_file, state, state_file,
+                                    config['chunksize'], formats, config['full_refresh'], schemas[city])
+            if report:
+                report.stages[-1]['rows_out'] = results[city][0]
+    else:
+        results = clean_cities(jobs, config['workers'], config['shards'], config['chunksize'], formats,
+                               report, schemas, cache)
+    elapsed = time.perf_counter() - start
+    
+    print("\n" + "="*60)
+    print("CLEANING COMPLETE!")
+    print("="*60)
+    print(f"\nSummary:")
+    for city, (records, seconds) in results.items():
+        print(f"  {city + ':':<8} {records:,} records ({seconds:.1f}s)")
+    print(f"\nTotal:   {sum(records for records, _ in results.values()):,} records cleaned")
+    print(f"Time:    {elapsed:.1f}s with {config['workers']} worker(s)")
+    if cache:
+        cache.print_summary()
+    
+    return results
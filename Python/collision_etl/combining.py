@@ -0,0 +1,953 @@
+"""
+Combining library (Script 2)
+Combines cleaned data from Austin, Chicago, and NYC into the Tableau master
+file, filtered to the year window and reduced to the common columns, plus
+the optional bridge, rollup, hotspot, star-schema and database stages.
+Importing it has no side effects; "Tableau Data.py" is its command line.
+"""
+
+import contextlib
+import io
+import os
+import types
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.bridge import FACTOR_SLOTS, build_bridge, write_bridge
+from collision_etl.cache import StageCache, cached_frames
+from collision_etl.config import DEFAULT_BATCH_SIZE, DEFAULT_MEMORY_MB, city_paths, output_path
+from collision_etl.datetimes import CLEANED_DATE_FORMAT, hour_from_time, parse_dates
+from collision_etl.derived_fields import season_from_month, time_period_from_hour
+from collision_etl.external_sort import ExternalSorter, rows_for_budget
+from collision_etl.factors import factor_files, load_factor_lookup, map_factor_codes, report_unmapped
+from collision_etl.incremental import CITY_KEYS, delta_path, drop_keys, load_state, save_state
+from collision_etl.instrumentation import measure
+from collision_etl.intermediate import FORMATS, handoff_path, iter_cleaned, read_cleaned, remove_handoff
+from collision_etl.loader import load_tables
+from collision_etl.partitions import PartitionedWriter, replace_partitioned
+from collision_etl.rollups import build_rollups, cell_usage, write_rollups
+from collision_etl.schema import (MASTER_CATEGORICALS, SharedCategories, as_category, fill_category, memory_report,
+                                  shared_dtype, unify_categoricals)
+from collision_etl.spatial import HotspotIndex
+from collision_etl.summary import SUMMARY_COLUMNS, SummaryStats, build_summary, combine_summaries, save_summary
+from collision_etl.warehouse import build_star_schema, write_star_schema
+
+# Cleaned columns used by create_master_dataset, the only ones loaded
+AUSTIN_COLUMNS = [
+    'crash_id', 'city', 'crash_date', 'crash_time', 'year', 'month', 'month_name',
+    'latitude', 'longitude', 'street_name', 'tot_injry_cnt', 'death_cnt',
+    'pedestrian_serious_injury_count', 'pedestrian_death_count',
+    'bicycle_serious_injury_count', 'bicycle_death_count',
+    'motor_vehicle_serious_injury_count', 'motor_vehicle_death_count',
+    'contrib_factr_p1_id', 'contrib_factr_p2_id'
+]
+
+CHICAGO_COLUMNS = [
+    'crash_record_id', 'city', 'crash_date', 'crash_time', 'year', 'month', 'month_name',
+    'latitude', 'longitude', 'street_name', 'injuries_total', 'injuries_fatal',
+    'injuries_incapacitating', 'injuries_non_incapacitating',
+    'prim_contributory_cause', 'sec_contributory_cause', 'weather_condition'
+]
+
+NYC_COLUMNS = [
+    'collision_id', 'city', 'crash_date', 'crash_time', 'year', 'month', 'month_name',
+    'latitude', 'longitude', 'street_name', 'persons_injured', 'persons_killed',
+    'pedestrians_injured', 'pedestrians_killed', 'cyclists_injured', 'cyclists_killed',
+    'motorists_injured', 'motorists_killed', 'contrib_factor_1', 'contrib_factor_2'
+]
+
+
+def load_and_standardize(austin_file, chicago_file, nyc_file, start_year=None, end_year=None):
+    """Load all 3 cleaned files and standardize to common columns
+    
+    Accepts the Parquet handoff or CSV exports from Script 1 (by extension)
+    and reads only the columns create_master_dataset uses. With a year
+    window, rows outside it are dropped while each file is read; the row
+    count before the window is kept in df.attrs['rows_loaded'].
+    """
+    
+    print("\nLoading cleaned data files...")
+    if start_year is not None or end_year is not None:
+        print(f"  Keeping years {start_year or 'start'}-{end_year or 'end'} while loading")
+    
+    # Load Austin
+    print("  [1/3] Loading Austin...")
+    austin = read_cleaned(austin_file, AUSTIN_COLUMNS, start_year, end_year)
+    print(f"        Loaded {len(austin):,} of {austin.attrs['rows_loaded']:,} records")
+    
+    # Load Chicago
+    print("  [2/3] Loading Chicago...")
+    chicago = read_cleaned(chicago_file, CHICAGO_COLUMNS, start_year, end_year)
+    print(f"        Loaded {len(chicago):,} of {chicago.attrs['rows_loaded']:,} records")
+    
+    # Load NYC
+    print("  [3/3] Loading NYC...")
+    nyc = read_cleaned(nyc_file, NYC_COLUMNS, start_year, end_year)
+    print(f"        Loaded {len(nyc):,} of {nyc.attrs['rows_loaded']:,} records")
+    
+    print(f"\n  Total records loaded: {len(austin) + len(chicago) + len(nyc):,}")
+    
+    return austin, chicago, nyc
+
+
+def austin_columns(austin):
+    """Austin cleaned columns as {master column: Series or constant}"""
+    return {
+        'accident_id': austin['crash_id'],
+        'city': austin['city'],
+        'crash_date': parse_dates(austin['crash_date'], CLEANED_DATE_FORMAT),
+        'crash_time': austin['crash_time'],
+        'year': austin['year'],
+        'month': austin['month'],
+        'month_name': austin['month_name'],
+        'latitude': austin['latitude'],
+        'longitude': austin['longitude'],
+        'street_name': austin['street_name'],
+        'total_injuries': austin['tot_injry_cnt'],
+        'total_deaths': austin['death_cnt'],
+        'pedestrian_injured': austin.get('pedestrian_serious_injury_count', 0),
+        'pedestrian_killed': austin.get('pedestrian_death_count', 0),
+        'cyclist_injured': austin.get('bicycle_serious_injury_count', 0),
+        'cyclist_killed': austin.get('bicycle_death_count', 0),
+        'motorist_injured': austin.get('motor_vehicle_serious_injury_count', 0),
+        'motorist_killed': austin.get('motor_vehicle_death_count', 0),
+        'contributing_factor_1': austin.get('contrib_factr_p1_id', 'UNKNOWN'),
+        'contributing_factor_2': austin.get('contrib_factr_p2_id', 'UNKNOWN'),
+        'weather_condition': 'UNKNOWN'  # Austin doesn't have weather
+    }
+
+
+def standardize_austin(austin):
+    """Austin cleaned columns in the common master layout"""
+    return pd.DataFrame(austin_columns(austin))
+
+
+def chicago_columns(chicago):
+    """Chicago cleaned columns as {master column: Series or constant}"""
+    return {
+        'accident_id': chicago['crash_record_id'],
+        'city': chicago['city'],
+        'crash_date': parse_dates(chicago['crash_date'], CLEANED_DATE_FORMAT),
+        'crash_time': chicago['crash_time'],
+        'year': chicago['year'],
+        'month': chicago['month'],
+        'month_name': chicago['month_name'],
+        'latitude': chicago['latitude'],
+        'longitude': chicago['longitude'],
+        'street_name': chicago['street_name'],
+        'total_injuries': chicago['injuries_total'],
+        'total_deaths': chicago['injuries_fatal'],
+        'pedestrian_injured': 0,  # Chicago doesn't separate pedestrian injuries
+        'pedestrian_killed': 0,
+        'cyclist_injured': 0,
+        'cyclist_killed': 0,
+        'motorist_injured': chicago['injuries_incapacitating'] + chicago['injuries_non_incapacitating'],
+        'motorist_killed': chicago['injuries_fatal'],
+        'contributing_factor_1': chicago['prim_contributory_cause'],
+        'contributing_factor_2': chicago.get('sec_contributory_cause', 'UNKNOWN'),
+        'weather_condition': chicago.get('weather_condition', 'UNKNOWN')
+    }
+
+
+def standardize_chicago(chicago):
+    """Chicago cleaned columns in the common master layout"""
+    return pd.DataFrame(chicago_columns(chicago))
+
+
+def nyc_columns(nyc):
+    """NYC cleaned columns as {master column: Series or constant}"""
+    return {
+        'accident_id': nyc['collision_id'],
+        'city': nyc['city'],
+        'crash_date': parse_dates(nyc['crash_date'], CLEANED_DATE_FORMAT),
+        'crash_time': nyc['crash_time'],
+        'year': nyc['year'],
+        'month': nyc['month'],
+        'month_name': nyc['month_name'],
+        'latitude': nyc['latitude'],
+        'longitude': nyc['longitude'],
+        'street_name': nyc['street_name'],
+        'total_injuries': nyc['persons_injured'],
+        'total_deaths': nyc['persons_killed'],
+        'pedestrian_injured': nyc['pedestrians_injured'],
+        'pedestrian_killed': nyc['pedestrians_killed'],
+        'cyclist_injured': nyc['cyclists_injured'],
+        'cyclist_killed': nyc['cyclists_killed'],
+        'motorist_injured': nyc['motorists_injured'],
+        'motorist_killed': nyc['motorists_killed'],
+        'contributing_factor_1': nyc['contrib_factor_1'],
+        'contributing_factor_2': nyc.get('contrib_factor_2', 'Unspecified'),
+        'weather_condition': 'UNKNOWN'  # NYC doesn't have weather
+    }
+
+
+def standardize_nyc(nyc):
+    """NYC cleaned columns in the common master layout"""
+    return pd.DataFrame(nyc_columns(nyc))
+
+
+# City name -> (cleaned columns loaded, standardizer)
+CITY_SOURCES = {
+    'Austin': (AUSTIN_COLUMNS, standardize_austin),
+    'Chicago': (CHICAGO_COLUMNS, standardize_chicago),
+    'NYC': (NYC_COLUMNS, standardize_nyc),
+}
+
+# City name -> (cleaned columns loaded, master column builder), for build_master_frame
+MASTER_SOURCES = {
+    'Austin': (AUSTIN_COLUMNS, austin_columns),
+    'Chicago': (CHICAGO_COLUMNS, chicago_columns),
+    'NYC': (NYC_COLUMNS, nyc_columns),
+}
+
+# Final dtype of each master column that is not a shared categorical
+# (MASTER_CATEGORICALS), allocated once by build_master_frame. Coordinates
+# stay float64: float32 would round them in the master file.
+MASTER_DTYPES = {
+    'accident_id': object,
+    'crash_date': 'datetime64[ns]',
+    'year': 'int32',
+    'month': 'int32',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    **dict.fromkeys(['total_injuries', 'total_deaths', 'pedestrian_injured', 'pedestrian_killed',
+                     'cyclist_injured', 'cyclist_killed', 'motorist_injured', 'motorist_killed'], 'int32'),
+}
+
+FACTOR_COLUMNS = ['contributing_factor_1', 'contributing_factor_2']
+
+
+def map_factor_columns(viz, name, unmapped):
+    """Add the common factor code columns to one city's standardized frame
+    
+    Unmapped value counts are added into unmapped[name]. Returns
+    (factor values, values mapped to a code).
+    """
+    values = mapped = 0
+    for col in FACTOR_COLUMNS:
+        viz[col + '_code'], missed = map_factor_codes(viz[col], name)
+        unmapped[name] = missed.add(unmapped[name], fill_value=0) if name in unmapped else missed
+        values += len(viz)
+        mapped += int(viz[col + '_code'].notna().sum())
+    return values, mapped
+
+
+def report_factor_mapping(values, mapped, unmapped):
+    if values:
+        print(f"  ✓ Mapped {mapped:,} of {values:,} factor values ({mapped/values*100:.1f}%)")
+    report_unmapped({name: counts.astype(int).sort_values(ascending=False) for name, counts in unmapped.items()})
+
+
+def create_master_dataset(austin, chicago, nyc):
+    """Combine all datasets with common columns for visualization"""
+    
+    print("\nCreating master dataset...")
+    
+    # Austin - standardize columns
+    print("  [1/3] Standardizing Austin columns...")
+    austin_viz = standardize_austin(austin)
+    
+    # Chicago - standardize columns
+    print("  [2/3] Standardizing Chicago columns...")
+    chicago_viz = standardize_chicago(chicago)
+    
+    # NYC - standardize columns
+    print("  [3/3] Standardizing NYC columns...")
+    nyc_viz = standardize_nyc(nyc)
+    
+    # Map contributing factors to the common codes in 'Contributing Factors/'
+    print("\n  Mapping contributing factors to common codes...")
+    unmapped = {}
+    values = mapped = 0
+    for name, viz in [('Austin', austin_viz), ('Chicago', chicago_viz), ('NYC', nyc_viz)]:
+        city_values, city_mapped = map_factor_columns(viz, name, unmapped)
+        values += city_values
+        mapped += city_mapped
+    report_factor_mapping(values, mapped, unmapped)
+    
+    # Combine all datasets, with one shared dictionary per text column so they stay categorical
+    print("\n  Combining all datasets...")
+    unify_categoricals([austin_viz, chicago_viz, nyc_viz])
+    master = pd.concat([austin_viz, chicago_viz, nyc_viz], ignore_index=True)
+    print(f"  ✓ Combined dataset: {len(master):,} total records")
+    
+    actual_mb, object_mb = memory_report(master)
+    print(f"  ✓ Memory: {actual_mb:,.1f} MB with categoricals ({object_mb:,.1f} MB as object strings)")
+    
+    # Rows read before any load-time year filter, for the filter summary
+    master.attrs['rows_loaded'] = sum(df.attrs.get('rows_loaded', len(df)) for df in (austin, chicago, nyc))
+    
+    return master
+
+
+def _fill_slice(array, start, stop, values):
+    """Write a Series or constant into array[start:stop]
+    
+    An integer column receiving missing values (e.g. the year of a NaT date)
+    is widened to float64 first; the array to keep is returned.
+    """
+    if isinstance(values, pd.Series):
+        values = values.to_numpy()
+        if array.dtype.kind == 'i' and values.dtype.kind == 'f' and np.isnan(values).any():
+            array = array.astype('float64')
+    array[start:stop] = values
+    return array
+
+
+def build_master_frame(austin_file, chicago_file, nyc_file, start_year=None, end_year=None):
+    """Build the master dataset straight from the cleaned files into preallocated columns
+    
+    Gives the same rows as create_master_dataset(*load_and_standardize(...))
+    without the three city frames, their standardized copies and the concat
+    copy. The rows inside the year window are counted first (reading only
+    'year'), every master column is allocated once in its final dtype
+    (MASTER_DTYPES, shared categoricals, Int16 factor codes) and each city
+    is read and written into its slice before the next one is loaded.
+    """
+    
+    print("\nBuilding master dataset in place...")
+    if start_year is not None or end_year is not None:
+        print(f"  Keeping years {start_year or 'start'}-{end_year or 'end'} while loading")
+    files = {'Austin': austin_file, 'Chicago': chicago_file, 'NYC': nyc_file}
+    
+    counts = {}
+    rows_loaded = 0
+    for name, path in files.items():
+        years = read_cleaned(path, ['year'], start_year, end_year)
+        counts[name] = len(years)
+        rows_loaded += years.attrs['rows_loaded']
+    total = sum(counts.values())
+    
+    arrays = {col: np.empty(total, dtype=dtype) for col, dtype in MASTER_DTYPES.items()}
+    codes = {col: np.empty(total, dtype=np.int32) for col in MASTER_CATEGORICALS}
+    categories = {col: SharedCategories() for col in MASTER_CATEGORICALS}
+    factor_codes = {col: (np.zeros(total, dtype=np.int16), np.ones(total, dtype=bool)) for col in FACTOR_COLUMNS}
+    unmapped = {}
+    values = mapped = 0
+    
+    start = 0
+    for i, (name, path) in enumerate(files.items(), 1):
+        columns, city_columns = MASTER_SOURCES[name]
+        city = read_cleaned(path, columns, start_year, end_year)
+        stop = start + counts[name]
+        sources = city_columns(city)
+        for col, source in sources.items():
+            if col in codes:
+                codes[col][start:stop] = categories[col].encode(source, len(city))
+            else:
+                arrays[col] = _fill_slice(arrays[col], start, stop, source)
+        
+        # Factor codes are mapped per city, as in create_master_dataset
+        factors = pd.DataFrame({col: sources[col] for col in FACTOR_COLUMNS}, index=city.index)
+        city_values, city_mapped = map_factor_columns(factors, name, unmapped)
+        values += city_values
+        mapped += city_mapped
+        for col, (code_values, code_mask) in factor_codes.items():
+            code_values[start:stop] = factors[col + '_code'].to_numpy(dtype=np.int16, na_value=0)
+            code_mask[start:stop] = factors[col + '_code'].isna().to_numpy()
+        
+        print(f"  [{i}/3] {name}: {len(city):,} of {city.attrs['rows_loaded']:,} records")
+        layout = list(sources)
+        del city, sources, factors
+        start = stop
+    
+    report_factor_mapping(values, mapped, unmapped)
+    
+    data = {col: categories[col].finish(codes[col]) if col in codes else arrays[col] for col in layout}
+    for col, (code_values, code_mask) in factor_codes.items():
+        data[col + '_code'] = pd.arrays.IntegerArray(code_values, code_mask)
+    master = pd.DataFrame(data, copy=False)
+    print(f"  ✓ Combined dataset: {len(master):,} total records")
+    
+    actual_mb, object_mb = memory_report(master)
+    print(f"  ✓ Memory: {actual_mb:,.1f} MB with categoricals ({object_mb:,.1f} MB as object strings)")
+    
+    master.attrs['rows_loaded'] = rows_loaded
+    return master
+
+
+def benchmark_master_build(austin_file, chicago_file, nyc_file, start_year=2022, end_year=2024):
+    """Wall time and tracemalloc peak of build_master_frame against load + concat
+    
+    Each path runs once for its time and once traced for its peak memory,
+    and both must build the same frame. Returns a DataFrame with one row
+    per path.
+    """
+    files = (austin_file, chicago_file, nyc_file)
+    builds = {
+        'load_and_concat': lambda: create_master_dataset(*load_and_standardize(*files, start_year, end_year)),
+        'preallocated': lambda: build_master_frame(*files, start_year, end_year),
+    }
+    results = []
+    frames = {}
+    for name, build in builds.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            frames[name], timed = measure(name, build)
+            _, traced = measure(name, build, trace_memory=True)
+        results.append({'path': name, 'rows': len(frames[name]), 'wall_s': timed['wall_s'],
+                        'peak_mb': traced['tracemalloc_peak_mb'],
+                        'frame_mb': round(frames[name].memory_usage(deep=True, index=False).sum() / 1e6, 1)})
+    pd.testing.assert_frame_equal(frames['preallocated'], frames['load_and_concat'], check_dtype=False)
+    return pd.DataFrame(results)
+
+
+def filter_recent_years(master, start_year=2022, end_year=2024):
+    """Filter data for recent years only
+    
+    If the window was already applied while loading, this only re-checks the
+    mask and reports the summary from the load-time row counts.
+    """
+    
+    before = master.attrs.get('rows_loaded', len(master))
+    print(f"\nFiltering data for years {start_year}-{end_year}...")
+    print(f"  Before filtering: {before:,} records")
+    
+    # Filter by year
+    mask = (master['year'] >= start_year) & (master['year'] <= end_year)
+    master_filtered = master if mask.all() else master[mask].copy()
+    
+    print(f"  After filtering:  {len(master_filtered):,} records")
+    print(f"  Reduction: {before - len(master_filtered):,} records removed")
+    if before:
+        print(f"  Percentage kept: {len(master_filtered)/before*100:.1f}%")
+    
+    return master_filtered
+
+
+def derive_fields(master):
+    """Season, time period, severity flags and total casualties (in place)"""
+    
+    # Add season
+    master['season'] = season_from_month(master['month'])
+    
+    # Add time period
+    master['crash_hour'] = hour_from_time(master['crash_time'])
+    master['time_period'] = time_period_from_hour(master['crash_hour'])
+    
+    # Add severity flag
+    master['has_fatality'] = master['total_deaths'] > 0
+    master['has_injury'] = master['total_injuries'] > 0
+    
+    # Add total casualties
+    master['total_casualties'] = master['total_injuries'] + master['total_deaths']
+    
+    # Clean contributing factors
+    master['contributing_factor_1'] = fill_category(master['contributing_factor_1'], 'Unspecified')
+    
+    return master
+
+
+def add_calculated_fields(master):
+    """Add useful calculated fields for Tableau"""
+    
+    print("\nAdding calculated fields...")
+    
+    master = derive_fields(master)
+    
+    print("  ✓ Added: season, time_period, severity flags, total_casualties")
+    
+    return master
+
+
+# Code the combined and the derived master frames depend on, hashed into
+# their stage cache keys
+MASTER_CODE = (build_master_frame, _fill_slice, read_cleaned, austin_columns, chicago_columns, nyc_columns,
+               parse_dates, map_factor_columns, map_factor_codes, load_factor_lookup, SharedCategories,
+               unify_categoricals, shared_dtype, as_category)
+DERIVED_CODE = (filter_recent_years, add_calculated_fields, derive_fields, season_from_month, hour_from_time,
+                time_period_from_hour, fill_category)
+
+
+def save_master_file(master, output_file, partitioned_root=None, summary_file=None):
+    """Save the master visualization file
+    
+    With partitioned_root the master is also written there as a city=/year=
+    partitioned Parquet dataset. With summary_file its summary statistics
+    table (collision_etl.summary) is rebuilt there.
+    """
+    
+    print(f"\nSaving master file...")
+    
+    # Sort by date
+    master = master.sort_values(['crash_date', 'city']).reset_index(drop=True)
+    
+    # Save to CSV
+    master.to_csv(output_file, index=False)
+    
+    print(f"  ✓ Saved to: {output_file}")
+    if partitioned_root:
+        with PartitionedWriter(partitioned_root) as writer:
+            writer.write(master)
+        print(f"  ✓ Partitioned copy: {partitioned_root}")
+    if summary_file:
+        save_summary(build_summary(master), summary_file)
+        print(f"  ✓ Summary statistics: {summary_file}")
+    print_tableau_estimate(len(master), len(master.columns))
+    
+    return master
+
+
+def print_tableau_estimate(rows, columns):
+    """Print the master file size against the Tableau Public cell limit"""
+    print(f"  ✓ Total rows: {rows:,}")
+    print(f"  ✓ Total columns: {columns}")
+    
+    # Calculate estimated Tableau Public size
+    estimated_cells = rows * columns
+    print(f"\n  Tableau Public estimate:")
+    print(f"    Cells: {estimated_cells:,} / 15,000,000 limit")
+    print(f"    Usage: {estimated_cells/15000000*100:.1f}%")
+    
+    if estimated_cells < 15000000:
+        print(f"    ✓ Fits in Tableau Public!")
+    else:
+        print(f"    ⚠ May exceed Tableau Public limit")
+
+
+def save_master_out_of_core(austin_file, chicago_file, nyc_file, output_file, start_year=2022, end_year=2024,
+                            memory_mb=DEFAULT_MEMORY_MB, spill_dir=None, partitioned_root=None, summary_file=None):
+    """Build and save the master file without holding it in memory
+    
+    Runs the same standardize -> year filter -> derive -> sort -> write steps
+    as the in-memory path, but chunk by chunk: each cleaned file is read in
+    chunks sized from memory_mb, standardized chunks are spilled as sorted
+    runs and an external merge writes them to output_file ordered by
+    ['crash_date', 'city']. start_year/end_year may be None for every year.
+    With partitioned_root the merged blocks are also written there as a
+    partitioned Parquet dataset, and with summary_file their summary
+    statistics are combined there. Returns the number of rows written.
+    """
+    
+    print(f"\nBuilding master file out of core (memory budget {memory_mb:,} MB)...")
+    if start_year is not None or end_year is not None:
+        print(f"  Keeping years {start_year or 'start'}-{end_year or 'end'} while loading")
+    
+    chunk_rows = rows_for_budget(memory_mb)
+    unmapped = {}
+    values = mapped = 0
+    
+    with ExternalSorter(['crash_date', 'city'], memory_mb, spill_dir) as sorter:
+        for i, (name, path) in enumerate([('Austin', austin_file), ('Chicago', chicago_file),
+                                          ('NYC', nyc_file)], 1):
+            columns, standardize = CITY_SOURCES[name]
+            rows = sorter.rows
+            for chunk in iter_cleaned(path, columns, start_year, end_year, chunk_rows):
+                viz = standardize(chunk)
+                chunk_values, chunk_mapped = map_factor_columns(viz, name, unmapped)
+                values += chunk_values
+                mapped += chunk_mapped
+                unify_categoricals([viz])
+                sorter.add(derive_fields(viz))
+            print(f"  [{i}/3] {name}: {sorter.rows - rows:,} records")
+        
+        report_factor_mapping(values, mapped, unmapped)
+        
+        # Sort by date, merging the spilled runs
+        written = 0
+        columns = 0
+        summaries = []
+        with contextlib.ExitStack() as stack:
+            partitioned = stack.enter_context(PartitionedWriter(partitioned_root)) if partitioned_root else None
+            for block in sorter.merged():
+                block.to_csv(output_file, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+                if partitioned:
+                    partitioned.write(block)
+                if summary_file:
+                    summaries.append(build_summary(block))
+                written += len(block)
+                columns = len(block.columns)
+        print(f"  ✓ Merged {len(sorter.runs):,} sorted run(s)")
+    
+    if written == 0:
+        pd.DataFrame().to_csv(output_file, index=False)
+    print(f"  ✓ Saved to: {output_file}")
+    if partitioned_root:
+        print(f"  ✓ Partitioned copy: {partitioned_root}")
+    if summary_file:
+        save_summary(combine_summaries(summaries), summary_file)
+        print(f"  ✓ Summary statistics: {summary_file}")
+    print_tableau_estimate(written, columns)
+    
+    return written
+
+
+def load_vehicle_types(master, nyc_file):
+    """Vehicle type of each master row, for Dim_VehicleType
+    
+    Only NYC records vehicle types, so they are not part of the master file:
+    NYC rows get vehicle_type_1 from the cleaned NYC file (by collision_id),
+    every other row 'UNKNOWN'.
+    """
+    nyc = read_cleaned(nyc_file, ['collision_id', 'city', 'vehicle_type_1'])
+    lookup = pd.Series(nyc['vehicle_type_1'].to_numpy(dtype=object), index=nyc['collision_id'].astype(str).to_numpy())
+    lookup = lookup[~lookup.index.duplicated(keep='last')]
+    
+    is_nyc = master['city'].isin(nyc['city'].unique()).to_numpy()
+    types = np.full(len(master), 'UNKNOWN', dtype=object)
+    types[is_nyc] = lookup.reindex(master['accident_id'][is_nyc].astype(str).to_numpy()).fillna('UNKNOWN').to_numpy()
+    return pd.Series(types, index=master.index, name='vehicle_type')
+
+
+def save_star_schema(master, output_dir, master_file=None, nyc_file=None):
+    """Write the warehouse dimensions and the integer fact table
+    
+    Vehicle types come from nyc_file (load_vehicle_types); without it
+    Dim_VehicleType holds only the unknown member.
+    """
+    
+    print(f"\nBuilding star schema...")
+    
+    tables = build_star_schema(master, load_vehicle_types(master, nyc_file) if nyc_file else None)
+    sizes = write_star_schema(tables, output_dir)
+    
+    for name, table in tables.items():
+        print(f"  {name + ':':<25} {len(table):>10,} rows  {sizes[name]/1e6:>8.1f} MB")
+    print(f"  ✓ Saved to: {output_dir}")
+    
+    if master_file and os.path.exists(master_file):
+        wide_mb = os.path.getsize(master_file) / 1e6
+        print(f"  ✓ Fct_Accident is {sizes['Fct_Accident']/1e6:,.1f} MB vs {wide_mb:,.1f} MB for the wide master CSV")
+    
+    return tables
+
+
+def save_rollups(master, output_dir):
+    """Write the pre-aggregated rollup extracts and their Tableau cell usage"""
+    
+    print(f"\nBuilding rollups over {len(master):,} records...")
+    
+    tables = build_rollups(master)
+    write_rollups(tables, output_dir)
+    
+    for name, table in tables.items():
+        cells, usage = cell_usage(table)
+        print(f"  {name + ':':<30} {len(table):>9,} rows  {cells:>11,} cells  ({usage:.2f}% of limit)")
+    print(f"  ✓ Saved to: {output_dir}")
+    
+    return tables
+
+
+def save_hotspots(master, output_file):
+    """Write per-cell crash, injury and death totals for the map views
+    
+    Crashes are binned into fixed grid cells once here, so Tableau plots the
+    cell centers instead of re-binning every raw coordinate.
+    """
+    
+    print(f"\nBuilding hotspot grid...")
+    
+    index = HotspotIndex.from_master(master)
+    index.table.to_csv(output_file, index=False)
+    
+    located = int(index.table['crashes'].sum())
+    print(f"  ✓ {located:,} of {len(master):,} crashes have coordinates")
+    print(f"  ✓ {index.table['grid_cell'].nunique():,} grid cells, {len(index.table):,} rows")
+    print(f"  ✓ Saved to: {output_file}")
+    
+    print("\n  Top cells by crashes:")
+    print(index.top_cells(5)[['cell_latitude', 'cell_longitude', 'crashes', 'total_injuries', 'total_deaths']]
+          .to_string(index=False))
+    
+    return index
+
+
+def load_database(tables, database, engine='sqlite', batch_size=DEFAULT_BATCH_SIZE):
+    """Bulk-load tables into a local SQL database and report rows per second"""
+    
+    print(f"\nLoading {engine} database...")
+    
+    results = load_tables(tables, database, engine, batch_size)
+    
+    for name, (rows, seconds) in results.items():
+        print(f"  {name + ':':<25} {rows:>10,} rows  {seconds:>6.1f}s  ({rows/max(seconds, 1e-9):,.0f} rows/s)")
+    total_rows = sum(rows for rows, _ in results.values())
+    total_seconds = sum(seconds for _, seconds in results.values())
+    print(f"  ✓ Loaded {total_rows:,} rows into {database} ({total_rows/max(total_seconds, 1e-9):,.0f} rows/s)")
+    
+    return results
+
+
+def load_deltas(austin_file, chicago_file, nyc_file):
+    """Load the pending cleaned deltas left by an incremental Script 1 run
+    
+    Cities without a pending delta get an empty frame, so the result can go
+    straight through create_master_dataset.
+    """
+    
+    print("\nLoading pending deltas...")
+    
+    deltas = []
+    for name, path, columns in [('Austin', austin_file, AUSTIN_COLUMNS),
+                                ('Chicago', chicago_file, CHICAGO_COLUMNS),
+                                ('NYC', nyc_file, NYC_COLUMNS)]:
+        pending = delta_path(path, 'delta')
+        if os.path.exists(pending):
+            df = read_cleaned(pending, columns)
+        else:
+            df = pd.DataFrame(columns=columns)
+        print(f"  {name + ':':<8} {len(df):,} new or changed records")
+        deltas.append(df)
+    
+    return deltas
+
+
+def clear_deltas(austin_file, chicago_file, nyc_file, state=None):
+    """Remove pending deltas once they are part of the master file
+    
+    With a refresh state every city is marked as having no pending delta.
+    """
+    for path in (austin_file, chicago_file, nyc_file):
+        if os.path.isdir(path):
+            # Partitioned input; its deltas are named after the cleaned file
+            path += '.parquet'
+        for fmt in FORMATS:
+            remove_handoff(handoff_path(delta_path(path, 'delta'), fmt))
+    if state is not None:
+        for city_state in state['cities'].values():
+            city_state['pending_delta'] = False
+
+
+def merge_master_file(master_delta, delta_keys, output_file, partitioned_root=None, summary_file=None):
+    """Merge refreshed rows into an existing master file and save it
+    
+    Every (city, accident_id) in delta_keys is removed from the master file,
+    including refreshed records that fell outside the year window, and the
+    rows of master_delta are added. Existing rows are rewritten as text, so
+    they stay byte-for-byte what the last full run wrote. A partitioned copy
+    at partitioned_root only has the partitions the delta touches rewritten;
+    the summary statistics at summary_file are rebuilt from the merged file.
+    """
+    
+    print(f"\nMerging into master file...")
+    
+    existing = pd.read_csv(output_file, dtype=str, keep_default_na=False)
+    delta_text = pd.read_csv(io.StringIO(master_delta.to_csv(index=False)), dtype=str, keep_default_na=False)
+    kept = drop_keys(existing, delta_keys, ['city', 'accident_id'])
+    
+    master = pd.concat([kept, delta_text[existing.columns]], ignore_index=True)
+    master = master.sort_values(['crash_date', 'city'], key=lambda s: s.mask(s == '')).reset_index(drop=True)
+    master.to_csv(output_file, index=False)
+    
+    print(f"  ✓ Replaced {len(existing) - len(kept):,} and added {len(master) - len(kept):,} records")
+    print(f"  ✓ Saved to: {output_file}")
+    if partitioned_root and os.path.isdir(partitioned_root):
+        rewritten = replace_partitioned(partitioned_root, master_delta, ['city', 'accident_id'], drop=delta_keys)
+        print(f"  ✓ Rewrote {rewritten:,} partition(s) of {partitioned_root}")
+    elif partitioned_root:
+        with PartitionedWriter(partitioned_root) as writer:
+            writer.write(pd.read_csv(output_file, low_memory=False))
+        print(f"  ✓ Partitioned copy: {partitioned_root}")
+    if summary_file:
+        save_summary(build_summary(pd.read_csv(output_file, usecols=SUMMARY_COLUMNS)), summary_file)
+        print(f"  ✓ Summary statistics: {summary_file}")
+    print(f"  ✓ Total rows: {len(master):,}")
+    
+    return master
+
+
+def build_bridge_table(austin_file, chicago_file, nyc_file, output_file):
+    """Write the BridgeContributingFactor table for the warehouse
+    
+    One row per recorded factor slot across all years (not just the Tableau
+    window), read from the id and factor columns of the cleaned files.
+    """
+    
+    print(f"\nBuilding contributing factor bridge...")
+    
+    bridges = []
+    unmapped = {}
+    for name, path in [('Austin', austin_file), ('Chicago', chicago_file), ('NYC', nyc_file)]:
+        df = read_cleaned(path, [CITY_KEYS[name]['id']] + FACTOR_SLOTS[name])
+        bridge, unmapped[name] = build_bridge(df, name)
+        print(f"  {name + ':':<8} {len(bridge):,} factor rows from {len(df):,} records")
+        bridges.append(bridge)
+    report_unmapped(unmapped)
+    
+    rows = write_bridge(bridges, output_file)
+    print(f"  ✓ Saved to: {output_file}")
+    print(f"  ✓ Total rows: {rows:,}")
+    
+    return rows
+
+
+def print_summary(master, stats=None):
+    """Print summary statistics
+    
+    The numbers come from a SummaryStats table (collision_etl.summary),
+    built from master when none is given.
+    """
+    
+    stats = stats or SummaryStats(table=build_summary(master))
+    
+    print("\n" + "="*60)
+    print("MASTER DATASET SUMMARY")
+    print("="*60)
+    
+    print("\nRecords by City:")
+    print(stats.top('city', n=None).set_index('city')['crashes'].to_string())
+    
+    print("\nRecords by Year:")
+    print(stats.query(['year'], ['crashes']).set_index('year')['crashes'].to_string())
+    
+    totals = stats.totals()
+    print("\nTotal Statistics:")
+    print(f"  Total Accidents: {totals['crashes']:,}")
+    print(f"  Total Injuries:  {totals['total_injuries']:,}")
+    print(f"  Total Deaths:    {totals['total_deaths']:,}")
+    print(f"  Accidents with Fatalities: {totals['fatal_crashes']:,}")
+    
+    print("\nTop Contributing Factors:")
+    factors = stats.top('factor', 10).set_index('factor')['crashes']
+    print(factors.rename_axis('contributing_factor_1').to_string())
+
+
+# Script 2 stages timed as one RunReport stage each
+STAGE_FUNCTIONS = [
+    'load_and_standardize', 'create_master_dataset', 'build_master_frame', 'filter_recent_years',
+    'add_calculated_fields', 'save_master_file', 'build_bridge_table', 'save_rollups',
+    'save_hotspots', 'save_star_schema', 'load_database', 'load_deltas', 'merge_master_file',
+    'save_master_out_of_core',
+]
+
+
+def stage_functions(report=None):
+    """The STAGE_FUNCTIONS as attributes, each wrapped by report.wrap when there is a report
+    
+    The wrappers are local to one run, so the module functions stay untouched.
+    """
+    functions = {name: globals()[name] for name in STAGE_FUNCTIONS}
+    if report:
+        functions = {name: report.wrap(func, name) for name, func in functions.items()}
+    return types.SimpleNamespace(**functions)
+
+
+def run_combine(config, report=None):
+    """Run Script 2 for a pipeline config (collision_etl.config.load_config)
+    
+    Builds the master file from the Austin, Chicago and NYC cleaned files
+    (or merges the pending deltas with config['incremental']) and runs the
+    optional 'bridge', 'rollups', 'hotspots', 'star' and 'load_db' stages
+    listed in config['stages']. With config['backend'] 'out_of_core' the
+    master file is built chunk by chunk within config['memory_mb'] instead.
+    With a RunReport every stage call is timed (see stage_functions). With config['cache'] the
+    combined and derived master frames of a full in-memory run are loaded
+    from the stage cache when the cleaned files and their code are unchanged.
+    Returns the master DataFrame (None out of core).
+    """
+    stage = stage_functions(report)
+    
+    stages = set(config['stages'])
+    start_year, end_year = config['start_year'], config['end_year']
+    
+    # Input files (cleaned data, in the first handoff format Script 1 wrote)
+    cleaned = city_paths(config)
+    austin_input, chicago_input, nyc_input = (handoff_path(cleaned[city][1], config['formats'][0])
+                                              for city in ('Austin', 'Chicago', 'NYC'))
+    
+    # Output files
+    master_output = output_path(config, 'master')
+    master_root = handoff_path(master_output, 'partitioned') if 'partitioned' in config['formats'] else None
+    cache = StageCache.from_config(config, output_path(config, 'cache'))
+    summary_output = output_path(config, 'summary')
+    
+    state_file = output_path(config, 'state')
+    state = load_state(state_file) if config['incremental'] else None
+    
+    if 'bridge' in stages:
+        # Bridge covers every year of the cleaned files, so it is rebuilt in full
+        stage.build_bridge_table(austin_input, chicago_input, nyc_input, output_path(config, 'bridge'))
+    
+    if (config['incremental'] and not config['full_refresh'] and os.path.exists(master_output)
+            and not state['master'].get('full_rebuild')):
+        deltas = stage.load_deltas(austin_input, chicago_input, nyc_input)
+        master = stage.create_master_dataset(*deltas)
+        delta_keys = master[['city', 'accident_id']]
+        master = stage.filter_recent_years(master, start_year=start_year, end_year=end_year)
+        master = stage.add_calculated_fields(master)
+        master = stage.merge_master_file(master, delta_keys, master_output, master_root, summary_output)
+        
+        clear_deltas(austin_input, chicago_input, nyc_input, state)
+        state['master'].update(rows=len(master), last_run=datetime.now().isoformat(timespec='seconds'))
+        save_state(state, state_file)
+        
+        print("\n" + "="*60)
+        print("✓ SCRIPT 2 INCREMENTAL REFRESH COMPLETE!")
+        print("="*60)
+        return master
+    
+    if config['backend'] == 'out_of_core':
+        unsupported = sorted(stages & {'rollups', 'hotspots', 'star', 'load_db'})
+        if unsupported:
+            raise ValueError(f"Stage(s) {unsupported} need the in-memory master; run them without out_of_core")
+        stage.save_master_out_of_core(austin_input, chicago_input, nyc_input, master_output, start_year,
+                                      end_year, config['memory_mb'], config['spill_dir'], master_root,
+                                      summary_output)
+        
+        print("\n" + "="*60)
+        print("✓ SCRIPT 2 COMPLETE!")
+        print("="*60)
+        print(f"\nYour master file is ready for Tableau:")
+        print(f"  {master_output}")
+        print("="*60)
+        return None
+    
+    # Load data, dropping rows outside the year window as each file is read
+    # (rollups cover the full history, so then every year is loaded)
+    window = {} if 'rollups' in stages else {'start_year': start_year, 'end_year': end_year}
+    inputs = [austin_input, chicago_input, nyc_input] + factor_files()
+    
+    def combined():
+        # Create master dataset
+        return cached_frames(cache, 'master', lambda: stage.build_master_frame(
+            austin_input, chicago_input, nyc_input, **window), inputs, MASTER_CODE, window)
+    
+    if 'rollups' in stages:
+        # Calculated fields first, so the rollups see every year
+        master = cached_frames(cache, 'calculated', lambda: stage.add_calculated_fields(combined()),
+                               inputs, MASTER_CODE + DERIVED_CODE, window)
+        stage.save_rollups(master, output_path(config, 'rollups'))
+        master = stage.filter_recent_years(master, start_year=start_year, end_year=end_year)
+    else:
+        # Filter for recent years (2022-2024 by default), then add calculated fields
+        master = cached_frames(cache, 'calculated', lambda: stage.add_calculated_fields(
+            stage.filter_recent_years(combined(), start_year=start_year, end_year=end_year)),
+            inputs, MASTER_CODE + DERIVED_CODE, window)
+    
+    # Save master file
+    master = stage.save_master_file(master, master_output, master_root, summary_output)
+    
+    # Print summary
+    print_summary(master, SummaryStats(summary_output))
+    
+    if 'hotspots' in stages:
+        stage.save_hotspots(master, output_path(config, 'hotspots'))
+    
+    # Star schema for the warehouse load
+    tables = {'Vehicle_Collisions_Master': master}
+    if 'star' in stages:
+        tables = stage.save_star_schema(master, output_path(config, 'warehouse'), master_output, nyc_input)
+    
+    if 'load_db' in stages:
+        if not config['database']:
+            raise ValueError("The load_db stage needs a database (--load-db or 'database' in the config)")
+        stage.load_database(tables, config['database'], config['db_engine'], config['batch_size'])
+    
+    if config['incremental']:
+        clear_deltas(austin_input, chicago_input, nyc_input, state)
+        state['master'].update(rows=len(master), full_rebuild=False,
+                               last_run=datetime.now().isoformat(timespec='seconds'))
+        save_state(state, state_file)
+    
+    print("\n" + "="*60)
+    print("✓ SCRIPT 2 COMPLETE!")
+    print("="*60)
+    print(f"\nYour master file is ready for Tableau:")
+    print(f"  {master_output}")
+    print("\nNext step: Load this file into Tableau Public")
+    print("="*60)
+    if cache:
+        cache.print_summary()
+    
+    return master
@@ -0,0 +1,291 @@
+"""
+Pipeline configuration
+Per-city raw schemas (columns, dtypes, renames, fill values, date formats)
+that Script 1 builds its cleaners from, and the run configuration (paths,
+stages, formats, year window, parallelism) shared by both scripts and the
+pipeline runner. A JSON config file overrides any of the defaults.
+Only the standard library is imported, so tools can read a config (or check
+raw headers against it) without paying for pandas.
+"""
+
+import copy
+import json
+import os
+
+# Raw crash_date formats; values that do not match fall back to inference
+DATE_FORMATS = {
+    'Austin': 'ISO8601',
+    'Chicago': '%m/%d/%Y %I:%M:%S %p',
+    'NYC': '%m/%d/%Y',
+}
+
+# Run defaults of the stage cache, external sort and bulk loader, kept here
+# (and imported by those modules) so reading a config never imports pandas
+DEFAULT_CACHE_MB = 4096
+KEY_MODES = ('mtime', 'content')
+DEFAULT_MEMORY_MB = 2048
+DEFAULT_BATCH_SIZE = 50_000
+
+AUSTIN_COLUMNS = [
+    'crash_id', 'crash_date', 'crash_time', 'crash_fatal_fl', 'latitude', 'longitude', 'street_name',
+    'crash_speed_limit', 'crash_sev_id', 'sus_serious_injry_cnt', 'nonincap_injry_cnt', 'poss_injry_cnt',
+    'non_injry_cnt', 'tot_injry_cnt', 'death_cnt', 'contrib_factr_p1_id', 'contrib_factr_p2_id',
+    'pedestrian_fl', 'motor_vehicle_fl', 'motorcycle_fl', 'bicycle_fl', 'pedestrian_death_count',
+    'pedestrian_serious_injury_count', 'motor_vehicle_death_count', 'motor_vehicle_serious_injury_count',
+    'bicycle_death_count', 'bicycle_serious_injury_count', 'motorcycle_death_count',
+    'motorcycle_serious_injury_count'
+]
+
+CHICAGO_COLUMNS = [
+    'CRASH_RECORD_ID', 'CRASH_DATE', 'POSTED_SPEED_LIMIT', 'TRAFFIC_CONTROL_DEVICE', 'DEVICE_CONDITION',
+    'WEATHER_CONDITION', 'LIGHTING_CONDITION', 'FIRST_CRASH_TYPE', 'TRAFFICWAY_TYPE', 'ALIGNMENT',
+    'ROADWAY_SURFACE_COND', 'ROAD_DEFECT', 'CRASH_TYPE', 'DAMAGE', 'PRIM_CONTRIBUTORY_CAUSE',
+    'SEC_CONTRIBUTORY_CAUSE', 'STREET_NO', 'STREET_DIRECTION', 'STREET_NAME', 'NUM_UNITS',
+    'MOST_SEVERE_INJURY', 'INJURIES_TOTAL', 'INJURIES_FATAL', 'INJURIES_INCAPACITATING',
+    'INJURIES_NON_INCAPACITATING', 'INJURIES_REPORTED_NOT_EVIDENT', 'INJURIES_NO_INDICATION',
+    'CRASH_HOUR', 'CRASH_DAY_OF_WEEK', 'CRASH_MONTH', 'LATITUDE', 'LONGITUDE'
+]
+
+# Raw NYC columns (in read order) -> cleaned names
+NYC_RENAMES = {
+    'COLLISION_ID': 'collision_id',
+    'CRASH DATE': 'crash_date',
+    'CRASH TIME': 'crash_time',
+    'BOROUGH': 'borough',
+    'ZIP CODE': 'zip_code',
+    'LATITUDE': 'latitude',
+    'LONGITUDE': 'longitude',
+    'ON STREET NAME': 'street_name',
+    'CROSS STREET NAME': 'cross_street_name',
+    'OFF STREET NAME': 'off_street_name',
+    'NUMBER OF PERSONS INJURED': 'persons_injured',
+    'NUMBER OF PERSONS KILLED': 'persons_killed',
+    'NUMBER OF PEDESTRIANS INJURED': 'pedestrians_injured',
+    'NUMBER OF PEDESTRIANS KILLED': 'pedestrians_killed',
+    'NUMBER OF CYCLIST INJURED': 'cyclists_injured',
+    'NUMBER OF CYCLIST KILLED': 'cyclists_killed',
+    'NUMBER OF MOTORIST INJURED': 'motorists_injured',
+    'NUMBER OF MOTORIST KILLED': 'motorists_killed',
+    'CONTRIBUTING FACTOR VEHICLE 1': 'contrib_factor_1',
+    'CONTRIBUTING FACTOR VEHICLE 2': 'contrib_factor_2',
+    'CONTRIBUTING FACTOR VEHICLE 3': 'contrib_factor_3',
+    'VEHICLE TYPE CODE 1': 'vehicle_type_1',
+    'VEHICLE TYPE CODE 2': 'vehicle_type_2',
+    'VEHICLE TYPE CODE 3': 'vehicle_type_3'
+}
+
+
+def read_dtypes(columns, numeric):
+    """read_csv dtype for every raw column: float64 for numeric ones, str for ids and text
+    
+    With every column declared, each chunk of a file parses exactly like a
+    full-file read, whatever values (or missing values) that chunk holds.
+    """
+    return {col: 'float64' if col in numeric else 'str' for col in columns}
+
+
+# How Script 1 cleans each city's raw file:
+#   columns        raw columns read (in this order)
+#   dtype          read_csv dtype of every raw column (read_dtypes)
+#   rename         raw -> cleaned column names
+#   date_format    crash_date format (DATE_FORMATS)
+#   time_from_date derive crash_time from crash_date (no raw time column)
+#   fill           missing value fills, by cleaned column
+#   flags          'Y'/'N' columns turned into booleans
+#   counts         columns filled with 0 and cast to int
+#   city           value of the cleaned 'city' column
+#   process_id     di_process_id prefix (the run date is appended)
+# Fill, flag and count columns use the cleaned (renamed) names.
+CITY_SCHEMAS = {
+    'Austin': {
+        'columns': AUSTIN_COLUMNS,
+        # Factor ids are mostly missing, so they read as float like a full file
+        'dtype': read_dtypes(AUSTIN_COLUMNS, [
+            'latitude', 'longitude', 'crash_speed_limit', 'crash_sev_id', 'sus_serious_injry_cnt',
+            'nonincap_injry_cnt', 'poss_injry_cnt', 'non_injry_cnt', 'tot_injry_cnt', 'death_cnt',
+            'contrib_factr_p1_id', 'contrib_factr_p2_id', 'pedestrian_death_count',
+            'pedestrian_serious_injury_count', 'motor_vehicle_death_count', 'motor_vehicle_serious_injury_count',
+            'bicycle_death_count', 'bicycle_serious_injury_count', 'motorcycle_death_count',
+            'motorcycle_serious_injury_count',
+        ]),
+        'rename': {},
+        'date_format': DATE_FORMATS['Austin'],
+        'time_from_date': False,
+        'fill': {
+            'crash_time': '00:00:00', 'latitude': 0, 'longitude': 0, 'street_name': 'UNKNOWN',
+            'contrib_factr_p1_id': 'UNKNOWN', 'contrib_factr_p2_id': 'UNKNOWN',
+        },
+        'flags': ['crash_fatal_fl', 'pedestrian_fl', 'motor_vehicle_fl', 'motorcycle_fl', 'bicycle_fl'],
+        'counts': [
+            'sus_serious_injry_cnt', 'nonincap_injry_cnt', 'poss_injry_cnt',
+            'non_injry_cnt', 'tot_injry_cnt', 'death_cnt',
+            'pedestrian_death_count', 'pedestrian_serious_injury_count',
+            'motor_vehicle_death_count', 'motor_vehicle_serious_injury_count',
+            'bicycle_death_count', 'bicycle_serious_injury_count',
+            'motorcycle_death_count', 'motorcycle_serious_injury_count'
+        ],
+        'city': 'Austin',
+        'process_id': 'AUSTIN_CLEAN',
+    },
+    'Chicago': {
+        'columns': CHICAGO_COLUMNS,
+        'dtype': read_dtypes(CHICAGO_COLUMNS, [
+            'POSTED_SPEED_LIMIT', 'STREET_NO', 'NUM_UNITS', 'INJURIES_TOTAL', 'INJURIES_FATAL',
+            'INJURIES_INCAPACITATING', 'INJURIES_NON_INCAPACITATING', 'INJURIES_REPORTED_NOT_EVIDENT',
+            'INJURIES_NO_INDICATION', 'CRASH_HOUR', 'CRASH_DAY_OF_WEEK', 'CRASH_MONTH', 'LATITUDE', 'LONGITUDE',
+        ]),
+        'rename': {col: col.lower() for col in CHICAGO_COLUMNS},
+        'date_format': DATE_FORMATS['Chicago'],
+        'time_from_date': True,
+        'fill': {
+            'latitude': 0, 'longitude': 0, 'street_name': 'UNKNOWN', 'street_direction': '',
+            'weather_condition': 'UNKNOWN', 'lighting_condition': 'UNKNOWN', 'roadway_surface_cond': 'UNKNOWN',
+            'device_condition': 'UNKNOWN', 'traffic_control_device': 'UNKNOWN', 'road_defect': 'UNKNOWN',
+            'prim_contributory_cause': 'UNKNOWN', 'sec_contributory_cause': 'UNKNOWN',
+            'crash_type': 'UNKNOWN', 'damage': 'UNKNOWN', 'most_severe_injury': 'NO INDICATION OF INJURY',
+        },
+        'flags': [],
+        'counts': [
+            'street_no', 'injuries_total', 'injuries_fatal', 'injuries_incapacitating',
+            'injuries_non_incapacitating', 'injuries_reported_not_evident', 'injuries_no_indication'
+        ],
+        'city': 'Chicago',
+        'process_id': 'CHICAGO_CLEAN',
+    },
+    'NYC': {
+        'columns': list(NYC_RENAMES),
+        # Zip codes are mixed text/numbers, so they stay text
+        'dtype': read_dtypes(NYC_RENAMES, [
+            'LATITUDE', 'LONGITUDE', 'NUMBER OF PERSONS INJURED', 'NUMBER OF PERSONS KILLED',
+            'NUMBER OF PEDESTRIANS INJURED', 'NUMBER OF PEDESTRIANS KILLED', 'NUMBER OF CYCLIST INJURED',
+            'NUMBER OF CYCLIST KILLED', 'NUMBER OF MOTORIST INJURED', 'NUMBER OF MOTORIST KILLED',
+        ]),
+        'rename': NYC_RENAMES,
+        'date_format': DATE_FORMATS['NYC'],
+        'time_from_date': False,
+        'fill': {
+            'crash_time': '00:00', 'latitude': 0, 'longitude': 0, 'street_name': 'UNKNOWN',
+            'cross_street_name': '', 'off_street_name': '', 'borough': 'UNKNOWN', 'zip_code': '00000',
+            'contrib_factor_1': 'Unspecified', 'contrib_factor_2': 'Unspecified',
+            'contrib_factor_3': 'Unspecified', 'vehicle_type_1': 'UNKNOWN', 'vehicle_type_2': 'UNKNOWN',
+            'vehicle_type_3': 'UNKNOWN',
+        },
+        'flags': [],
+        'counts': [
+            'persons_injured', 'persons_killed', 'pedestrians_injured', 'pedestrians_killed',
+            'cyclists_injured', 'cyclists_killed', 'motorists_injured', 'motorists_killed'
+        ],
+        'city': 'NewYork',
+        'process_id': 'NYC_CLEAN',
+    },
+}
+
+DEFAULT_DATA_DIR = os.environ.get(
+    'COLLISION_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Data'))
+
+# Stages the runner knows, in the order they run
+STAGES = ['clean', 'validate', 'combine', 'bridge', 'rollups', 'hotspots', 'star', 'load_db']
+
+# How Script 2 builds the master file: in memory, or chunk by chunk with an
+# external sort within memory_mb
+BACKENDS = ['memory', 'out_of_core']
+
+# --format choices of the scripts and the runner -> config formats
+FORMAT_CHOICES = {'parquet': ['parquet'], 'csv': ['csv'], 'both': ['parquet', 'csv'],
+                  'partitioned': ['partitioned']}
+
+# File names are relative to data_dir unless absolute; cleaned files get the
+# extension of each output format
+DEFAULT_CONFIG = {
+    'data_dir': DEFAULT_DATA_DIR,
+    'cities': {
+        'Austin': {'raw': 'Austin_Raw.csv', 'cleaned': 'Austin_Cleaned.csv'},
+        'Chicago': {'raw': 'Chicago_Raw.csv', 'cleaned': 'Chicago_Cleaned.csv'},
+        'NYC': {'raw': 'NYC_Raw.csv', 'cleaned': 'NYC_Cleaned.csv'},
+    },
+    'outputs': {
+        'master': 'Vehicle_Collisions_Master.csv',
+        'bridge': 'Contributing_Factor_Bridge.csv',
+        'rollups': 'Rollups',
+        'hotspots': 'Collision_Hotspots.csv',
+        'warehouse': 'Warehouse',
+        'state': 'pipeline_state.json',
+        'cache': '.stage_cache',
+        'quality': 'Quality_Report.json',
+        'summary': 'Summary_Stats.parquet',
+    },
+    'schemas': CITY_SCHEMAS,
+    'stages': ['clean', 'validate', 'combine'],
+    'formats': ['parquet'],
+    'start_year': 2022,
+    'end_year': 2024,
+    'workers': 1,
+    'chunksize': None,
+    'shards': {'NYC': 1},
+    'incremental': False,
+    'full_refresh': False,
+    'database': None,
+    'db_engine': 'sqlite',
+    'batch_size': DEFAULT_BATCH_SIZE,
+    'backend': 'memory',
+    'memory_mb': DEFAULT_MEMORY_MB,
+    'spill_dir': None,
+    'cache': False,
+    'cache_mb': DEFAULT_CACHE_MB,
+    'cache_key': 'mtime',
+    'quality_limits': {},
+    'quality_strict': False,
+}
+
+
+def _merge(base, overrides):
+    """Nested dicts are merged key by key, anything else is replaced"""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_config(path=None, **overrides):
+    """The default config, updated from a JSON file and then from overrides
+    
+    Overrides set to None are ignored, so unset command-line options keep
+    the file or default value. Raises ValueError for an unknown stage or a
+    city without a schema, and for an unknown backend or cache key mode.
+    """
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if path:
+        with open(path) as f:
+            _merge(config, json.load(f))
+    _merge(config, {key: value for key, value in overrides.items() if value is not None})
+    
+    unknown = [stage for stage in config['stages'] if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {unknown}; expected some of {STAGES}")
+    if config['backend'] not in BACKENDS:
+        raise ValueError(f"Unknown backend {config['backend']!r}; expected one of {BACKENDS}")
+    if config['cache_key'] not in KEY_MODES:
+        raise ValueError(f"Unknown cache key {config['cache_key']!r}; expected one of {KEY_MODES}")
+    missing = [city for city in config['cities'] if city not in config['schemas']]
+    if missing:
+        raise ValueError(f"No schema for city(s) {missing}")
+    return config
+
+
+def data_path(config, name):
+    """Absolute path of a configured file name"""
+    return os.path.abspath(os.path.join(config['data_dir'], name))
+
+
+def city_paths(config):
+    """{city: (raw file, cleaned file)} for every configured city"""
+    return {city: (data_path(config, files['raw']), data_path(config, files['cleaned']))
+            for city, files in config['cities'].items()}
+
+
+def output_path(config, name):
+    """Path of one of the configured outputs ('master', 'bridge', ...)"""
+    return data_path(config, config['outputs'][name])
@@ -0,0 +1,137 @@
+"""
+Date and time parsing layer
+Explicit per-city formats, with repeated timestamp strings parsed once
+(unique values first, then mapped back to every row)
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.config import DATE_FORMATS
+
+# crash_date as written to the cleaned CSV exports by Script 1
+CLEANED_DATE_FORMAT = '%Y-%m-%d'
+
+_TIME_PATTERN = r'^\s*(\d{1,2}):(\d{2})(?::(\d{2}))?\s*$'
+
+
+@lru_cache(maxsize=None)
+def _time_of_day():
+    """'HH:MM:SS' for every second of the day, indexed by seconds since midnight
+    
+    Built on first use rather than at import, where it cost ~0.2s.
+    """
+    return np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)], dtype=object)
+
+
+def _to_datetime64(values, fmt):
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+    return pd.DatetimeIndex(parsed).as_unit('ns').to_numpy().copy()
+
+
+def _map_uniques(codes, parsed, index, name, missing):
+    """Expand per-unique results back to one value per row (-1 codes are missing)"""
+    result = np.full(len(codes), missing, dtype=parsed.dtype)
+    valid = codes >= 0
+    result[valid] = parsed[codes[valid]]
+    return pd.Series(result, index=index, name=name)
+
+
+def parse_dates(values, fmt=None):
+    """Parse date strings with a known format, parsing each distinct value once
+    
+    Values that do not match fmt are retried with pandas' format inference,
+    and anything still unparseable becomes NaT (errors='coerce', as before).
+    Already-parsed datetime columns are returned unchanged.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    
+    codes, uniques = pd.factorize(values)
+    parsed = _to_datetime64(uniques, fmt)
+    if fmt is not None:
+        missed = np.isnat(parsed)
+        if missed.any():
+            parsed[missed] = _to_datetime64(uniques[missed], None)
+    
+    return _map_uniques(codes, parsed, values.index, values.name, np.datetime64('NaT', 'ns'))
+
+
+def format_time_of_day(timestamps):
+    """'HH:MM:SS' strings for a datetime column through a lookup table (NaT -> NaN)"""
+    seconds = timestamps.dt.hour * 3600 + timestamps.dt.minute * 60 + timestamps.dt.second
+    valid = seconds.notna().to_numpy()
+    result = np.full(len(seconds), np.nan, dtype=object)
+    result[valid] = _time_of_day()[seconds.to_numpy()[valid].astype(np.int64)]
+    return pd.Series(result, index=timestamps.index, name=timestamps.name)
+
+
+def hour_from_time(values):
+    """Hour of day from 'H:MM', 'HH:MM' or 'HH:MM:SS' time strings
+    
+    Each distinct time string is parsed once. Invalid or missing times give
+    NaN, like pd.to_datetime(..., errors='coerce').dt.hour.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.hour
+    
+    codes, uniques = pd.factorize(values)
+    parts = pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.extract(_TIME_PATTERN)
+    hour, minute, second = (pd.to_numeric(parts[i]) for i in range(3))
+    valid = hour.between(0, 23) & minute.between(0, 59) & (second.isna() | second.between(0, 59))
+    hours = hour.where(valid).to_numpy(dtype=float)
+    
+    return _map_uniques(codes, hours, values.index, 'crash_hour', np.nan)
+
+
+def benchmark_parsing(rows=200_000, seed=0):
+    """Time the cached parsers against the original pd.to_datetime calls
+    
+    Builds rows random crash timestamps rendered in each city's raw format
+    and returns a DataFrame of seconds per approach. The NYC time row also
+    shows how many 'HH:MM' values the old '%H:%M:%S' parse turned into NaT.
+    """
+    import time
+    import warnings
+    
+    rng = np.random.default_rng(seed)
+    stamps = pd.Timestamp('2014-01-01') + pd.to_timedelta(rng.integers(0, 3650 * 86400, rows), unit='s')
+    samples = {
+        'Austin': pd.Series(stamps.strftime('%Y-%m-%dT00:00:00.000')),
+        'Chicago': pd.Series(stamps.strftime('%m/%d/%Y %I:%M:%S %p')),
+        'NYC': pd.Series(stamps.strftime('%m/%d/%Y')),
+    }
+    
+    def timed(func):
+        start = time.perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = func()
+        return result, round(time.perf_counter() - start, 3)
+    
+    results = []
+    for city, values in samples.items():
+        legacy, legacy_s = timed(lambda: pd.to_datetime(values, errors='coerce'))
+        cached, cached_s = timed(lambda: parse_dates(values, DATE_FORMATS[city]))
+        assert (legacy.to_numpy(dtype='datetime64[ns]') == cached.to_numpy()).all()
+        results.append({'step': f'{city} crash_date', 'original_s': legacy_s, 'cached_s': cached_s, 'missing_before': 0, 'missing_after': 0})
+    
+    parsed = parse_dates(samples['Chicago'], DATE_FORMATS['Chicago'])
+    legacy, legacy_s = timed(lambda: parsed.dt.strftime('%H:%M:%S'))
+    cached, cached_s = timed(lambda: format_time_of_day(parsed))
+    assert legacy.equals(cached)
+    results.append({'step': 'Chicago crash_time', 'original_s': legacy_s, 'cached_s': cached_s, 'missing_before': 0, 'missing_after': 0})
+    
+    nyc_times = pd.Series(stamps.strftime('%H:%M').str.lstrip('0').str.replace(r'^:', '0:', regex=True))
+    legacy, legacy_s = timed(lambda: pd.to_datetime(nyc_times, format='%H:%M:%S', errors='coerce').dt.hour)
+    cached, cached_s = timed(lambda: hour_from_time(nyc_times))
+    results.append({'step': 'NYC crash_hour', 'original_s': legacy_s, 'cached_s': cached_s,
+                    'missing_before': int(legacy.isna().sum()), 'missing_after': int(cached.isna().sum())})
+    
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(benchmark_parsing().to_string(index=False))
@@ -0,0 +1,116 @@
+"""
+Vectorized derived fields
+Season, time period and Y/N flag columns computed with lookup tables and
+np.select instead of per-row Python lambdas
+"""
+
+import numpy as np
+import pandas as pd
+
+SEASONS = ['Winter', 'Spring', 'Summer', 'Fall']
+
+TIME_PERIODS = ['Early Morning', 'Morning', 'Afternoon', 'Evening', 'Night']
+
+# Season code for months 0-12; anything else (including NaN) falls through to Fall
+_SEASON_BY_MONTH = np.array([3, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0], dtype=np.int8)
+
+
+def season_from_month(month):
+    """Season for a month number (1-12) as a categorical Series
+    
+    Missing or out-of-range months map to 'Fall', as the original
+    if/else chain did.
+    """
+    values = pd.to_numeric(month, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valid = np.isfinite(values) & (values >= 1) & (values <= 12) & (values == np.floor(values))
+    codes = np.full(len(values), SEASONS.index('Fall'), dtype=np.int8)
+    codes[valid] = _SEASON_BY_MONTH[values[valid].astype(np.int64)]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=SEASONS), index=month.index, name='season')
+
+
+def time_period_from_hour(hour):
+    """Time period for an hour of day (0-23) as a categorical Series
+    
+    Missing hours fall through to 'Night', as the original if/else chain did.
+    """
+    values = pd.to_numeric(hour, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    conditions = [
+        (values >= 0) & (values < 6),
+        (values >= 6) & (values < 12),
+        (values >= 12) & (values < 17),
+        (values >= 17) & (values < 21),
+    ]
+    codes = np.select(conditions, [0, 1, 2, 3], default=TIME_PERIODS.index('Night')).astype(np.int8)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=TIME_PERIODS), index=hour.index, name='time_period')
+
+
+def flag_from_yn(values):
+    """Boolean flag from a 'Y'/'N' column; anything other than 'Y' is False"""
+    return values.eq('Y').astype(bool)
+
+
+def _legacy_season(month):
+    return month.apply(lambda x:
+        'Winter' if x in [12, 1, 2] else
+        'Spring' if x in [3, 4, 5] else
+        'Summer' if x in [6, 7, 8] else
+        'Fall'
+    )
+
+
+def _legacy_time_period(hour):
+    return hour.apply(lambda x:
+        'Early Morning' if 0 <= x < 6 else
+        'Morning' if 6 <= x < 12 else
+        'Afternoon' if 12 <= x < 17 else
+        'Evening' if 17 <= x < 21 else
+        'Night'
+    )
+
+
+def _legacy_flag(values):
+    return values.apply(lambda x: True if x == 'Y' else False)
+
+
+def verify_against_legacy(rows=1_000_000, seed=0):
+    """Check the vectorized fields against the original lambdas
+    
+    Runs both on random inputs plus the edge cases (NaN months and hours,
+    hour boundaries, non Y/N flags) and returns a DataFrame of timings.
+    Raises AssertionError on the first mismatch.
+    """
+    import time
+    
+    rng = np.random.default_rng(seed)
+    month = pd.Series(rng.integers(1, 13, rows), dtype=float)
+    hour = pd.Series(rng.integers(0, 24, rows), dtype=float)
+    month[rng.random(rows) < 0.01] = np.nan
+    hour[rng.random(rows) < 0.01] = np.nan
+    month = pd.concat([month, pd.Series([np.nan, 0, 12, 13, 1.0])], ignore_index=True)
+    hour = pd.concat([hour, pd.Series([np.nan, 0, 5.5, 6, 11.99, 12, 17, 21, 23, -1, 24])], ignore_index=True)
+    flags = pd.Series(rng.choice(np.array(['Y', 'N', None], dtype=object), rows))
+    
+    checks = [
+        ('season', month, season_from_month, _legacy_season),
+        ('time_period', hour, time_period_from_hour, _legacy_time_period),
+        ('flag', flags, flag_from_yn, _legacy_flag),
+    ]
+    results = []
+    for name, values, fast, legacy in checks:
+        start = time.perf_counter()
+        expected = legacy(values)
+        legacy_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = fast(values)
+        fast_seconds = time.perf_counter() - start
+        
+        mismatched = (actual.astype(object) != expected.astype(object)).sum()
+        assert mismatched == 0, f"{name}: {mismatched:,} values differ from the original lambda"
+        results.append({'field': name, 'rows': len(values), 'lambda_s': round(legacy_seconds, 3),
+                        'vectorized_s': round(fast_seconds, 3)})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(verify_against_legacy().to_string(index=False))
+    print("✓ Vectorized fields match the original lambdas")
@@ -0,0 +1,174 @@
+"""
+External sort for frames larger than memory
+Frames are buffered up to a memory budget, sorted and spilled to Parquet
+runs, then the runs are merged back in key order a block at a time, so a
+master file of 10M+ rows can be ordered by ['crash_date', 'city'] without
+ever holding it in memory
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.config import DEFAULT_MEMORY_MB
+from collision_etl.intermediate import _pyarrow
+
+# Rough in-memory size of one standardized master row, used to size read chunks
+ROW_BYTES_ESTIMATE = 600
+
+
+def frame_mb(df):
+    """In-memory size of a frame in MB"""
+    return df.memory_usage(deep=True, index=False).sum() / 1e6
+
+
+def rows_for_budget(memory_mb, share=1/8, row_bytes=ROW_BYTES_ESTIMATE):
+    """Rows of about share of memory_mb, for read chunk sizes"""
+    return max(10_000, int(memory_mb * 1e6 * share / row_bytes))
+
+
+def _sort_keys(df, by):
+    """Key frame for ordering like df.sort_values(by): datetimes as int64
+    with NaT last, numbers with NaN last, everything else as text"""
+    keys = {}
+    for i, col in enumerate(by):
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            ints = values.to_numpy(dtype='datetime64[ns]').view('int64').copy()
+            ints[values.isna().to_numpy()] = np.iinfo(np.int64).max
+            keys[i] = ints
+        elif pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            keys[i] = values.to_numpy(dtype=float, na_value=np.inf)
+        else:
+            keys[i] = values.astype(str).to_numpy(dtype=object)
+    return pd.DataFrame(keys, index=df.index)
+
+
+def _at_most(keys, bound):
+    """Mask of key rows that sort at or before the bound tuple"""
+    before = np.zeros(len(keys), dtype=bool)
+    equal = np.ones(len(keys), dtype=bool)
+    for i, value in enumerate(bound):
+        column = keys[i].to_numpy()
+        before |= equal & (column < value)
+        equal &= column == value
+    return before | equal
+
+
+def _spillable(df):
+    """Frame Parquet can store: mixed-type text columns (e.g. int and str
+    ids of different cities) become text, like they print in a CSV"""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+class ExternalSorter:
+    """Sort a stream of frames by columns within a memory budget
+    
+    add() buffers frames and spills a sorted run to a Parquet file whenever
+    the buffer passes half of memory_mb; merged() then yields the rows of
+    every run in key order, in blocks. Ties keep the order they were added
+    in. Runs live in a temporary directory (under spill_dir when given)
+    that is removed on close().
+    """
+    
+    def __init__(self, by, memory_mb=DEFAULT_MEMORY_MB, spill_dir=None):
+        self.by = list(by)
+        self.memory_mb = memory_mb
+        self.directory = tempfile.mkdtemp(prefix='external_sort_', dir=spill_dir)
+        self.runs = []
+        self.rows = 0
+        self._pending = []
+        self._pending_mb = 0.0
+    
+    def add(self, df):
+        if df.empty:
+            return
+        self._pending.append(df)
+        self._pending_mb += frame_mb(df)
+        self.rows += len(df)
+        if self._pending_mb >= self.memory_mb / 2:
+            self._spill()
+    
+    def _spill(self):
+        if not self._pending:
+            return
+        pa = _pyarrow()
+        df = pd.concat(self._pending, ignore_index=True)
+        self._pending, self._pending_mb = [], 0.0
+        order = _sort_keys(df, self.by).sort_values(list(range(len(self.by))), kind='mergesort').index
+        df = _spillable(df.take(order))
+        path = os.path.join(self.directory, f"run{len(self.runs):05d}.parquet")
+        pa.parquet.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+        self.runs.append(path)
+    
+    def merged(self, block_rows=None):
+        """Yield the sorted rows in blocks of roughly block_rows
+        
+        Each run is read in batches of block_rows / runs rows, so about one
+        block per run plus the output block is in memory at a time.
+        """
+        self._spill()
+        if not self.runs:
+            return
+        pa = _pyarrow()
+        block_rows = block_rows or rows_for_budget(self.memory_mb, share=1/4)
+        batch_rows = max(1_000, block_rows // len(self.runs))
+        
+        readers = [pa.parquet.ParquetFile(run).iter_batches(batch_size=batch_rows) for run in self.runs]
+        buffers = [None] * len(readers)
+        keys = [None] * len(readers)
+        offsets = [0] * len(readers)
+        # Run index and row position within the run break ties, so equal keys
+        # come out in the order they were added, whatever the batch boundaries
+        ties = [len(self.by), len(self.by) + 1]
+        
+        def refill(i):
+            batch = next(readers[i], None)
+            if batch is None:
+                buffers[i], keys[i] = None, None
+            else:
+                buffers[i] = batch.to_pandas()
+                keys[i] = _sort_keys(buffers[i], self.by)
+                keys[i][ties[0]] = i
+                keys[i][ties[1]] = np.arange(offsets[i], offsets[i] + len(buffers[i]))
+                offsets[i] += len(buffers[i])
+        
+        for i in range(len(readers)):
+            refill(i)
+        
+        while any(buffer is not None for buffer in buffers):
+            # No unread row sorts before the smallest last key of the buffered
+            # batches, so every buffered row up to it can be written out
+            bound = min(tuple(keys[i].iloc[-1]) for i in range(len(readers)) if buffers[i] is not None)
+            
+            taken, taken_keys = [], []
+            for i, buffer in enumerate(buffers):
+                if buffer is None:
+                    continue
+                count = int(_at_most(keys[i], bound).sum())
+                if count:
+                    taken.append(buffer.iloc[:count])
+                    taken_keys.append(keys[i].iloc[:count])
+                    buffers[i], keys[i] = buffer.iloc[count:], keys[i].iloc[count:]
+                if buffers[i].empty:
+                    refill(i)
+            
+            block = pd.concat(taken, ignore_index=True)
+            order = pd.concat(taken_keys, ignore_index=True).sort_values(list(range(len(self.by) + 2))).index
+            yield block.take(order).reset_index(drop=True)
+    
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
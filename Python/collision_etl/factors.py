@@ -0,0 +1,178 @@
+"""
+Contributing-factor normalization
+Maps each city's contributing-factor values to the common Code/Description
+taxonomy in 'Contributing Factors/*_Factors.csv'. The files are read once
+into a compact key -> code lookup, and columns are mapped per distinct value
+(categorical remap) instead of per row.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+FACTORS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Contributing Factors')
+
+# File and key column per city; Austin's key column holds the description
+# and its raw values are the numeric codes themselves
+FACTOR_FILES = {
+    'Austin': ('Austin_Factors.csv', 'Austin'),
+    'Chicago': ('Chicago_Factors.csv', 'Chicago'),
+    'NYC': ('NYC_Factors.csv', 'New York'),
+}
+
+# Fill values from Script 1 that mean "no factor recorded", not an unmapped value
+MISSING_FACTORS = {'', 'UNKNOWN', 'NA', 'NAN'}
+
+_WHITESPACE = re.compile(r'\s+')
+_FLOAT_ID = re.compile(r'^(\d+)\.0*$')
+
+
+def normalize_key(value):
+    """Lookup key for a factor value: trimmed, single-spaced, upper case
+    
+    Numeric ids written as floats by Script 1 ('23.0') become '23'.
+    """
+    key = _WHITESPACE.sub(' ', str(value)).strip().upper()
+    return _FLOAT_ID.sub(r'\1', key)
+
+
+def factor_files(directory=FACTORS_DIR):
+    """Paths of the three factor files, e.g. as stage cache inputs"""
+    return [os.path.join(directory, file_name) for file_name, _ in FACTOR_FILES.values()]
+
+
+def _read_factor_file(path):
+    table = pd.read_csv(path, sep=';', dtype=str, encoding='utf-8-sig', keep_default_na=False)
+    table.columns = table.columns.str.strip()
+    return table.apply(lambda col: col.str.strip())
+
+
+@lru_cache(maxsize=None)
+def load_factor_lookup(directory=FACTORS_DIR):
+    """Read the three factor files into (keys, descriptions)
+    
+    keys maps city -> Series of int16 codes indexed by normalized key;
+    descriptions is a Series of descriptions indexed by code. Cached, so the
+    files are read once per process.
+    """
+    keys = {}
+    descriptions = {}
+    for city, (file_name, key_column) in FACTOR_FILES.items():
+        table = _read_factor_file(os.path.join(directory, file_name))
+        table = table[table['Code'].str.fullmatch(r'\d+')]
+        codes = table['Code'].astype(np.int16)
+        
+        for code, description in zip(codes, table['Description']):
+            descriptions.setdefault(int(code), description)
+        
+        used = table[key_column] != ''
+        lookup = pd.Series(codes[used].to_numpy(), index=table.loc[used, key_column].map(normalize_key))
+        if city == 'Austin':
+            lookup = pd.concat([lookup, pd.Series(codes[used].to_numpy(), index=codes[used].astype(str).to_numpy())])
+        keys[city] = lookup[~lookup.index.duplicated()]
+    
+    return keys, pd.Series(descriptions, name='description').sort_index()
+
+
+def map_factor_codes(values, city, directory=FACTORS_DIR):
+    """Common factor codes for one city's factor column
+    
+    Each distinct value is looked up once and the result is expanded back to
+    every row through the category codes. Returns (codes, unmapped) where
+    codes is a nullable Int16 Series (<NA> for missing or unmapped values)
+    and unmapped counts the values that had no entry in the city's file.
+    """
+    keys, _ = load_factor_lookup(directory)
+    lookup = keys[city]
+    
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        row_codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        row_codes, uniques = pd.factorize(values)
+    
+    normalized = pd.Index([normalize_key(v) for v in uniques])
+    unique_codes = lookup.reindex(normalized).to_numpy(dtype=float, na_value=np.nan)
+    
+    valid = row_codes >= 0
+    result = np.full(len(values), np.nan)
+    result[valid] = unique_codes[row_codes[valid]]
+    codes = pd.Series(result, index=values.index, name=values.name).astype('Int16')
+    
+    unmatched = np.isnan(unique_codes) & ~normalized.isin(MISSING_FACTORS)
+    counts = np.bincount(row_codes[valid], minlength=len(uniques))
+    unmapped = pd.Series(counts[unmatched], index=pd.Index(uniques[unmatched], dtype=object), name=city)
+    unmapped = unmapped[unmapped > 0].sort_values(ascending=False)
+    
+    return codes, unmapped
+
+
+def factor_mask(values, keys):
+    """Boolean mask of rows whose normalized value is in keys (missing counts too)
+    
+    Computed once per distinct value, like map_factor_codes.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        row_codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        row_codes, uniques = pd.factorize(values)
+    
+    matched = np.array([normalize_key(v) in keys for v in uniques], dtype=bool)
+    mask = np.ones(len(values), dtype=bool)
+    valid = row_codes >= 0
+    mask[valid] = matched[row_codes[valid]]
+    return mask
+
+
+def factor_descriptions(codes, directory=FACTORS_DIR):
+    """Common description for each code in a factor code column"""
+    _, descriptions = load_factor_lookup(directory)
+    return codes.map(descriptions)
+
+
+def report_unmapped(unmapped, limit=5):
+    """Print the most frequent unmapped factor values per city"""
+    for city, counts in unmapped.items():
+        if counts.empty:
+            continue
+        print(f"    {city}: {counts.sum():,} rows with {len(counts):,} unmapped values")
+        for value, count in counts.head(limit).items():
+            print(f"      {value!r}: {count:,}")
+
+
+def benchmark_mapping(rows=2_000_000, seed=0):
+    """Time the categorical remap against a per-row dictionary lookup
+    
+    Draws rows NYC factor values (plus a few unmapped ones) and returns a
+    DataFrame of seconds per approach.
+    """
+    import time
+    
+    keys, _ = load_factor_lookup()
+    file_name, key_column = FACTOR_FILES['NYC']
+    names = list(_read_factor_file(os.path.join(FACTORS_DIR, file_name))[key_column]) + ['Not In File', '']
+    
+    rng = np.random.default_rng(seed)
+    values = pd.Series(np.array(names, dtype=object)[rng.integers(0, len(names), rows)])
+    
+    start = time.perf_counter()
+    lookup = keys['NYC'].to_dict()
+    per_row = values.apply(lambda v: lookup.get(normalize_key(v)))
+    per_row_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    codes, _ = map_factor_codes(values, 'NYC')
+    remap_s = time.perf_counter() - start
+    
+    assert (per_row.astype('Int16').fillna(-1) == codes.fillna(-1)).all()
+    return pd.DataFrame([{'rows': rows, 'per_row_s': round(per_row_s, 3), 'remap_s': round(remap_s, 3)}])
+
+
+if __name__ == "__main__":
+    keys, descriptions = load_factor_lookup()
+    for city, lookup in keys.items():
+        print(f"{city + ':':<8} {len(lookup):,} keys -> {lookup.nunique():,} codes")
+    print(f"Codes:   {len(descriptions):,}")
+    print(benchmark_mapping().to_string(index=False))
@@ -0,0 +1,96 @@
+"""
+Raw header check
+Reads only the header line of each raw CSV (standard library only, no
+pandas) and compares it with the columns the city's schema reads, so a
+renamed or misspelled column fails in milliseconds, before any city is
+loaded. Script 1 runs it before cleaning; --dry-run runs nothing else.
+"""
+
+import csv
+import difflib
+import os
+
+from collision_etl.config import city_paths
+
+
+def read_header(path):
+    """Column names on the first line of a CSV file ([] for an empty file)"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+def check_headers(config):
+    """{city: result} comparing each raw header with its schema's columns
+    
+    A result holds the raw file, whether it exists, the number of header
+    columns, the schema columns missing from the header and, for each
+    missing column, the closest header names.
+    """
+    results = {}
+    for city, (raw, _) in city_paths(config).items():
+        result = {'file': raw, 'exists': os.path.exists(raw), 'columns': 0, 'missing': [], 'suggestions': {}}
+        if result['exists']:
+            header = read_header(raw)
+            result['columns'] = len(header)
+            result['missing'] = [col for col in config['schemas'][city]['columns'] if col not in header]
+            result['suggestions'] = {col: difflib.get_close_matches(col, header, n=2, cutoff=0.6)
+                                     for col in result['missing']}
+        results[city] = result
+    return results
+
+
+def header_problems(results):
+    """One line per city whose raw file is absent or lacks a schema column"""
+    problems = []
+    for city, result in results.items():
+        if not result['exists']:
+            problems.append(f"{city}: raw file not found: {result['file']}")
+        for col in result['missing']:
+            close = result['suggestions'].get(col)
+            hint = f" (did you mean {' or '.join(repr(name) for name in close)}?)" if close else ""
+            problems.append(f"{city}: column {col!r} not in {os.path.basename(result['file'])}{hint}")
+    return problems
+
+
+def require_headers(config):
+    """Raise FileNotFoundError for an absent raw file, ValueError for a missing schema column"""
+    results = check_headers(config)
+    absent = [result['file'] for result in results.values() if not result['exists']]
+    if absent:
+        raise FileNotFoundError(f"Raw file(s) not found: {', '.join(absent)}")
+    problems = header_problems(results)
+    if problems:
+        raise ValueError("Raw header check failed:\n  " + "\n  ".join(problems))
+
+
+def print_header_check(results):
+    print("\nRaw header check:")
+    for city, result in results.items():
+        if not result['exists']:
+            status = "file not found"
+        elif result['missing']:
+            status = f"{len(result['missing'])} schema column(s) missing"
+        else:
+            status = f"ok ({result['columns']} columns)"
+        print(f"  {city + ':':<8} {status}  {result['file']}")
+    problems = header_problems(results)
+    for problem in problems:
+        print(f"  ⚠ {problem}")
+    if not problems:
+        print("  ✓ Every raw file has the columns its schema reads")
+    return not problems
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from collision_etl.config import load_config
+    
+    parser = argparse.ArgumentParser(description="Check raw CSV headers against the city schemas")
+    parser.add_argument('--config', default=None, metavar='JSON', help="pipeline config file")
+    parser.add_argument('--data-dir', default=None,
+                        help="directory of the raw files (default: $COLLISION_DATA_DIR or Data/)")
+    args = parser.parse_args()
+    
+    if not print_header_check(check_headers(load_config(args.config, data_dir=args.data_dir))):
+        raise SystemExit(1)
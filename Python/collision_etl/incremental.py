@@ -0,0 +1,183 @@
+"""
+Incremental (delta) refresh support
+Tracks which raw rows have been cleaned, per city, so a refresh only cleans
+new or changed rows and merges them into the existing cleaned and master
+outputs instead of rebuilding everything
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.intermediate import handoff_path, remove_handoff
+
+# Raw and cleaned id columns per city
+CITY_KEYS = {
+    'Austin': {'raw_id': 'crash_id', 'id': 'crash_id'},
+    'Chicago': {'raw_id': 'CRASH_RECORD_ID', 'id': 'crash_record_id'},
+    'NYC': {'raw_id': 'COLLISION_ID', 'id': 'collision_id'},
+}
+
+
+def load_state(state_file):
+    """Load the refresh state, or an empty state if there is none yet"""
+    if not os.path.exists(state_file):
+        return {'cities': {}, 'master': {}}
+    with open(state_file) as fh:
+        return json.load(fh)
+
+
+def save_state(state, state_file):
+    """Write the refresh state atomically"""
+    tmp = state_file + '.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(state, fh, indent=2, default=str)
+    os.replace(tmp, state_file)
+
+
+def delta_path(path, tag):
+    """Side file next to a cleaned output, e.g. NYC_Cleaned.delta.parquet"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tag}{ext}"
+
+
+def _hash_store_path(state_file, city):
+    return f"{os.path.splitext(state_file)[0]}_{city}_hashes.parquet"
+
+
+def _normalized_text(column):
+    """Column as trimmed text, missing values as '' and whole floats without '.0'
+    
+    read_csv infers dtypes per chunk, so the same raw value can arrive as
+    int, float or text; its normalized text is the same in every case.
+    """
+    text = column.astype(str)
+    if pd.api.types.is_float_dtype(column):
+        values = column.to_numpy(dtype=float, na_value=np.nan)
+        whole = np.isfinite(values) & (values == np.floor(values))
+        text[whole] = values[whole].astype(np.int64).astype(str)
+    return text.where(column.notna(), '').str.strip()
+
+
+def row_hashes(chunk):
+    """Fingerprint of each row from the normalized text of its columns"""
+    return pd.util.hash_pandas_object(chunk.apply(_normalized_text), index=False).to_numpy()
+
+
+class DeltaTracker:
+    """Row filter for clean_file that keeps only new or changed raw rows
+    
+    Each raw row is identified by a hash of its id and fingerprinted by a hash
+    of the normalized text of all its kept columns (row_hashes). Rows whose id was not seen before, or whose
+    fingerprint changed, pass through; everything else is dropped before the
+    city transform runs. With full_refresh every row passes and the stored
+    fingerprints are rebuilt from scratch.
+    """
+    
+    def __init__(self, city, state_file, full_refresh=False):
+        self.city = city
+        self.state_file = state_file
+        self.raw_id = CITY_KEYS[city]['raw_id']
+        self.previous = pd.Series(dtype=np.uint64)
+        store = _hash_store_path(state_file, city)
+        if not full_refresh and os.path.exists(store):
+            hashes = pd.read_parquet(store)
+            self.previous = pd.Series(hashes['row_hash'].to_numpy(), index=hashes['id_hash'].to_numpy())
+        self.seen_ids = []
+        self.seen_hashes = []
+        self.new_rows = 0
+        self.changed_rows = 0
+        self.rows = 0
+    
+    def __call__(self, chunk):
+        id_hash = pd.util.hash_array(_normalized_text(chunk[self.raw_id]).to_numpy(dtype=object))
+        row_hash = row_hashes(chunk)
+        self.seen_ids.append(id_hash)
+        self.seen_hashes.append(row_hash)
+        self.rows += len(chunk)
+        
+        positions = self.previous.index.get_indexer(id_hash) if len(self.previous) else np.full(len(chunk), -1)
+        new = positions < 0
+        changed = ~new
+        changed[~new] = self.previous.to_numpy()[positions[~new]] != row_hash[~new]
+        self.new_rows += int(new.sum())
+        self.changed_rows += int(changed.sum())
+        return chunk[new | changed]
+    
+    @property
+    def selected(self):
+        return self.new_rows + self.changed_rows
+    
+    def commit(self, state):
+        """Persist fingerprints of every raw row seen and update the city state"""
+        ids = np.concatenate(self.seen_ids) if self.seen_ids else np.array([], dtype=np.uint64)
+        hashes = np.concatenate(self.seen_hashes) if self.seen_hashes else np.array([], dtype=np.uint64)
+        pd.DataFrame({'id_hash': ids, 'row_hash': hashes}).drop_duplicates('id_hash', keep='last') \
+            .to_parquet(_hash_store_path(self.state_file, self.city), index=False)
+        
+        state['cities'].setdefault(self.city, {}).update({
+            'raw_rows': self.rows,
+            'new_rows': self.new_rows,
+            'changed_rows': self.changed_rows,
+            'last_run': datetime.now().isoformat(timespec='seconds'),
+        })
+
+
+def drop_keys(existing, key_rows, keys):
+    """Drop rows of existing whose key columns appear in key_rows (compared as text)"""
+    existing_keys = pd.MultiIndex.from_frame(existing[keys].astype(str))
+    drop = pd.MultiIndex.from_frame(key_rows[keys].astype(str))
+    return existing[~existing_keys.isin(drop)]
+
+
+def replace_rows(existing, rows, keys):
+    """Drop rows of existing whose keys appear in rows, then append rows"""
+    return pd.concat([drop_keys(existing, rows, keys), rows], ignore_index=True)
+
+
+def merge_rows(target_file, rows_file, id_column, formats=('parquet',), keep_rows=False):
+    """Merge a cleaned delta into a cleaned output, replacing rows by id
+    
+    Both paths follow CleanedWriter naming (extension swapped per format).
+    If the target does not exist yet the delta simply becomes the target.
+    CSV is merged as text so existing values are rewritten unchanged; a
+    partitioned target only rewrites the partitions the delta touches. The
+    delta file is removed afterwards unless keep_rows is set.
+    """
+    for fmt in formats:
+        target = handoff_path(target_file, fmt)
+        rows = handoff_path(rows_file, fmt)
+        if not os.path.exists(target):
+            if not keep_rows:
+                os.replace(rows, target)
+            elif fmt == 'partitioned':
+                shutil.copytree(rows, target)
+            else:
+                shutil.copyfile(rows, target)
+            continue
+        
+        if fmt == 'partitioned':
+            from collision_etl.partitions import read_partitioned, replace_partitioned
+            replace_partitioned(target, read_partitioned(rows), [id_column])
+        elif fmt == 'csv':
+            existing = pd.read_csv(target, dtype=str, keep_default_na=False)
+            delta = pd.read_csv(rows, dtype=str, keep_default_na=False)
+            replace_rows(existing, delta, [id_column]).to_csv(target, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            import pyarrow.parquet as pq
+            
+            existing = pq.read_table(target)
+            delta = pq.read_table(rows).cast(existing.schema)
+            keep = pc.invert(pc.is_in(existing[id_column], value_set=delta[id_column].combine_chunks()))
+            merged = pa.concat_tables([existing.filter(keep), delta])
+            tmp = target + '.tmp'
+            pq.write_table(merged, tmp)
+            os.replace(tmp, target)
+        if not keep_rows:
+            remove_handoff(rows)
@@ -0,0 +1,149 @@
+"""
+Stage timing and memory instrumentation
+Wraps pipeline stage functions to record wall time, CPU time, how far each
+stage raised the process's peak RSS, an optional tracemalloc peak and rows in/out, collects the records into a
+JSON run report and can dump a cProfile file per stage
+"""
+
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / 1e6 if sys.platform == 'darwin' else peak / 1e3, 1)
+
+
+def count_rows(value):
+    """Rows in a stage argument or result: frames, row counts from chunked
+    cleaners and tuples of either; None when there is nothing to count"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (tuple, list)):
+        counts = [count_rows(v) for v in value if isinstance(v, (pd.DataFrame, pd.Series))]
+        return sum(counts) if counts else None
+    return None
+
+
+def measure(name, func, *args, trace_memory=False, profile_dir=None, **kwargs):
+    """Call func(*args, **kwargs) and return (result, stage record)"""
+    rows_in = count_rows([a for a in list(args) + list(kwargs.values()) if isinstance(a, (pd.DataFrame, pd.Series))])
+    
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+        traced_before = tracemalloc.get_traced_memory()[0]
+    
+    # ru_maxrss only ever grows, so a stage's own footprint is how far it
+    # raised the process peak; 0 means it stayed under an earlier stage's peak
+    rss_before = peak_rss_mb()
+    profiler = cProfile.Profile() if profile_dir else None
+    started = datetime.now()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler:
+        profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        if profiler:
+            profiler.disable()
+        wall_s, cpu_s = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    
+    record = {
+        'stage': name,
+        'started': started.isoformat(timespec='seconds'),
+        'wall_s': round(wall_s, 3),
+        'cpu_s': round(cpu_s, 3),
+        'rss_growth_mb': None if rss_before is None else round(peak_rss_mb() - rss_before, 1),
+        'process_peak_rss_mb': peak_rss_mb(),
+        'rows_in': rows_in,
+        'rows_out': count_rows(result),
+        'pid': os.getpid(),
+    }
+    if trace_memory:
+        record['tracemalloc_peak_mb'] = round((tracemalloc.get_traced_memory()[1] - traced_before) / 1e6, 1)
+        if started_tracing:
+            tracemalloc.stop()
+    if profiler:
+        os.makedirs(profile_dir, exist_ok=True)
+        record['profile'] = os.path.join(profile_dir, f"{name}.prof")
+        profiler.dump_stats(record['profile'])
+    
+    return result, record
+
+
+class RunReport:
+    """Stage records for one script run
+    
+    Stages are added by wrapped functions (wrap), by measure calls
+    through run(), or from records measured in worker processes (add).
+    """
+    
+    def __init__(self, name, trace_memory=False, profile_dir=None):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = []
+    
+    def add(self, record):
+        self.stages.append(record)
+    
+    def run(self, name, func, *args, **kwargs):
+        """Call func as a named stage and return its result"""
+        result, record = measure(name, func, *args, trace_memory=self.trace_memory,
+                                 profile_dir=self.profile_dir, **kwargs)
+        self.add(record)
+        return result
+    
+    def wrap(self, func, name=None):
+        """func wrapped so every call is recorded as a stage"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(name or func.__name__, func, *args, **kwargs)
+        return wrapper
+    
+    def to_dict(self):
+        return {
+            'run': self.name,
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_s': round(time.perf_counter() - self._start, 3),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': self.stages,
+        }
+    
+    def write(self, path):
+        """Write the run report as JSON and return the path"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+    
+    def print_summary(self):
+        print(f"\nStage timings:")
+        for record in self.stages:
+            rows = record['rows_out'] if record['rows_out'] is not None else '-'
+            rows = f"{rows:,}" if isinstance(rows, int) else rows
+            print(f"  {record['stage']:<28} {record['wall_s']:>8.2f}s wall {record['cpu_s']:>8.2f}s cpu"
+                  f"  {rows:>11} rows out")
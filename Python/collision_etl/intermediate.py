@@ -0,0 +1,335 @@
+"""
+Cleaned-data handoff between Script 1 and Script 2
+Cleaned city frames are written as typed Parquet (categoricals, int, bool
+and datetime dtypes preserved), with CSV kept as an optional export and a
+city=/year= partitioned Parquet directory (collision_etl.partitions) as an
+alternative to the single file
+"""
+
+import os
+import time
+import pandas as pd
+
+from collision_etl.schema import CLEANED_CATEGORICALS
+
+FORMATS = ('parquet', 'csv', 'partitioned')
+
+def _pyarrow():
+    """Import pyarrow lazily, with a clear message when it is missing"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet handoff needs pyarrow (pip install pyarrow), "
+                          "or use the csv format") from e
+    return pyarrow
+
+
+def handoff_path(path, fmt):
+    """Swap a cleaned file's extension for the given format
+    
+    The partitioned format is a directory named like the file without an
+    extension, e.g. Austin_Cleaned/city=Austin/year=2023/part-00000.parquet.
+    """
+    if fmt == 'partitioned':
+        return os.path.splitext(path)[0]
+    return os.path.splitext(path)[0] + '.' + fmt
+
+
+def remove_handoff(path):
+    """Remove a handoff file or partitioned directory if it exists"""
+    if os.path.isdir(path):
+        import shutil
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+# Date part columns stored as int32 (null for an unparsed date), whether a
+# chunk holds them as int or, after a missing date, as float
+HANDOFF_INTEGERS = ['year', 'month', 'day']
+
+
+def to_handoff_dtypes(df):
+    """Convert a cleaned frame to the typed dtypes stored in the handoff
+    
+    crash_date goes back to datetime64, columns in CLEANED_CATEGORICALS (or
+    already categorical) become categoricals of their text whatever dtype the
+    chunk read them as, and any other text column becomes a string column.
+    Mixed values (e.g. Austin factor ids filled with 'UNKNOWN') are stored as
+    their CSV text, so both formats carry the same values.
+    """
+    df = df.copy()
+    if 'crash_date' in df.columns:
+        df['crash_date'] = pd.to_datetime(df['crash_date'])
+    
+    for col in df.columns:
+        if col == 'crash_date':
+            continue
+        values = df[col]
+        categorical = isinstance(values.dtype, pd.CategoricalDtype)
+        if col in CLEANED_CATEGORICALS or categorical:
+            if categorical:
+                values = values.astype(object)
+            df[col] = values.where(values.isna(), values.astype(str)).astype('category')
+        elif values.dtype == object or pd.api.types.is_string_dtype(values):
+            df[col] = values.where(values.isna(), values.astype(str)).astype('string')
+    
+    return df
+
+
+def _arrow_schema(table):
+    """Arrow schema every chunk of a file is cast to
+    
+    Categorical columns (CLEANED_CATEGORICALS or dictionary-typed) become
+    dictionary<int32, string>, text and all-null columns string and the
+    HANDOFF_INTEGERS int32, so the schema does not depend on which values,
+    categories or nulls the first chunk happened to hold.
+    """
+    pa = _pyarrow()
+    fields = []
+    for field in table.schema:
+        if field.name in CLEANED_CATEGORICALS or pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif field.name in HANDOFF_INTEGERS and (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)):
+            field = field.with_type(pa.int32())
+        elif pa.types.is_large_string(field.type) or pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+
+class CleanedWriter:
+    """Write a cleaned city frame, whole or chunk by chunk, in one or more formats
+    
+    output_file is the cleaned file path; its extension is swapped for each
+    format in formats ('parquet', 'csv', 'partitioned').
+    """
+    
+    def __init__(self, output_file, formats=('parquet',)):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown output format(s): {', '.join(sorted(unknown))}")
+        self.paths = {fmt: handoff_path(output_file, fmt) for fmt in formats}
+        self.rows = 0
+        self._parquet = None
+        self._schema = None
+        self._partitioned = None
+        if 'partitioned' in self.paths:
+            from collision_etl.partitions import PartitionedWriter
+            self._partitioned = PartitionedWriter(self.paths['partitioned'])
+    
+    def write(self, df):
+        if 'csv' in self.paths:
+            df.to_csv(self.paths['csv'], mode='w' if self.rows == 0 else 'a',
+                      header=self.rows == 0, index=False)
+        if 'parquet' in self.paths:
+            pa = _pyarrow()
+            table = pa.Table.from_pandas(to_handoff_dtypes(df), preserve_index=False)
+            if self._parquet is None:
+                self._schema = _arrow_schema(table)
+                self._parquet = pa.parquet.ParquetWriter(self.paths['parquet'], self._schema)
+            self._parquet.write_table(table.cast(self._schema))
+        if self._partitioned is not None:
+            self._partitioned.write(df)
+        self.rows += len(df)
+    
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+        if self._partitioned is not None:
+            self._partitioned.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def merge_parts(part_files, output_file, formats=('parquet',)):
+    """Concatenate cleaned shard outputs in order into the final files
+    
+    part_files are the shard output paths as passed to CleanedWriter; each
+    format's part is merged into the same format of output_file and removed.
+    """
+    for fmt in formats:
+        parts = [handoff_path(part, fmt) for part in part_files]
+        target = handoff_path(output_file, fmt)
+        if fmt == 'partitioned':
+            from collision_etl.partitions import merge_partition_roots
+            merge_partition_roots(parts, target)
+            continue
+        if fmt == 'csv':
+            with open(target, 'wb') as out:
+                for i, part in enumerate(parts):
+                    with open(part, 'rb') as fh:
+                        if i > 0:
+                            fh.readline()
+                        out.write(fh.read())
+        else:
+            pa = _pyarrow()
+            writer = None
+            for part in parts:
+                table = pa.parquet.read_table(part)
+                if writer is None:
+                    schema = _arrow_schema(table)
+                    writer = pa.parquet.ParquetWriter(target, schema)
+                writer.write_table(table.cast(schema))
+            if writer is not None:
+                writer.close()
+        for part in parts:
+            os.remove(part)
+
+
+def year_filters(start_year=None, end_year=None):
+    """Parquet filter list for an inclusive year window (None when unbounded)"""
+    filters = []
+    if start_year is not None:
+        filters.append(('year', '>=', start_year))
+    if end_year is not None:
+        filters.append(('year', '<=', end_year))
+    return filters or None
+
+
+def read_cleaned(path, columns=None, start_year=None, end_year=None, chunksize=500_000):
+    """Load a cleaned city file, reading only the given columns
+    
+    The format is taken from the file extension. Parquet keeps the stored
+    dtypes; CSV is parsed with the CLEANED_CATEGORICALS columns read straight
+    into categoricals. With a year window, rows
+    outside it are dropped while reading (Parquet filters, or per CSV chunk
+    of chunksize rows) so they are never materialized. The number of rows
+    in the file before the window is kept in df.attrs['rows_loaded'].
+    A partitioned directory is read through its partitions, opening only
+    those inside the window.
+    """
+    if os.path.isdir(path):
+        from collision_etl.partitions import read_partitioned
+        return read_partitioned(path, columns, start_year, end_year)
+    
+    filters = year_filters(start_year, end_year)
+    
+    if path.endswith('.parquet'):
+        pa = _pyarrow()
+        df = pd.read_parquet(path, columns=columns, filters=filters)
+        df.attrs['rows_loaded'] = pa.parquet.ParquetFile(path).metadata.num_rows
+        return df
+    
+    categoricals = [col for col in CLEANED_CATEGORICALS if columns is None or col in columns]
+    dtype = dict.fromkeys(categoricals, 'category')
+    
+    if filters is None:
+        df = pd.read_csv(path, usecols=columns, dtype=dtype, low_memory=False)
+        df.attrs['rows_loaded'] = len(df)
+        return df
+    
+    kept = []
+    total = 0
+    with pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunksize, low_memory=False) as reader:
+        for chunk in reader:
+            total += len(chunk)
+            mask = pd.Series(True, index=chunk.index)
+            if start_year is not None:
+                mask &= chunk['year'] >= start_year
+            if end_year is not None:
+                mask &= chunk['year'] <= end_year
+            kept.append(chunk[mask])
+    df = pd.concat(kept, ignore_index=True)
+    for col in categoricals:
+        if col in df.columns:
+            # Chunks have their own dictionaries, so concat falls back to object
+            df[col] = df[col].astype('category')
+    df.attrs['rows_loaded'] = total
+    return df
+
+
+def iter_cleaned(path, columns=None, start_year=None, end_year=None, chunksize=500_000):
+    """Yield a cleaned city file in frames of up to chunksize rows
+    
+    Same columns, dtypes and year window as read_cleaned, but only one
+    chunk is in memory at a time. Parquet row groups outside the window are
+    skipped through their statistics. Frames left empty by the window are
+    not yielded.
+    """
+    if os.path.isdir(path):
+        from collision_etl.partitions import iter_partitioned
+        yield from iter_partitioned(path, columns, start_year, end_year, chunksize=chunksize)
+        return
+    
+    if path.endswith('.parquet'):
+        pa = _pyarrow()
+        import pyarrow.dataset as ds
+        
+        expression = None
+        for column, op, value in year_filters(start_year, end_year) or []:
+            term = ds.field(column) >= value if op == '>=' else ds.field(column) <= value
+            expression = term if expression is None else expression & term
+        dataset = ds.dataset(path, format='parquet')
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=chunksize):
+            if batch.num_rows:
+                yield pa.Table.from_batches([batch]).to_pandas()
+        return
+    
+    categoricals = [col for col in CLEANED_CATEGORICALS if columns is None or col in columns]
+    dtype = dict.fromkeys(categoricals, 'category')
+    with pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunksize, low_memory=False) as reader:
+        for chunk in reader:
+            mask = pd.Series(True, index=chunk.index)
+            if start_year is not None:
+                mask &= chunk['year'] >= start_year
+            if end_year is not None:
+                mask &= chunk['year'] <= end_year
+            if mask.any():
+                yield chunk[mask].reset_index(drop=True)
+
+
+def _size_bytes(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def benchmark_handoff(df, directory, columns=None):
+    """Time a write + read round trip of one cleaned frame in each format
+    
+    Returns a DataFrame with write/read seconds and file size per format,
+    reading back only the given columns when provided.
+    """
+    results = []
+    for fmt in FORMATS:
+        path = handoff_path(os.path.join(directory, 'handoff_benchmark.csv'), fmt)
+        start = time.perf_counter()
+        with CleanedWriter(path, (fmt,)) as writer:
+            writer.write(df)
+        write_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        loaded = read_cleaned(path, columns)
+        read_seconds = time.perf_counter() - start
+        
+        results.append({
+            'format': fmt,
+            'write_s': round(write_seconds, 3),
+            'read_s': round(read_seconds, 3),
+            'size_mb': round(_size_bytes(path) / 1e6, 2),
+            'memory_mb': round(loaded.memory_usage(deep=True).sum() / 1e6, 2),
+        })
+        remove_handoff(path)
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    
+    parser = argparse.ArgumentParser(description="Benchmark the CSV vs Parquet handoff on a cleaned file")
+    parser.add_argument('cleaned_file', help="a *_Cleaned.csv written by Script 1")
+    args = parser.parse_args()
+    
+    df = pd.read_csv(args.cleaned_file, low_memory=False)
+    print(f"Loaded {len(df):,} records from {args.cleaned_file}")
+    with tempfile.TemporaryDirectory() as directory:
+        print(benchmark_handoff(df, directory).to_string(index=False))
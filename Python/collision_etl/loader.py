@@ -0,0 +1,208 @@
+"""
+Bulk loader for a local SQL warehouse
+Loads cleaned city frames, the master frame or the star-schema tables into
+SQLite (built in) or DuckDB, one transaction per batch, over a small reusable
+connection pool. SQLite gets batched executemany calls; DuckDB ingests each
+batch natively as a registered Arrow table with INSERT ... SELECT. Other
+DB-API engines plug in through ENGINES.
+"""
+
+import queue
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.config import DEFAULT_BATCH_SIZE
+
+
+def sqlite_connect(database):
+    """SQLite connection set up for bulk inserts (WAL journal, relaxed syncs)"""
+    conn = sqlite3.connect(database, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def duckdb_connect(database):
+    """Import duckdb lazily, with a clear message when it is missing"""
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("The duckdb engine needs duckdb (pip install duckdb), "
+                          "or use the sqlite engine") from e
+    return duckdb.connect(database)
+
+
+# Engine name -> connect(database); both take '?' placeholders
+ENGINES = {
+    'sqlite': sqlite_connect,
+    'duckdb': duckdb_connect,
+}
+
+
+class ConnectionPool:
+    """Fixed set of open connections handed out one caller at a time
+    
+    engine is an ENGINES name or any callable returning a DB-API connection
+    for database.
+    """
+    
+    def __init__(self, database, engine='sqlite', size=2):
+        connect = ENGINES[engine] if isinstance(engine, str) else engine
+        self._idle = queue.Queue()
+        self._all = []
+        for _ in range(size):
+            conn = connect(database)
+            self._all.append(conn)
+            self._idle.put(conn)
+    
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+    
+    def close(self):
+        for conn in self._all:
+            conn.close()
+        self._all = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sql_type(dtype):
+    """Column type for a pandas dtype (DOUBLE: REAL is only 4 bytes in DuckDB)"""
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'DOUBLE'
+    return 'TEXT'
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def create_table(conn, table, df, replace=True):
+    """Create table with one column per frame column (dropping it first if replace)"""
+    columns = ', '.join(f"{_quote(col)} {sql_type(dtype)}" for col, dtype in df.dtypes.items())
+    if replace:
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({columns})")
+    conn.commit()
+
+
+def _batch_columns(batch):
+    """{column: values} as they are stored: dates as ISO text, bools as 0/1"""
+    columns = {}
+    for col, dtype in batch.dtypes.items():
+        values = batch[col]
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            values = values.dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_bool_dtype(dtype):
+            values = values.astype(np.int8)
+        columns[col] = values
+    return columns
+
+
+def _batch_rows(batch):
+    """Plain Python tuples for executemany: NaN/NaT -> None, dates -> ISO text"""
+    columns = []
+    for values in _batch_columns(batch).values():
+        values = values.astype(object)
+        columns.append(values.where(values.notna(), None).tolist())
+    return list(zip(*columns))
+
+
+def _insert_rows(conn, table, batch):
+    """Insert a batch with executemany (any DB-API connection)"""
+    placeholders = ', '.join('?' * len(batch.columns))
+    conn.executemany(f"INSERT INTO {_quote(table)} VALUES ({placeholders})", _batch_rows(batch))
+
+
+def _insert_registered(conn, table, batch):
+    """Insert a batch through DuckDB's native scan of a registered Arrow table
+    
+    Arrow turns NaN/NaT into NULL, and DuckDB reads the columns in bulk (in
+    parallel) instead of binding one parameter tuple per row.
+    """
+    from collision_etl.intermediate import _pyarrow
+    pa = _pyarrow()
+    columns = _batch_columns(batch)
+    arrow = pa.table({col: pa.array(values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype)
+                                    else values, from_pandas=True) for col, values in columns.items()})
+    names = ', '.join(_quote(col) for col in columns)
+    conn.register('_bulk_load_batch', arrow)
+    try:
+        conn.execute(f"INSERT INTO {_quote(table)} ({names}) SELECT {names} FROM _bulk_load_batch")
+    finally:
+        conn.unregister('_bulk_load_batch')
+
+
+def bulk_load(df, table, pool, batch_size=DEFAULT_BATCH_SIZE, replace=True):
+    """Insert a frame into table in batches; returns (rows, seconds)
+    
+    Each batch is committed as its own transaction, so a failure keeps every
+    batch before it. Connections that can register a frame (DuckDB) ingest it
+    natively; any other connection gets one executemany call per batch.
+    """
+    start = time.perf_counter()
+    
+    with pool.connection() as conn:
+        insert = _insert_registered if hasattr(conn, 'register') else _insert_rows
+        create_table(conn, table, df, replace)
+        for begin in range(0, len(df), batch_size):
+            try:
+                insert(conn, table, df.iloc[begin:begin + batch_size])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    return len(df), time.perf_counter() - start
+
+
+def load_tables(tables, database, engine='sqlite', batch_size=DEFAULT_BATCH_SIZE, pool_size=2):
+    """Load {table name: frame} into database; returns {name: (rows, seconds)}
+    
+    Tables load one after another: SQLite takes one writer at a time, and
+    DuckDB already spreads each INSERT ... SELECT over its own threads.
+    """
+    results = {}
+    with ConnectionPool(database, engine, pool_size) as pool:
+        for name, df in tables.items():
+            results[name] = bulk_load(df, name, pool, batch_size)
+    return results
+
+
+def benchmark_batch_sizes(rows=500_000, batch_sizes=(1_000, 10_000, 50_000, 200_000), database=':memory:', seed=0):
+    """Rows per second into SQLite for a synthetic fact-like frame at each batch size"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'accident_key': np.arange(1, rows + 1, dtype=np.int32),
+        'location_key': rng.integers(0, 10_000, rows, dtype=np.int32),
+        'date_key': rng.integers(0, 1_100, rows, dtype=np.int32),
+        'total_injuries': rng.integers(0, 5, rows, dtype=np.int16),
+        'street_name': pd.Categorical(rng.choice(['MAIN ST', 'IH 35', 'BROADWAY'], rows)),
+    })
+    
+    results = []
+    with ConnectionPool(database, 'sqlite', size=1) as pool:
+        for batch_size in batch_sizes:
+            loaded, seconds = bulk_load(df, 'bench', pool, batch_size)
+            results.append({'batch_size': batch_size, 'rows': loaded, 'seconds': round(seconds, 3),
+                            'rows_per_s': int(loaded / seconds)})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(benchmark_batch_sizes().to_string(index=False))
@@ -0,0 +1,316 @@
+"""
+Partitioned Parquet layout
+Cleaned and master frames can be written as a directory tree
+<root>/city=<city>/year=<year>/part-<n>.parquet with a _stats.json per
+partition (row count and min/max of each numeric and date column), so
+readers open only the partitions a city or year-window filter needs and
+incremental runs rewrite only the partitions a delta touches
+"""
+
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.intermediate import _arrow_schema, _pyarrow, to_handoff_dtypes
+
+PARTITION_COLUMNS = ['city', 'year']
+STATS_FILE = '_stats.json'
+NULL_PARTITION = '__null__'
+
+
+def _format_value(value):
+    if pd.isna(value):
+        return NULL_PARTITION
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        value = int(value)
+    return str(value)
+
+
+def partition_dir(root, values, by=PARTITION_COLUMNS):
+    """Directory of the partition holding rows with the given column values"""
+    return os.path.join(root, *(f"{col}={_format_value(value)}" for col, value in zip(by, values)))
+
+
+def _parse_dir(root, directory):
+    """{column: text value} from a partition directory's name"""
+    parts = os.path.relpath(directory, root).split(os.sep)
+    return dict(part.split('=', 1) for part in parts)
+
+
+def list_partitions(root, cities=None, start_year=None, end_year=None):
+    """Partition directories under root that can hold rows for the filters
+    
+    Pruning uses the directory names only, so no data file is opened.
+    Partitions with no year are skipped when a year window is given.
+    """
+    directories = sorted(os.path.dirname(path) for path in glob.glob(os.path.join(root, '*', '*', STATS_FILE)))
+    selected = []
+    for directory in directories:
+        values = _parse_dir(root, directory)
+        if cities is not None and values.get('city') not in {str(city) for city in cities}:
+            continue
+        if start_year is not None or end_year is not None:
+            year = values.get('year')
+            if year is None or year == NULL_PARTITION:
+                continue
+            if start_year is not None and int(year) < start_year:
+                continue
+            if end_year is not None and int(year) > end_year:
+                continue
+        selected.append(directory)
+    return selected
+
+
+def partition_files(directory):
+    return sorted(glob.glob(os.path.join(directory, 'part-*.parquet')))
+
+
+def _next_part(directory):
+    taken = {os.path.basename(path) for path in partition_files(directory)}
+    n = 0
+    while f"part-{n:05d}.parquet" in taken:
+        n += 1
+    return os.path.join(directory, f"part-{n:05d}.parquet")
+
+
+def _column_stats(df):
+    """{column: [min, max]} for numeric, boolean and datetime columns"""
+    stats = {}
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype) or not (
+                pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+            continue
+        values = values.dropna()
+        if values.empty:
+            continue
+        stats[col] = [values.min(), values.max()]
+    return stats
+
+
+def _combine_stats(stats, update):
+    for col, (low, high) in update.items():
+        if col in stats:
+            low, high = min(stats[col][0], low), max(stats[col][1], high)
+        stats[col] = [low, high]
+    return stats
+
+
+def _json_value(value):
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def write_stats(directory, rows, columns):
+    """Write a partition's row count and column min/max"""
+    stats = {'rows': int(rows),
+             'columns': {col: [_json_value(low), _json_value(high)] for col, (low, high) in columns.items()}}
+    tmp = os.path.join(directory, STATS_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(stats, f, indent=2)
+    os.replace(tmp, os.path.join(directory, STATS_FILE))
+
+
+def read_stats(directory):
+    with open(os.path.join(directory, STATS_FILE)) as f:
+        return json.load(f)
+
+
+def dataset_stats(root):
+    """One row per partition with its values, row count and column min/max"""
+    rows = []
+    for directory in list_partitions(root):
+        stats = read_stats(directory)
+        row = _parse_dir(root, directory)
+        row['rows'] = stats['rows']
+        for col, (low, high) in stats['columns'].items():
+            row[f"{col}_min"], row[f"{col}_max"] = low, high
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def total_rows(root):
+    """Rows in every partition, from the stats files"""
+    return sum(read_stats(directory)['rows'] for directory in list_partitions(root))
+
+
+class PartitionedWriter:
+    """Write frames, whole or chunk by chunk, into a partitioned dataset
+    
+    Rows are split by the partition columns and appended to one part file
+    per partition; the partition stats are written on close(). The root is
+    cleared first, like overwriting a single output file.
+    """
+    
+    def __init__(self, root, by=PARTITION_COLUMNS):
+        self.root = root
+        self.by = list(by)
+        self.rows = 0
+        self._writers = {}
+        self._stats = {}
+        self._schema = None
+        if os.path.exists(root):
+            shutil.rmtree(root)
+        os.makedirs(root)
+    
+    def write(self, df):
+        pa = _pyarrow()
+        typed = to_handoff_dtypes(df)
+        for values, positions in typed.groupby(self.by, dropna=False, observed=True, sort=False).indices.items():
+            values = values if isinstance(values, tuple) else (values,)
+            part = typed.iloc[positions]
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            if self._schema is None:
+                self._schema = _arrow_schema(table)
+            directory = partition_dir(self.root, values, self.by)
+            if directory not in self._writers:
+                os.makedirs(directory, exist_ok=True)
+                self._writers[directory] = pa.parquet.ParquetWriter(_next_part(directory), self._schema)
+                self._stats[directory] = [0, {}]
+            self._writers[directory].write_table(table.cast(self._schema))
+            self._stats[directory][0] += len(part)
+            _combine_stats(self._stats[directory][1], _column_stats(part))
+        self.rows += len(df)
+    
+    def close(self):
+        for directory, writer in self._writers.items():
+            writer.close()
+            write_stats(directory, *self._stats[directory])
+        self._writers = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_directories(directories, columns=None):
+    _pyarrow()
+    import pyarrow.dataset as ds
+    files = [path for directory in directories for path in partition_files(directory)]
+    if not files:
+        return None
+    return ds.dataset(files, format='parquet').to_table(columns=columns)
+
+
+def read_partitioned(root, columns=None, start_year=None, end_year=None, cities=None):
+    """Load the partitions of a dataset that match the filters
+    
+    Only the matching partitions' files are opened. The number of rows in
+    the whole dataset is kept in df.attrs['rows_loaded'], like read_cleaned.
+    """
+    table = _read_directories(list_partitions(root, cities, start_year, end_year), columns)
+    if table is None:
+        df = pd.DataFrame(columns=columns or [])
+    else:
+        df = table.to_pandas()
+    df.attrs['rows_loaded'] = total_rows(root)
+    return df
+
+
+def iter_partitioned(root, columns=None, start_year=None, end_year=None, cities=None, chunksize=500_000):
+    """Yield the matching partitions of a dataset in frames of up to chunksize rows"""
+    pa = _pyarrow()
+    import pyarrow.dataset as ds
+    files = [path for directory in list_partitions(root, cities, start_year, end_year)
+             for path in partition_files(directory)]
+    if not files:
+        return
+    for batch in ds.dataset(files, format='parquet').to_batches(columns=columns, batch_size=chunksize):
+        if batch.num_rows:
+            yield pa.Table.from_batches([batch]).to_pandas()
+
+
+def _key_text(df, keys):
+    text = df[keys[0]].astype(str)
+    for key in keys[1:]:
+        text = text + '\x1f' + df[key].astype(str)
+    return text
+
+
+def rewrite_partition(directory, df):
+    """Replace a partition's files with df (or remove it when df is empty)"""
+    pa = _pyarrow()
+    old = partition_files(directory)
+    if df.empty:
+        shutil.rmtree(directory, ignore_errors=True)
+        return
+    os.makedirs(directory, exist_ok=True)
+    if 'crash_date' in df.columns:
+        df = df.sort_values('crash_date', kind='mergesort')
+    typed = to_handoff_dtypes(df)
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+    target = _next_part(directory)
+    pa.parquet.write_table(table.cast(_arrow_schema(table)), target)
+    for path in old:
+        os.remove(path)
+    write_stats(directory, len(typed), _column_stats(typed))
+
+
+def replace_partitioned(root, rows, keys, drop=None, by=PARTITION_COLUMNS):
+    """Replace rows by key in a partitioned dataset, rewriting only the
+    partitions that gain rows or hold a replaced key
+    
+    Existing rows whose keys appear in drop (default: rows) are removed and
+    rows are added. Keys are compared as text. Returns the number of
+    partitions rewritten.
+    """
+    drop = rows[keys] if drop is None else drop
+    drop_keys = set(_key_text(drop, keys))
+    
+    affected = {}
+    for values, positions in rows.groupby(by, dropna=False, observed=True, sort=False).indices.items():
+        values = values if isinstance(values, tuple) else (values,)
+        affected[partition_dir(root, values, by)] = rows.iloc[positions]
+    
+    # Only the key columns are read to find partitions holding replaced rows
+    for directory in list_partitions(root):
+        if directory in affected:
+            continue
+        table = _read_directories([directory], keys)
+        if table is not None and _key_text(table.to_pandas(), keys).isin(drop_keys).any():
+            affected[directory] = rows.iloc[:0]
+    
+    for directory, added in affected.items():
+        table = _read_directories([directory]) if os.path.isdir(directory) else None
+        if table is None:
+            merged = added
+        else:
+            existing = table.to_pandas()
+            kept = existing[~_key_text(existing, keys).isin(drop_keys).to_numpy()]
+            merged = pd.concat([kept, added], ignore_index=True) if len(added) else kept
+        rewrite_partition(directory, merged)
+    return len(affected)
+
+
+def merge_partition_roots(part_roots, root):
+    """Move the partitions of shard outputs into one dataset, in order"""
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root)
+    for part_root in part_roots:
+        for directory in list_partitions(part_root):
+            target = os.path.join(root, os.path.relpath(directory, part_root))
+            os.makedirs(target, exist_ok=True)
+            for path in partition_files(directory):
+                os.replace(path, _next_part(target))
+            stats = read_stats(directory)
+            if os.path.exists(os.path.join(target, STATS_FILE)):
+                previous = read_stats(target)
+                stats['rows'] += previous['rows']
+                for col, (low, high) in previous['columns'].items():
+                    if col in stats['columns']:
+                        stats['columns'][col] = [min(stats['columns'][col][0], low),
+                                                 max(stats['columns'][col][1], high)]
+                    else:
+                        stats['columns'][col] = [low, high]
+            write_stats(target, stats['rows'], stats['columns'])
+        shutil.rmtree(part_root)
@@ -0,0 +1,114 @@
+"""
+Pipeline runner
+Runs Script 1 (cleaning) and Script 2 (combining) from one config, so the
+pipeline can run on any machine or extract without editing the scripts:
+paths, city schemas, stages, formats, year window and parallelism all come
+from collision_etl.config, a JSON config file and the command line.
+pandas and the stage libraries are only imported once a stage runs, so
+--help and --dry-run return immediately.
+"""
+
+import importlib
+import os
+import time
+
+from collision_etl.config import DEFAULT_CACHE_MB, FORMAT_CHOICES, KEY_MODES, STAGES, load_config
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCRIPT_MODULES = {'clean': 'collision_etl.cleaning', 'combine': 'collision_etl.combining'}
+
+
+def load_script(key):
+    """The library module of Script 1 ('clean') or Script 2 ('combine'), imported on first use"""
+    return importlib.import_module(SCRIPT_MODULES[key])
+
+
+def run_pipeline(config, report=None):
+    """Run the stages in config['stages'] and return {script: result}
+    
+    'clean' runs Script 1 for every configured city, 'validate' checks the
+    cleaned files (collision_etl.validation) and any other stage runs
+    Script 2, which also performs the optional stages it lists.
+    """
+    stages = config['stages']
+    results = {}
+    start = time.perf_counter()
+    
+    if 'clean' in stages:
+        results['clean'] = load_script('clean').run_clean(config, report)
+    
+    if 'validate' in stages:
+        from collision_etl.validation import run_validate
+        results['validate'] = run_validate(config, report)
+    
+    if any(stage not in ('clean', 'validate') for stage in stages):
+        results['combine'] = load_script('combine').run_combine(config, report)
+    
+    print(f"\nPipeline stages {', '.join(stages)} finished in {time.perf_counter() - start:.1f}s")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import warnings
+    
+    parser = argparse.ArgumentParser(description="Run the vehicle collision pipeline from a config")
+    parser.add_argument('--config', default=None, metavar='JSON',
+                        help="pipeline config file; command-line options override it")
+    parser.add_argument('--data-dir', default=None,
+                        help="directory of the raw, cleaned and output files (default: $COLLISION_DATA_DIR or Data/)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=None,
+                        help="stages to run, e.g. clean combine star (default: clean validate combine)")
+    parser.add_argument('--format', choices=sorted(FORMAT_CHOICES), default=None,
+                        help="cleaned handoff format; Script 2 reads the first one (default: parquet)")
+    parser.add_argument('--start-year', type=int, default=None, help="first year in the master file (default: 2022)")
+    parser.add_argument('--end-year', type=int, default=None, help="last year in the master file (default: 2024)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes cleaning cities concurrently (default: 1)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="stream each raw file in chunks of this many rows (default: load whole file)")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="build the master file chunk by chunk with an external sort")
+    parser.add_argument('--memory-mb', type=int, default=None,
+                        help="with --out-of-core, memory budget in MB (default: 2,048)")
+    parser.add_argument('--strict-quality', action='store_true',
+                        help="stop before combining when a validate check is over its limit")
+    parser.add_argument('--cache', action='store_true',
+                        help="reuse cleaned files and master frames from the stage cache when unchanged")
+    parser.add_argument('--cache-mb', type=int, default=None,
+                        help=f"with --cache, evict least recently used entries past this size (default: {DEFAULT_CACHE_MB:,})")
+    parser.add_argument('--cache-key', choices=KEY_MODES, default=None,
+                        help="with --cache, fingerprint input files by mtime and size or by content (default: mtime)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="clean and merge only new or changed raw rows")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="with --incremental, rebuild everything and the refresh state")
+    parser.add_argument('--load-db', default=None, metavar='DATABASE',
+                        help="database for the load_db stage")
+    parser.add_argument('--report', default=None, metavar='JSON',
+                        help="write a JSON run report with per-stage time, memory and row counts")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="with --report, also record each stage's tracemalloc peak (slower)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="only check each raw CSV header against its schema's columns, then exit")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+    
+    config = load_config(
+        args.config, data_dir=args.data_dir, stages=args.stages, formats=FORMAT_CHOICES.get(args.format),
+        start_year=args.start_year, end_year=args.end_year, workers=args.workers, chunksize=args.chunksize,
+        incremental=args.incremental or None, full_refresh=args.full_refresh or None, database=args.load_db,
+        backend='out_of_core' if args.out_of_core else None, memory_mb=args.memory_mb,
+        cache=args.cache or None, cache_mb=args.cache_mb, cache_key=args.cache_key,
+        quality_strict=args.strict_quality or None)
+    
+    if args.dry_run:
+        from collision_etl.headers import check_headers, print_header_check
+        raise SystemExit(0 if print_header_check(check_headers(config)) else 1)
+    
+    from collision_etl.instrumentation import RunReport
+    report = RunReport('pipeline', args.trace_memory) if args.report else None
+    run_pipeline(config, report)
+    if report:
+        report.print_summary()
+        print(f"\nReport: {report.write(args.report)}")
@@ -0,0 +1,68 @@
+"""
+Pre-aggregated rollups for Tableau
+Groups crashes over city x year x month x time_period x season x
+contributing_factor_1 once, then derives each coarser rollup from that cube
+instead of re-grouping every crash. Each rollup is a small extract that
+covers the full history within the Tableau Public cell limit.
+"""
+
+import os
+
+TABLEAU_CELL_LIMIT = 15_000_000
+
+CUBE_DIMENSIONS = ['city', 'year', 'month', 'time_period', 'season', 'contributing_factor_1']
+
+# Rollup name -> grouping columns (all drawn from CUBE_DIMENSIONS)
+ROLLUPS = {
+    'Rollup_City_Year_Month': ['city', 'year', 'month'],
+    'Rollup_City_Year_TimePeriod': ['city', 'year', 'time_period'],
+    'Rollup_City_Year_Season': ['city', 'year', 'season'],
+    'Rollup_City_Year_Factor': ['city', 'year', 'contributing_factor_1'],
+    'Rollup_Cube': CUBE_DIMENSIONS,
+}
+
+MEASURES = ['crashes', 'fatal_crashes', 'total_injuries', 'total_deaths', 'total_casualties']
+
+
+def build_cube(master):
+    """Counts and sums for every combination of CUBE_DIMENSIONS present in master
+    
+    Missing dimension values (e.g. an unparsed year or month) form their own
+    groups, so every crash is counted.
+    """
+    grouped = master.groupby(CUBE_DIMENSIONS, observed=True, sort=True, dropna=False)
+    cube = grouped.agg(
+        crashes=('total_injuries', 'size'),
+        fatal_crashes=('has_fatality', 'sum'),
+        total_injuries=('total_injuries', 'sum'),
+        total_deaths=('total_deaths', 'sum'),
+        total_casualties=('total_casualties', 'sum'),
+    ).reset_index()
+    return cube
+
+
+def rollup(cube, dimensions):
+    """Sum the cube's measures up to the given dimensions"""
+    return cube.groupby(dimensions, observed=True, sort=True, dropna=False)[MEASURES].sum().reset_index()
+
+
+def build_rollups(master, rollups=ROLLUPS):
+    """{name: rollup frame} for a master frame with the calculated fields"""
+    cube = build_cube(master)
+    return {name: cube if dims == CUBE_DIMENSIONS else rollup(cube, dims) for name, dims in rollups.items()}
+
+
+def cell_usage(df):
+    """(cells, percent of the Tableau Public limit) for one extract"""
+    cells = len(df) * len(df.columns)
+    return cells, cells / TABLEAU_CELL_LIMIT * 100
+
+
+def write_rollups(tables, directory):
+    """Write each rollup to <directory>/<name>.csv; returns {name: path}"""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, table in tables.items():
+        paths[name] = os.path.join(directory, name + '.csv')
+        table.to_csv(paths[name], index=False)
+    return paths
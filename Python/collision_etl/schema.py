@@ -0,0 +1,145 @@
+"""
+Categorical schema for the pipeline's repetitive text columns
+Declares which columns are dictionary-encoded and builds one shared
+dictionary per master column across the three cities, so combining the
+cities keeps the categorical dtype instead of falling back to object
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Cleaned-file columns stored and loaded as categoricals
+CLEANED_CATEGORICALS = [
+    'city', 'month_name', 'di_process_id', 'crash_time', 'street_name',
+    # Austin
+    'contrib_factr_p1_id', 'contrib_factr_p2_id',
+    # Chicago
+    'traffic_control_device', 'device_condition', 'weather_condition',
+    'lighting_condition', 'first_crash_type', 'trafficway_type', 'alignment',
+    'roadway_surface_cond', 'road_defect', 'crash_type', 'damage',
+    'prim_contributory_cause', 'sec_contributory_cause', 'street_direction',
+    'most_severe_injury',
+    # NYC
+    'borough', 'zip_code', 'cross_street_name', 'off_street_name',
+    'contrib_factor_1', 'contrib_factor_2', 'contrib_factor_3',
+    'vehicle_type_1', 'vehicle_type_2', 'vehicle_type_3',
+]
+
+# Master dataset columns that share one dictionary across cities
+MASTER_CATEGORICALS = [
+    'city', 'crash_time', 'month_name', 'street_name',
+    'contributing_factor_1', 'contributing_factor_2', 'weather_condition',
+]
+
+
+def shared_dtype(*columns, extra=()):
+    """CategoricalDtype whose categories are the sorted union of the columns' values
+    
+    Categories are sorted so that sorting by a categorical column orders rows
+    the same way as sorting the plain strings.
+    """
+    values = set(extra)
+    for column in columns:
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            used = np.unique(column.cat.codes[column.cat.codes >= 0])
+            values.update(column.cat.categories[used])
+        else:
+            values.update(column.dropna().unique())
+    return pd.CategoricalDtype(sorted(str(v) for v in values))
+
+
+def as_category(column, dtype):
+    """Cast a column to a shared CategoricalDtype, keeping its text values"""
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.where(column.isna(), column.astype(str))
+    else:
+        column = column.cat.rename_categories([str(c) for c in column.cat.categories])
+    return column.astype(dtype)
+
+
+def unify_categoricals(frames, columns=MASTER_CATEGORICALS):
+    """Give each column one shared dictionary across frames (in place)
+    
+    After this, pd.concat(frames) keeps the categorical dtype for columns.
+    """
+    for col in columns:
+        present = [df for df in frames if col in df.columns]
+        if not present:
+            continue
+        dtype = shared_dtype(*(df[col] for df in present))
+        for df in present:
+            df[col] = as_category(df[col], dtype)
+    return frames
+
+
+class SharedCategories:
+    """One dictionary for a categorical column filled frame by frame
+    
+    encode() returns int32 codes of a column (or a constant) into the
+    dictionary, adding the values it has not seen; finish() sorts the
+    dictionary like shared_dtype and remaps the codes array in place. The
+    result equals unify_categoricals + concat without holding the frames.
+    """
+    
+    def __init__(self):
+        self.codes = {}
+    
+    def encode(self, values, rows):
+        """int32 codes of values (a Series or a scalar repeated rows times); -1 is missing"""
+        if not isinstance(values, pd.Series):
+            code = -1 if pd.isna(values) else self.codes.setdefault(str(values), len(self.codes))
+            return np.full(rows, code, dtype=np.int32)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            row_codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            used = np.zeros(len(uniques), dtype=bool)
+            used[row_codes[row_codes >= 0]] = True
+        else:
+            row_codes, uniques = pd.factorize(values)
+            used = np.ones(len(uniques), dtype=bool)
+        lookup = np.full(len(uniques), -1, dtype=np.int32)
+        for i in np.flatnonzero(used):
+            lookup[i] = self.codes.setdefault(str(uniques[i]), len(self.codes))
+        return np.where(row_codes >= 0, lookup[row_codes], -1).astype(np.int32)
+    
+    def finish(self, codes):
+        """Categorical over the sorted dictionary from the filled codes (remapped in place)"""
+        categories = sorted(self.codes)
+        rank = np.empty(len(categories), dtype=np.int32)
+        rank[[self.codes[value] for value in categories]] = np.arange(len(categories), dtype=np.int32)
+        valid = codes >= 0
+        codes[valid] = rank[codes[valid]]
+        return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+
+
+def fill_category(column, fill, replace=('',)):
+    """Replace the given values and missing values with fill
+    
+    Works on both object and categorical columns; for a categorical the fill
+    value is added to the dictionary when needed.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        if fill not in column.cat.categories:
+            column = column.cat.add_categories([fill])
+        column = column.mask(column.isin(replace), fill).fillna(fill)
+        return column
+    return column.replace(list(replace), fill).fillna(fill)
+
+
+def object_memory(column):
+    """Bytes a column would take as Python object strings (like deep memory_usage)"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(column.cat.categories))
+        sizes = np.array([sys.getsizeof(c) for c in column.cat.categories], dtype=np.int64)
+        return 8 * len(column) + int((counts * sizes).sum()) + int((codes < 0).sum()) * sys.getsizeof(np.nan)
+    return int(column.memory_usage(deep=True, index=False))
+
+
+def memory_report(df):
+    """(actual MB, MB if every categorical were object strings) for a frame"""
+    actual = df.memory_usage(deep=True, index=False).sum()
+    as_object = sum(object_memory(df[col]) if isinstance(df[col].dtype, pd.CategoricalDtype)
+                    else df[col].memory_usage(deep=True, index=False) for col in df.columns)
+    return actual / 1e6, as_object / 1e6
@@ -0,0 +1,181 @@
+"""
+Spatial grid index and hotspot aggregation
+Assigns crashes to fixed-size latitude/longitude grid cells with array math,
+precomputes per-cell counts, injuries and deaths by city/year/time_period,
+and serves bounding-box lookups from the cell-sorted table
+"""
+
+import numpy as np
+import pandas as pd
+
+# Cell edge in degrees (about 550 m north-south)
+CELL_SIZE = 0.005
+
+MISSING_CELL = -1
+
+HOTSPOT_KEYS = ['grid_cell', 'city', 'year', 'time_period']
+
+
+def _columns(cell_size):
+    return int(round(360 / cell_size))
+
+
+def valid_coordinates(latitude, longitude):
+    """Mask of usable coordinates; 0 is the cleaners' fill value, so it counts as missing"""
+    lat = np.asarray(latitude, dtype=float)
+    lon = np.asarray(longitude, dtype=float)
+    return (np.isfinite(lat) & np.isfinite(lon) & (lat != 0) & (lon != 0)
+            & (np.abs(lat) <= 90) & (np.abs(lon) <= 180))
+
+
+def _row_col(latitude, longitude, cell_size):
+    rows = np.floor((np.asarray(latitude, dtype=float) + 90) / cell_size).astype(np.int64)
+    cols = np.floor((np.asarray(longitude, dtype=float) + 180) / cell_size).astype(np.int64)
+    return rows, np.clip(cols, 0, _columns(cell_size) - 1)
+
+
+def assign_cells(latitude, longitude, cell_size=CELL_SIZE):
+    """Grid cell id per crash (row * columns + col), MISSING_CELL without coordinates"""
+    valid = valid_coordinates(latitude, longitude)
+    lat = np.where(valid, latitude, 0.0)
+    lon = np.where(valid, longitude, 0.0)
+    rows, cols = _row_col(lat, lon, cell_size)
+    return np.where(valid, rows * _columns(cell_size) + cols, MISSING_CELL)
+
+
+def cell_centers(cells, cell_size=CELL_SIZE):
+    """(latitude, longitude) of each cell's center; NaN for MISSING_CELL"""
+    cells = np.asarray(cells, dtype=np.int64)
+    rows, cols = np.divmod(cells, _columns(cell_size))
+    lat = (rows + 0.5) * cell_size - 90
+    lon = (cols + 0.5) * cell_size - 180
+    missing = cells == MISSING_CELL
+    return np.where(missing, np.nan, lat), np.where(missing, np.nan, lon)
+
+
+def hotspot_table(master, cell_size=CELL_SIZE):
+    """Crashes, injuries and deaths per (grid_cell, city, year, time_period)
+    
+    Crashes without coordinates are left out. The table is sorted by
+    grid_cell, which HotspotIndex relies on, and carries each cell's center.
+    """
+    cells = assign_cells(master['latitude'], master['longitude'], cell_size)
+    located = cells != MISSING_CELL
+    frame = pd.DataFrame({
+        'grid_cell': cells[located],
+        'city': master['city'].to_numpy()[located],
+        'year': master['year'].to_numpy()[located],
+        'time_period': master['time_period'].to_numpy()[located],
+        'total_injuries': master['total_injuries'].to_numpy()[located],
+        'total_deaths': master['total_deaths'].to_numpy()[located],
+    })
+    
+    table = frame.groupby(HOTSPOT_KEYS, observed=True, sort=True).agg(
+        crashes=('total_injuries', 'size'),
+        total_injuries=('total_injuries', 'sum'),
+        total_deaths=('total_deaths', 'sum'),
+    ).reset_index()
+    
+    lat, lon = cell_centers(table['grid_cell'], cell_size)
+    table.insert(1, 'cell_latitude', lat)
+    table.insert(2, 'cell_longitude', lon)
+    return table
+
+
+class HotspotIndex:
+    """Bounding-box lookups over a hotspot table sorted by grid_cell
+    
+    Cell ids run along grid rows, so a box is one contiguous id range per
+    grid row; each range is found with a binary search on the sorted ids.
+    """
+    
+    def __init__(self, table, cell_size=CELL_SIZE):
+        self.table = table.reset_index(drop=True)
+        self.cell_size = cell_size
+        self._cells = self.table['grid_cell'].to_numpy(dtype=np.int64)
+        self._columns = _columns(cell_size)
+        self._measures = self.table[['crashes', 'total_injuries', 'total_deaths']].to_numpy(dtype=np.int64)
+        self._filters = {col: self.table[col].to_numpy() for col in ['city', 'year', 'time_period']}
+    
+    @classmethod
+    def from_master(cls, master, cell_size=CELL_SIZE):
+        return cls(hotspot_table(master, cell_size), cell_size)
+    
+    def positions(self, min_lat, min_lon, max_lat, max_lon, **filters):
+        """Row positions in the table for cells overlapping the box
+        
+        filters narrow the result by city, year or time_period.
+        """
+        (row_lo, row_hi), (col_lo, col_hi) = _row_col([min_lat, max_lat], [min_lon, max_lon], self.cell_size)
+        grid_rows = np.arange(row_lo, row_hi + 1) * self._columns
+        starts = np.searchsorted(self._cells, grid_rows + col_lo, side='left')
+        ends = np.searchsorted(self._cells, grid_rows + col_hi, side='right')
+        
+        spans = ends - starts
+        if spans.sum() == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(spans) + spans, spans)
+        positions = np.arange(spans.sum()) + offsets
+        
+        for col, value in filters.items():
+            if value is not None:
+                positions = positions[self._filters[col][positions] == value]
+        return positions
+    
+    def query(self, min_lat, min_lon, max_lat, max_lon, **filters):
+        """Hotspot rows for cells overlapping the box"""
+        return self.table.iloc[self.positions(min_lat, min_lon, max_lat, max_lon, **filters)]
+    
+    def totals(self, min_lat, min_lon, max_lat, max_lon, **filters):
+        """Total crashes, injuries and deaths inside the box"""
+        sums = self._measures[self.positions(min_lat, min_lon, max_lat, max_lon, **filters)].sum(axis=0)
+        return dict(zip(['crashes', 'total_injuries', 'total_deaths'], sums.tolist()))
+    
+    def top_cells(self, limit=10, by='crashes', **filters):
+        """The limit cells with the most crashes (or injuries/deaths), summed over the filters"""
+        table = self.table
+        for col, value in filters.items():
+            if value is not None:
+                table = table[table[col] == value]
+        cells = table.groupby(['grid_cell', 'cell_latitude', 'cell_longitude'], sort=False)[
+            ['crashes', 'total_injuries', 'total_deaths']].sum()
+        return cells.nlargest(limit, by).reset_index()
+
+
+def benchmark_lookup(rows=500_000, queries=1_000, seed=0):
+    """Build an index over rows synthetic Austin-area crashes and time box lookups
+    
+    Returns a DataFrame with the build time and the mean/max lookup time in
+    milliseconds for random boxes about 2 km across.
+    """
+    import time
+    
+    rng = np.random.default_rng(seed)
+    master = pd.DataFrame({
+        'city': 'Austin',
+        'year': rng.integers(2022, 2025, rows),
+        'time_period': rng.choice(['Early Morning', 'Morning', 'Afternoon', 'Evening', 'Night'], rows),
+        'latitude': np.where(rng.random(rows) < 0.1, 0.0, rng.normal(30.3, 0.08, rows)),
+        'longitude': np.where(rng.random(rows) < 0.1, 0.0, rng.normal(-97.7, 0.08, rows)),
+        'total_injuries': rng.integers(0, 4, rows),
+        'total_deaths': (rng.random(rows) < 0.01).astype(int),
+    })
+    
+    start = time.perf_counter()
+    index = HotspotIndex.from_master(master)
+    build_s = time.perf_counter() - start
+    
+    corners = np.column_stack([rng.normal(30.3, 0.05, queries), rng.normal(-97.7, 0.05, queries)])
+    times = []
+    for lat, lon in corners:
+        start = time.perf_counter()
+        index.totals(lat, lon, lat + 0.02, lon + 0.02, year=2023)
+        times.append(time.perf_counter() - start)
+    
+    return pd.DataFrame([{'rows': rows, 'cells': index.table['grid_cell'].nunique(), 'build_s': round(build_s, 3),
+                          'mean_lookup_ms': round(np.mean(times) * 1000, 4),
+                          'max_lookup_ms': round(np.max(times) * 1000, 4)}])
+
+
+if __name__ == "__main__":
+    print(benchmark_lookup().to_string(index=False))
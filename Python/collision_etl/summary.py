@@ -0,0 +1,228 @@
+"""
+Summary statistics service
+Crash counts and casualty sums of the master file are aggregated once into
+a small table over city x year x month x time_period x season x
+contributing_factor_1, persisted next to the master file whenever it is
+written. SummaryStats answers filtered count/sum queries from that table
+through an in-memory LRU cache, as a function interface or a local HTTP
+endpoint, so print_summary-style numbers need no pipeline run.
+"""
+
+import functools
+import json
+import os
+
+import pandas as pd
+
+from collision_etl.intermediate import _pyarrow
+from collision_etl.rollups import CUBE_DIMENSIONS, MEASURES, build_cube
+
+# Master columns the summary table is built from
+SUMMARY_COLUMNS = CUBE_DIMENSIONS + ['has_fatality', 'total_injuries', 'total_deaths', 'total_casualties']
+
+# Query filter name -> summary column
+FILTERS = {
+    'city': 'city',
+    'year': 'year',
+    'month': 'month',
+    'time_period': 'time_period',
+    'season': 'season',
+    'factor': 'contributing_factor_1',
+}
+
+DEFAULT_PORT = 8765
+
+
+def build_summary(master):
+    """Counts and sums per combination of CUBE_DIMENSIONS, keeping missing values as a group
+    
+    Measures are int64 whatever the width of the master's count columns.
+    """
+    return build_cube(master).astype(dict.fromkeys(MEASURES, 'int64'))
+
+
+def combine_summaries(summaries):
+    """One summary table from summaries of separate blocks of the master file"""
+    summaries = [summary for summary in summaries if len(summary)]
+    if not summaries:
+        return pd.DataFrame(columns=CUBE_DIMENSIONS + MEASURES)
+    combined = pd.concat(summaries, ignore_index=True)
+    return combined.groupby(CUBE_DIMENSIONS, sort=True, dropna=False)[MEASURES].sum().reset_index()
+
+
+def save_summary(summary, path):
+    """Write a summary table as Parquet (atomically, so readers never see half a file)"""
+    pa = _pyarrow()
+    summary = summary.copy()
+    for col in CUBE_DIMENSIONS:
+        if summary[col].dtype == object or isinstance(summary[col].dtype, pd.CategoricalDtype):
+            summary[col] = summary[col].astype('string')
+    tmp = path + '.tmp'
+    pa.parquet.write_table(pa.Table.from_pandas(summary, preserve_index=False), tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def _values(value):
+    """Filter value(s) as a sorted tuple, so equal queries share a cache entry"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(value, key=str))
+    return (value,)
+
+
+class SummaryStats:
+    """Filtered counts and sums from a persisted summary table
+    
+    query() groups the matching rows by any of the FILTERS names and sums
+    the MEASURES; totals() returns one dict. Results are kept in an LRU
+    cache of cache_size queries, which is dropped when the table file
+    changes on disk (e.g. after Script 2 writes a new master file).
+    """
+    
+    def __init__(self, path=None, table=None, cache_size=256):
+        self.path = path
+        self._stamp = None
+        self._table = table
+        self._query = functools.lru_cache(maxsize=cache_size)(self._compute)
+        if table is None:
+            self._load()
+    
+    def _load(self):
+        stat = os.stat(self.path)
+        self._table = pd.read_parquet(self.path)
+        self._stamp = (stat.st_mtime_ns, stat.st_size)
+        self._query.cache_clear()
+    
+    def _refresh(self):
+        if self.path is None:
+            return
+        stat = os.stat(self.path)
+        if (stat.st_mtime_ns, stat.st_size) != self._stamp:
+            self._load()
+    
+    def _coerce(self, column, values):
+        """Filter values in the column's type (HTTP query values arrive as text)"""
+        if pd.api.types.is_numeric_dtype(self._table[column]):
+            return [int(value) for value in values]
+        return [str(value) for value in values]
+    
+    def _compute(self, by, measures, filters):
+        table = self._table
+        for name, values in filters:
+            column = FILTERS[name]
+            table = table[table[column].isin(self._coerce(column, values))]
+        columns = [FILTERS[name] for name in by]
+        if not columns:
+            return table[list(measures)].sum().to_frame().T.astype('int64')
+        result = table.groupby(columns, sort=True, dropna=False)[list(measures)].sum().reset_index()
+        return result.rename(columns={FILTERS[name]: name for name in by})
+    
+    def query(self, by=(), measures=MEASURES, **filters):
+        """Sum of measures for rows matching filters, grouped by the given FILTERS names
+        
+        Each filter takes one value or a list, e.g. query(['year'], city='Austin',
+        time_period=['Morning', 'Evening']).
+        """
+        unknown = (set(by) | set(filters)) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown dimension(s) {sorted(unknown)}; expected some of {sorted(FILTERS)}")
+        unknown = set(measures) - set(MEASURES)
+        if unknown:
+            raise ValueError(f"Unknown measure(s) {sorted(unknown)}; expected some of {MEASURES}")
+        self._refresh()
+        key = tuple(sorted((name, _values(value)) for name, value in filters.items() if value is not None))
+        return self._query(tuple(by), tuple(measures), key).copy()
+    
+    def totals(self, **filters):
+        """{measure: sum} for rows matching filters"""
+        return {name: int(value) for name, value in self.query(**filters).iloc[0].items()}
+    
+    def top(self, by, n=10, measure='crashes', **filters):
+        """The n largest groups of one dimension by a measure (all groups when n is None)"""
+        result = self.query([by], [measure], **filters)
+        result = result.sort_values(measure, ascending=False, kind='mergesort')
+        return (result if n is None else result.head(n)).reset_index(drop=True)
+    
+    def cache_info(self):
+        return self._query.cache_info()
+
+
+def _handler(stats):
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import parse_qs, urlparse
+    
+    class SummaryHandler(BaseHTTPRequestHandler):
+        """GET /query?by=city,year&year=2023&measures=crashes or /totals?city=Austin
+        
+        Repeat a filter for several values (factor names can hold commas).
+        """
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            by = ','.join(params.pop('by', [])).split(',') if 'by' in params else []
+            measures = ','.join(params.pop('measures')).split(',') if 'measures' in params else MEASURES
+            try:
+                if url.path == '/totals':
+                    body = stats.totals(**params)
+                elif url.path == '/query':
+                    body = json.loads(stats.query(by, measures, **params).to_json(orient='records'))
+                else:
+                    self.send_error(404, "Use /query or /totals")
+                    return
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def log_message(self, *args):
+            pass
+    
+    return SummaryHandler
+
+
+def serve(path, host='127.0.0.1', port=DEFAULT_PORT):
+    """Serve a summary table over HTTP until interrupted"""
+    from http.server import ThreadingHTTPServer
+    
+    server = ThreadingHTTPServer((host, port), _handler(SummaryStats(path)))
+    print(f"Serving {path} on http://{host}:{server.server_port}/query and /totals")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from collision_etl.config import load_config, output_path
+    
+    parser = argparse.ArgumentParser(description="Query the master file's summary statistics")
+    parser.add_argument('--config', default=None, metavar='JSON', help="pipeline config file")
+    parser.add_argument('--data-dir', default=None,
+                        help="directory of the outputs (default: $COLLISION_DATA_DIR or Data/)")
+    parser.add_argument('--summary', default=None, help="summary table (default: the config 'summary' output)")
+    parser.add_argument('--by', nargs='+', choices=sorted(FILTERS), default=[], help="dimensions to group by")
+    parser.add_argument('--measures', nargs='+', choices=MEASURES, default=MEASURES)
+    for name in FILTERS:
+        parser.add_argument(f"--{name.replace('_', '-')}", nargs='+', default=None, help=f"keep only these {name} values")
+    parser.add_argument('--serve', action='store_true', help="serve /query and /totals over HTTP instead")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    
+    path = args.summary or output_path(load_config(args.config, data_dir=args.data_dir), 'summary')
+    if args.serve:
+        serve(path, args.host, args.port)
+    else:
+        stats = SummaryStats(path)
+        filters = {name: getattr(args, name) for name in FILTERS}
+        print(stats.query(args.by, args.measures, **filters).to_string(index=False))
@@ -0,0 +1,237 @@
+"""
+Synthetic raw collision data
+Generates raw Austin, Chicago and NYC CSVs with the columns Script 1 reads,
+the raw date/time formats of each portal and the missing-value rates from
+the README profiling, at any scale (written in chunks, so 10M rows is fine)
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Date range covered by each raw file (README dataset overview)
+DATE_RANGES = {
+    'Austin': ('2014-03-01', '2024-03-31'),
+    'Chicago': ('2013-03-01', '2024-03-31'),
+    'NYC': ('2012-07-01', '2024-03-31'),
+}
+
+# Records in each real raw file (README dataset overview), used to split a
+# total benchmark size across the cities in the same proportions
+RECORD_COUNTS = {
+    'Austin': 147_750,
+    'Chicago': 817_723,
+    'NYC': 2_075_427,
+}
+
+# Bounding box (min_lat, max_lat, min_lon, max_lon) of each city
+CITY_BOXES = {
+    'Austin': (30.10, 30.52, -97.94, -97.56),
+    'Chicago': (41.64, 42.02, -87.94, -87.52),
+    'NYC': (40.50, 40.91, -74.25, -73.70),
+}
+
+STREETS = {
+    'Austin': ['IH 35', 'LAMAR BLVD', 'MOPAC EXPY', 'RIVERSIDE DR', 'CONGRESS AVE', 'BURNET RD',
+               'AIRPORT BLVD', 'SLAUGHTER LN', 'PARMER LN', 'OLTORF ST'],
+    'Chicago': ['WESTERN AVE', 'PULASKI RD', 'CICERO AVE', 'ASHLAND AVE', 'HALSTED ST', 'KEDZIE AVE',
+                'STATE ST', 'MICHIGAN AVE', 'LAKE SHORE DR', '79TH ST'],
+    'NYC': ['BROADWAY', 'ATLANTIC AVENUE', 'NORTHERN BOULEVARD', 'FLATBUSH AVENUE', 'QUEENS BOULEVARD',
+            'LINDEN BOULEVARD', '3 AVENUE', 'GRAND CONCOURSE', 'HYLAN BOULEVARD', 'JAMAICA AVENUE'],
+}
+
+CHICAGO_CATEGORIES = {
+    'TRAFFIC_CONTROL_DEVICE': ['NO CONTROLS', 'TRAFFIC SIGNAL', 'STOP SIGN/FLASHER', 'UNKNOWN'],
+    'DEVICE_CONDITION': ['NO CONTROLS', 'FUNCTIONING PROPERLY', 'UNKNOWN'],
+    'WEATHER_CONDITION': ['CLEAR', 'RAIN', 'SNOW', 'CLOUDY/OVERCAST', 'UNKNOWN'],
+    'LIGHTING_CONDITION': ['DAYLIGHT', 'DARKNESS, LIGHTED ROAD', 'DARKNESS', 'DUSK', 'DAWN'],
+    'FIRST_CRASH_TYPE': ['PARKED MOTOR VEHICLE', 'REAR END', 'SIDESWIPE SAME DIRECTION', 'TURNING', 'ANGLE'],
+    'TRAFFICWAY_TYPE': ['NOT DIVIDED', 'DIVIDED - W/MEDIAN (NOT RAISED)', 'ONE-WAY', 'FOUR WAY'],
+    'ALIGNMENT': ['STRAIGHT AND LEVEL', 'STRAIGHT ON GRADE', 'CURVE, LEVEL'],
+    'ROADWAY_SURFACE_COND': ['DRY', 'WET', 'SNOW OR SLUSH', 'UNKNOWN'],
+    'ROAD_DEFECT': ['NO DEFECTS', 'UNKNOWN', 'RUT, HOLES'],
+    'CRASH_TYPE': ['NO INJURY / DRIVE AWAY', 'INJURY AND / OR TOW DUE TO CRASH'],
+    'DAMAGE': ['OVER $1,500', '$501 - $1,500', '$500 OR LESS'],
+    'MOST_SEVERE_INJURY': ['NO INDICATION OF INJURY', 'NONINCAPACITATING INJURY', 'REPORTED, NOT EVIDENT',
+                           'INCAPACITATING INJURY', 'FATAL'],
+}
+
+NYC_VEHICLE_TYPES = ['Sedan', 'Station Wagon/Sport Utility Vehicle', 'Taxi', 'Pick-up Truck', 'Box Truck',
+                     'Bus', 'Bike', 'Motorcycle']
+
+NYC_BOROUGHS = ['BROOKLYN', 'QUEENS', 'MANHATTAN', 'BRONX', 'STATEN ISLAND']
+
+# Share of missing values per raw column (README profiling; others default to 1%)
+NULL_RATES = {
+    'Austin': {
+        'latitude': 0.93, 'longitude': 0.93, 'contrib_factr_p1_id': 0.806, 'contrib_factr_p2_id': 0.95,
+        'street_name': 0.05, 'crash_speed_limit': 0.10,
+    },
+    'Chicago': {
+        'SEC_CONTRIBUTORY_CAUSE': 0.15, 'LATITUDE': 0.007, 'LONGITUDE': 0.007, 'STREET_DIRECTION': 0.01,
+    },
+    'NYC': {
+        'BOROUGH': 0.31, 'ZIP CODE': 0.31, 'LATITUDE': 0.12, 'LONGITUDE': 0.12, 'ON STREET NAME': 0.21,
+        'CROSS STREET NAME': 0.38, 'OFF STREET NAME': 0.82, 'CONTRIBUTING FACTOR VEHICLE 1': 0.003,
+        'CONTRIBUTING FACTOR VEHICLE 2': 0.15, 'CONTRIBUTING FACTOR VEHICLE 3': 0.92,
+        'VEHICLE TYPE CODE 1': 0.006, 'VEHICLE TYPE CODE 2': 0.18, 'VEHICLE TYPE CODE 3': 0.92,
+    },
+}
+
+DEFAULT_NULL_RATE = 0.01
+
+# Columns that are never missing (ids and the crash date)
+REQUIRED = {'crash_id', 'crash_date', 'CRASH_RECORD_ID', 'CRASH_DATE', 'COLLISION_ID', 'CRASH DATE',
+            'CRASH_HOUR', 'CRASH_DAY_OF_WEEK', 'CRASH_MONTH'}
+
+
+def _factor_names(city):
+    from collision_etl.factors import FACTOR_FILES, FACTORS_DIR, _read_factor_file
+    file_name, key_column = FACTOR_FILES[city]
+    names = _read_factor_file(os.path.join(FACTORS_DIR, file_name))[key_column]
+    return np.array([name for name in names if name and name != 'NA'], dtype=object)
+
+
+def _counts(rng, rows, high=3):
+    """Casualty counts: mostly 0, sometimes 1..high"""
+    return np.where(rng.random(rows) < 0.8, 0, rng.integers(1, high + 1, rows))
+
+
+def _crash_times(rng, city, rows):
+    start, end = (pd.Timestamp(d) for d in DATE_RANGES[city])
+    minutes = int((end - start).total_seconds() // 60)
+    return start + pd.to_timedelta(rng.integers(0, minutes, rows), unit='min')
+
+
+def _coordinates(rng, city, rows):
+    min_lat, max_lat, min_lon, max_lon = CITY_BOXES[city]
+    return rng.uniform(min_lat, max_lat, rows).round(6), rng.uniform(min_lon, max_lon, rows).round(6)
+
+
+def _austin(rng, rows, first_id):
+    stamps = _crash_times(rng, 'Austin', rows)
+    lat, lon = _coordinates(rng, 'Austin', rows)
+    columns = {
+        'crash_id': np.arange(first_id, first_id + rows),
+        'crash_date': stamps.strftime('%Y-%m-%dT00:00:00.000'),
+        'crash_time': stamps.strftime('%H:%M:%S'),
+        'crash_fatal_fl': np.where(rng.random(rows) < 0.006, 'Y', 'N'),
+        'latitude': lat,
+        'longitude': lon,
+        'street_name': rng.choice(STREETS['Austin'], rows),
+        'crash_speed_limit': rng.choice([25, 30, 35, 40, 45, 55, 65], rows),
+        'crash_sev_id': rng.integers(0, 6, rows),
+        'contrib_factr_p1_id': rng.integers(1, 80, rows),
+        'contrib_factr_p2_id': rng.integers(1, 80, rows),
+    }
+    for col in ['sus_serious_injry_cnt', 'nonincap_injry_cnt', 'poss_injry_cnt', 'non_injry_cnt',
+                'tot_injry_cnt', 'pedestrian_serious_injury_count', 'motor_vehicle_serious_injury_count',
+                'bicycle_serious_injury_count', 'motorcycle_serious_injury_count']:
+        columns[col] = _counts(rng, rows)
+    for col in ['death_cnt', 'pedestrian_death_count', 'motor_vehicle_death_count', 'bicycle_death_count',
+                'motorcycle_death_count']:
+        columns[col] = (rng.random(rows) < 0.006).astype(int)
+    for col, rate in [('pedestrian_fl', 0.03), ('motor_vehicle_fl', 0.95), ('motorcycle_fl', 0.03),
+                      ('bicycle_fl', 0.01)]:
+        columns[col] = np.where(rng.random(rows) < rate, 'Y', 'N')
+    return columns
+
+
+def _chicago(rng, rows, first_id):
+    stamps = _crash_times(rng, 'Chicago', rows)
+    lat, lon = _coordinates(rng, 'Chicago', rows)
+    ids = np.arange(first_id, first_id + rows)
+    causes = _factor_names('Chicago')
+    columns = {
+        'CRASH_RECORD_ID': [f"{i:0128x}"[-128:] for i in ids],
+        'CRASH_DATE': stamps.strftime('%m/%d/%Y %I:%M:%S %p'),
+        'POSTED_SPEED_LIMIT': rng.choice([15, 20, 25, 30, 35, 40, 45], rows),
+        'PRIM_CONTRIBUTORY_CAUSE': causes[rng.integers(0, len(causes), rows)],
+        'SEC_CONTRIBUTORY_CAUSE': causes[rng.integers(0, len(causes), rows)],
+        'STREET_NO': rng.integers(1, 12000, rows),
+        'STREET_DIRECTION': rng.choice(['N', 'S', 'E', 'W'], rows),
+        'STREET_NAME': rng.choice(STREETS['Chicago'], rows),
+        'NUM_UNITS': rng.integers(1, 4, rows),
+        'CRASH_HOUR': stamps.hour,
+        'CRASH_DAY_OF_WEEK': stamps.dayofweek + 1,
+        'CRASH_MONTH': stamps.month,
+        'LATITUDE': lat,
+        'LONGITUDE': lon,
+    }
+    for col, values in CHICAGO_CATEGORIES.items():
+        columns[col] = rng.choice(values, rows)
+    for col in ['INJURIES_TOTAL', 'INJURIES_INCAPACITATING', 'INJURIES_NON_INCAPACITATING',
+                'INJURIES_REPORTED_NOT_EVIDENT', 'INJURIES_NO_INDICATION']:
+        columns[col] = _counts(rng, rows)
+    columns['INJURIES_FATAL'] = (rng.random(rows) < 0.001).astype(int)
+    return columns
+
+
+def _nyc(rng, rows, first_id):
+    stamps = _crash_times(rng, 'NYC', rows)
+    lat, lon = _coordinates(rng, 'NYC', rows)
+    factors = _factor_names('NYC')
+    columns = {
+        'COLLISION_ID': np.arange(first_id, first_id + rows),
+        'CRASH DATE': stamps.strftime('%m/%d/%Y'),
+        'CRASH TIME': pd.Series(stamps.hour.astype(str)) + stamps.strftime(':%M'),
+        'BOROUGH': rng.choice(NYC_BOROUGHS, rows),
+        'ZIP CODE': rng.integers(10001, 11698, rows).astype(str),
+        'LATITUDE': lat,
+        'LONGITUDE': lon,
+        'ON STREET NAME': rng.choice(STREETS['NYC'], rows),
+        'CROSS STREET NAME': rng.choice(STREETS['NYC'], rows),
+        'OFF STREET NAME': rng.integers(1, 999, rows).astype(str).astype(object) + ' MAIN STREET',
+    }
+    for kind in ['PERSONS', 'PEDESTRIANS', 'CYCLIST', 'MOTORIST']:
+        columns[f'NUMBER OF {kind} INJURED'] = _counts(rng, rows)
+        columns[f'NUMBER OF {kind} KILLED'] = (rng.random(rows) < 0.001).astype(int)
+    for i in (1, 2, 3):
+        columns[f'CONTRIBUTING FACTOR VEHICLE {i}'] = factors[rng.integers(0, len(factors), rows)]
+        columns[f'VEHICLE TYPE CODE {i}'] = rng.choice(NYC_VEHICLE_TYPES, rows)
+    return columns
+
+
+GENERATORS = {'Austin': _austin, 'Chicago': _chicago, 'NYC': _nyc}
+
+
+def generate_city(city, rows, columns, seed=0, first_id=1):
+    """One DataFrame of synthetic raw rows with exactly the given columns
+    
+    columns is the list a cleaner reads (CITY_SCHEMAS[city]['columns']);
+    a column the generator does not know raises KeyError, so a changed
+    column list is caught instead of silently skipped.
+    """
+    rng = np.random.default_rng(seed)
+    values = GENERATORS[city](rng, rows, first_id)
+    df = pd.DataFrame({col: values[col] for col in columns})
+    
+    rates = NULL_RATES.get(city, {})
+    for col in columns:
+        rate = 0.0 if col in REQUIRED else rates.get(col, DEFAULT_NULL_RATE)
+        if rate:
+            missing = rng.random(rows) < rate
+            df[col] = df[col].astype(object).mask(missing)
+    return df
+
+
+def split_rows(total):
+    """Split a total row count across the cities like the real files"""
+    real_total = sum(RECORD_COUNTS.values())
+    rows = {city: total * count // real_total for city, count in RECORD_COUNTS.items()}
+    rows['NYC'] += total - sum(rows.values())
+    return rows
+
+
+def write_raw(city, path, rows, columns, seed=0, chunk_rows=500_000):
+    """Write rows synthetic raw records to path in chunks; returns path"""
+    for i, start in enumerate(range(0, rows, chunk_rows)):
+        chunk = generate_city(city, min(chunk_rows, rows - start), columns, seed + i, first_id=start + 1)
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
+
+
+def null_rates(df):
+    """Observed share of missing values per column, for checking a generated file"""
+    return df.isna().mean().round(3)
@@ -0,0 +1,265 @@
+"""
+Cleaned-data quality validation
+Checks each cleaned city file in one chunked pass between Script 1 and
+Script 2: duplicate ids and duplicate crash events (same date, time and
+rounded coordinates, within and across cities), NaT dates, the sentinel
+values the cleaners fill in for missing data, and value ranges (speed
+limits, casualty counts, coordinates inside the city's bounding box).
+The counts go to a compact JSON quality report; rates above the limits
+are listed as failures.
+"""
+
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.config import city_paths, output_path
+from collision_etl.incremental import CITY_KEYS
+from collision_etl.intermediate import handoff_path, iter_cleaned
+
+# Metro-area bounding box (min_lat, max_lat, min_lon, max_lon); non-zero
+# coordinates outside it are counted as out of range
+CITY_BOUNDS = {
+    'Austin': (29.9, 30.8, -98.2, -97.3),
+    'Chicago': (41.6, 42.1, -88.0, -87.5),
+    'NYC': (40.4, 41.0, -74.3, -73.6),
+}
+
+# Speed limit column per city (mph)
+SPEED_COLUMNS = {'Austin': 'crash_speed_limit', 'Chicago': 'posted_speed_limit'}
+SPEED_RANGE = (0, 85)
+
+# Casualty counts above this on one crash are treated as bad values
+MAX_COUNT = 100
+
+# Count columns that are not casualty counts
+NOT_CASUALTIES = {'street_no'}
+
+# Decimal places of the coordinates in the crash event key (~11 m)
+EVENT_DECIMALS = 4
+
+# Highest acceptable share of rows per check before it is a failure
+DEFAULT_LIMITS = {
+    'duplicate_ids': 0.0,
+    'duplicate_events': 0.01,
+    'nat_dates': 0.01,
+    'out_of_range': 0.01,
+}
+
+
+def _sentinel_mask(values, fill):
+    """Rows holding a cleaner fill value; '' reads back from CSV as missing"""
+    mask = (values == fill).fillna(False).to_numpy(dtype=bool)
+    if fill == '':
+        mask = mask | values.isna().to_numpy()
+    return mask
+
+
+def _event_hashes(chunk):
+    """Hash of (date, time, rounded coordinates) for rows with a date and coordinates"""
+    lat = chunk['latitude'].to_numpy(dtype=float, na_value=np.nan)
+    lon = chunk['longitude'].to_numpy(dtype=float, na_value=np.nan)
+    usable = chunk['crash_date'].notna().to_numpy() & np.isfinite(lat) & np.isfinite(lon) & (lat != 0) & (lon != 0)
+    key = pd.DataFrame({
+        'date': chunk['crash_date'][usable].to_numpy(dtype='datetime64[ns]').view('int64'),
+        'time': chunk['crash_time'][usable].astype(str).to_numpy(dtype=object),
+        'lat': np.round(lat[usable], EVENT_DECIMALS),
+        'lon': np.round(lon[usable], EVENT_DECIMALS),
+    })
+    return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+
+def _duplicates(hashes):
+    return int(pd.Series(hashes).duplicated().sum()) if len(hashes) else 0
+
+
+def check_columns(city, schema):
+    """Cleaned columns validate_city reads for a city"""
+    columns = ['crash_date', 'crash_time', 'latitude', 'longitude']
+    if city in CITY_KEYS:
+        columns.append(CITY_KEYS[city]['id'])
+    if city in SPEED_COLUMNS:
+        columns.append(SPEED_COLUMNS[city])
+    columns += [col for col in schema['counts'] if col not in NOT_CASUALTIES]
+    columns += list(schema['fill'])
+    return list(dict.fromkeys(columns))
+
+
+def validate_city(city, path, schema, chunksize=500_000):
+    """Quality counts for one cleaned city file, read once in chunks
+    
+    Returns (summary dict, crash event hashes); the hashes let
+    validate_cities count duplicate events across cities.
+    """
+    id_column = CITY_KEYS[city]['id'] if city in CITY_KEYS else None
+    counts = [col for col in schema['counts'] if col not in NOT_CASUALTIES]
+    sentinels = {col: 0 for col, fill in schema['fill'].items() if not (fill == 0 and col in counts)}
+    out_of_range = {'coordinates': 0, 'future_dates': 0}
+    if city in SPEED_COLUMNS:
+        out_of_range['speed_limit'] = 0
+    if counts:
+        out_of_range['casualty_counts'] = 0
+    rows = nat = 0
+    id_hashes, event_hashes = [], []
+    today = pd.Timestamp(datetime.now().date())
+    
+    for chunk in iter_cleaned(path, check_columns(city, schema), chunksize=chunksize):
+        rows += len(chunk)
+        dates = pd.to_datetime(chunk['crash_date'], errors='coerce')
+        chunk['crash_date'] = dates
+        nat += int(dates.isna().sum())
+        out_of_range['future_dates'] += int((dates > today).sum())
+        
+        for col in sentinels:
+            sentinels[col] += int(_sentinel_mask(chunk[col], schema['fill'][col]).sum())
+        
+        lat = chunk['latitude'].to_numpy(dtype=float, na_value=np.nan)
+        lon = chunk['longitude'].to_numpy(dtype=float, na_value=np.nan)
+        located = np.isfinite(lat) & np.isfinite(lon) & (lat != 0) & (lon != 0)
+        if city in CITY_BOUNDS:
+            min_lat, max_lat, min_lon, max_lon = CITY_BOUNDS[city]
+            inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+            out_of_range['coordinates'] += int((located & ~inside).sum())
+        
+        if city in SPEED_COLUMNS:
+            speed = pd.to_numeric(chunk[SPEED_COLUMNS[city]], errors='coerce')
+            low, high = SPEED_RANGE
+            out_of_range['speed_limit'] += int(((speed < low) | (speed > high)).sum())
+        if counts:
+            values = chunk[counts].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            out_of_range['casualty_counts'] += int(((values < 0) | (values > MAX_COUNT)).any(axis=1).sum())
+        
+        if id_column:
+            id_hashes.append(pd.util.hash_array(chunk[id_column].astype(str).to_numpy(dtype=object)))
+        event_hashes.append(_event_hashes(chunk))
+    
+    events = np.concatenate(event_hashes) if event_hashes else np.array([], dtype=np.uint64)
+    summary = {
+        'file': path,
+        'rows': rows,
+        'duplicate_ids': _duplicates(np.concatenate(id_hashes)) if id_hashes else None,
+        'duplicate_events': _duplicates(events),
+        'nat_dates': nat,
+        'sentinels': sentinels,
+        'out_of_range': out_of_range,
+    }
+    return summary, events
+
+
+def find_failures(summary, limits=DEFAULT_LIMITS):
+    """Checks of a city summary whose share of rows is above its limit"""
+    rows = max(summary['rows'], 1)
+    checks = {
+        'duplicate_ids': summary['duplicate_ids'] or 0,
+        'duplicate_events': summary['duplicate_events'],
+        'nat_dates': summary['nat_dates'],
+    }
+    checks.update({f"out_of_range.{name}": count for name, count in summary['out_of_range'].items()})
+    failures = []
+    for name, count in checks.items():
+        limit = limits.get(name.split('.')[0], 0.0)
+        if count / rows > limit:
+            failures.append(f"{name}: {count:,} rows ({count / rows:.2%}) > {limit:.2%}")
+    return failures
+
+
+def validate_cities(files, schemas, limits=DEFAULT_LIMITS, chunksize=500_000, report=None):
+    """Validate several cleaned files and return the quality report dict
+    
+    files maps a city to its cleaned file (any handoff format); schemas
+    maps a city to its schema. With a RunReport each city is a stage.
+    """
+    start = time.perf_counter()
+    cities = {}
+    all_events = []
+    for city, path in files.items():
+        validate = report.wrap(validate_city, f"validate_{city.lower()}") if report else validate_city
+        summary, events = validate(city, path, schemas[city], chunksize)
+        if report:
+            report.stages[-1]['rows_out'] = summary['rows']
+        summary['failures'] = find_failures(summary, limits)
+        cities[city] = summary
+        all_events.append(events)
+    
+    within = sum(summary['duplicate_events'] for summary in cities.values())
+    combined = _duplicates(np.concatenate(all_events)) if all_events else 0
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'limits': dict(limits),
+        'cities': cities,
+        'cross_city_duplicate_events': combined - within,
+        'failures': [f"{city} {failure}" for city, summary in cities.items() for failure in summary['failures']],
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def write_quality_report(quality, path):
+    """Write the quality report as JSON and return the path"""
+    with open(path, 'w') as f:
+        json.dump(quality, f, indent=2)
+    return path
+
+
+def print_quality_report(quality):
+    print("\nData quality:")
+    print(f"  {'City':<8} {'Rows':>11} {'Dup ids':>8} {'Dup events':>11} {'NaT':>7} {'Out of range':>13}")
+    for city, summary in quality['cities'].items():
+        dup_ids = '-' if summary['duplicate_ids'] is None else f"{summary['duplicate_ids']:,}"
+        print(f"  {city:<8} {summary['rows']:>11,} {dup_ids:>8} {summary['duplicate_events']:>11,}"
+              f" {summary['nat_dates']:>7,} {sum(summary['out_of_range'].values()):>13,}")
+        top = sorted(summary['sentinels'].items(), key=lambda item: -item[1])[:3]
+        rows = max(summary['rows'], 1)
+        print("           sentinels: " + ", ".join(f"{col} {count / rows:.1%}" for col, count in top if count))
+    print(f"  Cross-city duplicate events: {quality['cross_city_duplicate_events']:,}")
+    if quality['failures']:
+        print("\n  ⚠ Failed checks:")
+        for failure in quality['failures']:
+            print(f"    {failure}")
+    else:
+        print("  ✓ All checks within limits")
+
+
+def run_validate(config, report=None):
+    """Validate the cleaned files of a pipeline config (collision_etl.config.load_config)
+    
+    Reads each city's cleaned file in the first handoff format, writes the
+    quality report to the 'quality' output and prints it. Raises ValueError
+    on failed checks when config['quality_strict'] is set.
+    """
+    print("\nValidating cleaned data...")
+    files = {city: handoff_path(cleaned, config['formats'][0]) for city, (_, cleaned) in city_paths(config).items()}
+    quality = validate_cities(files, config['schemas'], {**DEFAULT_LIMITS, **config['quality_limits']},
+                              config['chunksize'] or 500_000, report)
+    path = write_quality_report(quality, output_path(config, 'quality'))
+    print_quality_report(quality)
+    print(f"  ✓ Saved to: {path}")
+    
+    if quality['failures'] and config['quality_strict']:
+        raise ValueError(f"{len(quality['failures'])} data quality check(s) failed; see {path}")
+    return quality
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from collision_etl.config import FORMAT_CHOICES, load_config
+    
+    parser = argparse.ArgumentParser(description="Validate the cleaned city files and write a quality report")
+    parser.add_argument('--config', default=None, metavar='JSON', help="pipeline config file")
+    parser.add_argument('--data-dir', default=None,
+                        help="directory of the cleaned files (default: $COLLISION_DATA_DIR or Data/)")
+    parser.add_argument('--format', choices=sorted(FORMAT_CHOICES), default=None,
+                        help="cleaned file format to read (default: parquet)")
+    parser.add_argument('--strict', action='store_true', help="exit with an error when a check fails")
+    args = parser.parse_args()
+    
+    config = load_config(args.config, data_dir=args.data_dir, formats=FORMAT_CHOICES.get(args.format),
+                         quality_strict=args.strict or None)
+    try:
+        run_validate(config)
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        raise SystemExit(1)
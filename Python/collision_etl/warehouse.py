@@ -0,0 +1,228 @@
+"""
+Star-schema builder
+Splits the master dataset into the README's dimensions (Dim_Location,
+Dim_Date, Dim_Time, Dim_VehicleType, Dim_ContributingFactors,
+Dim_WeatherConditions) and a narrow integer Fct_Accident. Surrogate keys
+come from factorizing the natural key columns, so there is no per-row lookup.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.derived_fields import season_from_month, time_period_from_hour
+from collision_etl.factors import load_factor_lookup
+from collision_etl.intermediate import CleanedWriter
+
+# Key 0 in every dimension is the unknown member
+UNKNOWN_KEY = 0
+
+# Hours counted as rush hour in Dim_Time
+RUSH_HOURS = [7, 8, 9, 16, 17, 18]
+
+# Fact measures and the integer type each is stored as
+FACT_MEASURES = {
+    'total_injuries': np.int16, 'total_deaths': np.int16,
+    'pedestrian_injured': np.int16, 'pedestrian_killed': np.int16,
+    'cyclist_injured': np.int16, 'cyclist_killed': np.int16,
+    'motorist_injured': np.int16, 'motorist_killed': np.int16,
+    'has_fatality': np.int8, 'has_injury': np.int8,
+}
+
+
+def surrogate_keys(df, columns):
+    """Integer keys (1..n) for each distinct combination of columns
+    
+    Each column is factorized on its own and the codes are combined into one
+    int64, which is factorized again; rows with a missing value in any key
+    column get UNKNOWN_KEY. Returns (keys, first_rows) where first_rows holds
+    the position of the first row for each key, in key order.
+    """
+    combined = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    for col in columns:
+        codes, uniques = pd.factorize(df[col], sort=True)
+        missing |= codes < 0
+        combined = combined * (len(uniques) + 1) + codes + 1
+    
+    combined[missing] = -1
+    keys, _ = pd.factorize(combined, sort=True)
+    keys = keys + 1 - (combined < 0).any()
+    keys[missing] = UNKNOWN_KEY
+    
+    first_rows = pd.Series(np.arange(len(df))).groupby(keys).first()
+    first_rows = first_rows[first_rows.index != UNKNOWN_KEY]
+    return keys.astype(np.int32), first_rows.to_numpy()
+
+
+def _with_unknown(dim, key_name):
+    """Prepend the unknown member, keeping column order and dtypes
+    
+    Its integer attributes are -1, flags False, floats and dates missing and
+    text 'UNKNOWN' (or 'Unspecified' for factor descriptions).
+    """
+    row = {}
+    for col, dtype in dim.dtypes.items():
+        if col == key_name:
+            row[col] = UNKNOWN_KEY
+        elif pd.api.types.is_bool_dtype(dtype):
+            row[col] = False
+        elif pd.api.types.is_integer_dtype(dtype):
+            row[col] = -1
+        elif pd.api.types.is_float_dtype(dtype):
+            row[col] = np.nan
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            row[col] = pd.NaT
+        else:
+            row[col] = 'Unspecified' if col == 'description' else 'UNKNOWN'
+    unknown = pd.DataFrame([row], columns=dim.columns).astype(dim.dtypes.to_dict())
+    return pd.concat([unknown, dim], ignore_index=True)
+
+
+def _dimension(df, columns, key_name, first_rows, key_dtype=np.int32):
+    """Dimension rows for the first occurrence of each key, plus the unknown member"""
+    dim = df[columns].iloc[first_rows].reset_index(drop=True)
+    dim = dim.astype({col: object for col in columns if isinstance(dim[col].dtype, pd.CategoricalDtype)})
+    dim.insert(0, key_name, np.arange(1, len(dim) + 1, dtype=key_dtype))
+    return _with_unknown(dim, key_name)
+
+
+def build_location_dimension(master):
+    """Dim_Location on (city, street_name), with the median recorded coordinates"""
+    keys, first_rows = surrogate_keys(master, ['city', 'street_name'])
+    dim = _dimension(master, ['city', 'street_name'], 'location_key', first_rows)
+    
+    # (0, 0) is the cleaned fill value for a missing coordinate
+    located = (master['latitude'] != 0) & (master['longitude'] != 0)
+    coords = master.loc[located, ['latitude', 'longitude']].groupby(keys[located.to_numpy()]).median()
+    dim = dim.join(coords, on='location_key')
+    return keys, dim
+
+
+def build_date_dimension(master):
+    """Dim_Date on crash_date: year, quarter, month, season and weekday"""
+    keys, first_rows = surrogate_keys(master, ['crash_date'])
+    dates = pd.to_datetime(master['crash_date'].iloc[first_rows]).reset_index(drop=True)
+    dim = pd.DataFrame({
+        'date_key': np.arange(1, len(dates) + 1, dtype=np.int32),
+        'date': dates,
+        'year': dates.dt.year.astype(np.int16),
+        'quarter': dates.dt.quarter.astype(np.int8),
+        'month': dates.dt.month.astype(np.int8),
+        'month_name': dates.dt.month_name().astype(object),
+        'season': season_from_month(dates.dt.month).astype(object),
+        'weekday': dates.dt.day_name().astype(object),
+        'is_weekend': dates.dt.dayofweek >= 5,
+    })
+    return keys, _with_unknown(dim, 'date_key')
+
+
+def build_time_dimension(master):
+    """Dim_Time at hour grain: every hour of the day with its period and rush hour flag
+    
+    The key is hour + 1, so every load uses the same 24 keys.
+    """
+    hours = np.arange(24)
+    dim = pd.DataFrame({
+        'time_key': (hours + 1).astype(np.int16),
+        'hour': hours.astype(np.int8),
+        'time_period': time_period_from_hour(pd.Series(hours)).astype(object),
+        'is_rush_hour': np.isin(hours, RUSH_HOURS),
+    })
+    dim = _with_unknown(dim, 'time_key')
+    
+    hour = pd.to_numeric(master['crash_hour'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    keys = np.where(np.isfinite(hour), np.nan_to_num(hour) + 1, UNKNOWN_KEY).astype(np.int16)
+    return keys, dim
+
+
+def build_text_dimension(master, column, key_name, value_name, unknown_values=('UNKNOWN', 'Unspecified', '')):
+    """Dimension over one text column (vehicle type, weather); placeholders map to the unknown member"""
+    values = master[column].astype(object).where(~master[column].isin(unknown_values))
+    keys, first_rows = surrogate_keys(pd.DataFrame({value_name: values}), [value_name])
+    dim = _dimension(pd.DataFrame({value_name: values}), [value_name], key_name, first_rows, np.int16)
+    return keys.astype(np.int16), dim
+
+
+def build_factor_dimension(master, columns=('contributing_factor_1_code', 'contributing_factor_2_code')):
+    """Dim_ContributingFactors over the common factor codes, one key per code
+    
+    Covers every code in the factor files, so bridge rows built from any year
+    resolve through factor_code. Returns ({column: keys}, dim).
+    """
+    _, descriptions = load_factor_lookup()
+    dim = pd.DataFrame({
+        'factor_key': np.arange(1, len(descriptions) + 1, dtype=np.int16),
+        'factor_code': descriptions.index.astype(np.int16),
+        'description': descriptions.to_numpy(dtype=object),
+    })
+    dim = _with_unknown(dim, 'factor_key')
+    
+    key_by_code = pd.Series(dim['factor_key'].to_numpy(), index=dim['factor_code'].to_numpy())
+    keys = {}
+    for col in columns:
+        codes = master[col].astype('Int16').fillna(-1).to_numpy(dtype=np.int16)
+        keys[col] = key_by_code.reindex(codes).fillna(UNKNOWN_KEY).to_numpy(dtype=np.int16)
+    return keys, dim
+
+
+def build_star_schema(master, vehicle_types=None):
+    """Dimension tables and Fct_Accident for a master frame (after add_calculated_fields)
+    
+    vehicle_types holds each row's vehicle type for Dim_VehicleType (all
+    unknown when not given). Returns a dict of table name -> DataFrame. Fct_Accident holds only
+    integer keys and measures; Map_Accident resolves accident_key back to
+    (city, accident_id) for the bridge table.
+    """
+    location_keys, dim_location = build_location_dimension(master)
+    date_keys, dim_date = build_date_dimension(master)
+    time_keys, dim_time = build_time_dimension(master)
+    if vehicle_types is None:
+        vehicle_types = pd.Series('UNKNOWN', index=master.index)
+    vehicle_keys, dim_vehicle = build_text_dimension(pd.DataFrame({'vehicle_type': vehicle_types}), 'vehicle_type',
+                                                     'vehicle_type_key', 'vehicle_type')
+    weather_keys, dim_weather = build_text_dimension(master, 'weather_condition', 'weather_key', 'weather_condition')
+    factor_keys, dim_factor = build_factor_dimension(master)
+    
+    accident_keys = np.arange(1, len(master) + 1, dtype=np.int32)
+    fact = pd.DataFrame({
+        'accident_key': accident_keys,
+        'location_key': location_keys,
+        'date_key': date_keys,
+        'time_key': time_keys,
+        'vehicle_type_key': vehicle_keys,
+        'weather_key': weather_keys,
+        'factor_1_key': factor_keys['contributing_factor_1_code'],
+        'factor_2_key': factor_keys['contributing_factor_2_code'],
+    })
+    for col, dtype in FACT_MEASURES.items():
+        fact[col] = master[col].to_numpy().astype(dtype)
+    
+    accident_map = pd.DataFrame({
+        'accident_key': accident_keys,
+        'city': master['city'].to_numpy(dtype=object),
+        'accident_id': master['accident_id'].astype(str).to_numpy(dtype=object),
+    })
+    
+    return {
+        'Dim_Location': dim_location,
+        'Dim_Date': dim_date,
+        'Dim_Time': dim_time,
+        'Dim_VehicleType': dim_vehicle,
+        'Dim_ContributingFactors': dim_factor,
+        'Dim_WeatherConditions': dim_weather,
+        'Fct_Accident': fact,
+        'Map_Accident': accident_map,
+    }
+
+
+def write_star_schema(tables, directory, formats=('csv',)):
+    """Write each table to <directory>/<name>.<format>; returns {name: bytes written}"""
+    os.makedirs(directory, exist_ok=True)
+    sizes = {}
+    for name, table in tables.items():
+        with CleanedWriter(os.path.join(directory, name + '.csv'), formats) as writer:
+            writer.write(table)
+        sizes[name] = sum(os.path.getsize(path) for path in writer.paths.values())
+    return sizes
@@ -0,0 +1,84 @@
+"""Vectorized derived fields against the original per-row lambdas"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from collision_etl.datetimes import hour_from_time
+from collision_etl.derived_fields import (SEASONS, TIME_PERIODS, _legacy_flag, _legacy_season,
+                                          _legacy_time_period, flag_from_yn, season_from_month,
+                                          time_period_from_hour, verify_against_legacy)
+
+
+def assert_matches_legacy(actual, expected):
+    pd.testing.assert_series_equal(actual.astype(object), expected.astype(object), check_names=False)
+
+
+def test_season_boundaries_match_legacy():
+    month = pd.Series([1, 2, 3, 5, 6, 8, 9, 11, 12], dtype=float)
+    assert season_from_month(month).tolist() == ['Winter', 'Winter', 'Spring', 'Spring', 'Summer', 'Summer',
+                                                 'Fall', 'Fall', 'Winter']
+    assert_matches_legacy(season_from_month(month), _legacy_season(month))
+
+
+@pytest.mark.parametrize('month', [np.nan, 0, 13, -1, 2.5])
+def test_missing_or_invalid_month_is_fall_like_legacy(month):
+    values = pd.Series([month], dtype=float)
+    assert season_from_month(values).tolist() == ['Fall']
+    assert_matches_legacy(season_from_month(values), _legacy_season(values))
+
+
+def test_time_period_boundaries_match_legacy():
+    hour = pd.Series([0, 5, 5.99, 6, 11, 11.99, 12, 16, 16.99, 17, 20, 20.99, 21, 23])
+    assert time_period_from_hour(hour).tolist() == [
+        'Early Morning', 'Early Morning', 'Early Morning', 'Morning', 'Morning', 'Morning',
+        'Afternoon', 'Afternoon', 'Afternoon', 'Evening', 'Evening', 'Evening', 'Night', 'Night']
+    assert_matches_legacy(time_period_from_hour(hour), _legacy_time_period(hour))
+
+
+@pytest.mark.parametrize('hour', [np.nan, -1, 24, 99])
+def test_nan_or_out_of_range_hour_is_night_like_legacy(hour):
+    values = pd.Series([hour], dtype=float)
+    assert time_period_from_hour(values).tolist() == ['Night']
+    assert_matches_legacy(time_period_from_hour(values), _legacy_time_period(values))
+
+
+def test_fields_are_categorical_in_fixed_order():
+    assert list(season_from_month(pd.Series([1.0])).cat.categories) == SEASONS
+    assert list(time_period_from_hour(pd.Series([1.0])).cat.categories) == TIME_PERIODS
+
+
+def test_index_is_kept():
+    month = pd.Series([12.0, 6.0], index=[10, 20])
+    assert list(season_from_month(month).index) == [10, 20]
+    assert list(time_period_from_hour(month).index) == [10, 20]
+
+
+def test_hh_mm_ss_hours_match_legacy_parse():
+    times = pd.Series(['00:00:00', '05:59:59', '06:00:00', '12:30:00', '23:59:59', '24:00:00', 'bad', None])
+    legacy = pd.to_datetime(times, format='%H:%M:%S', errors='coerce').dt.hour
+    pd.testing.assert_series_equal(hour_from_time(times), legacy.astype(float), check_names=False)
+
+
+def test_hh_mm_times_give_their_hour():
+    # The legacy '%H:%M:%S' parse turned these into NaN (and so 'Night')
+    times = pd.Series(['7:05', '07:05', '16:59', '17:00', '0:00'])
+    assert hour_from_time(times).tolist() == [7.0, 7.0, 16.0, 17.0, 0.0]
+    assert time_period_from_hour(hour_from_time(times)).tolist() == [
+        'Morning', 'Morning', 'Afternoon', 'Evening', 'Early Morning']
+
+
+@pytest.mark.parametrize('time', ['', '25:00', '12:60', '9:5', 'noon', None, np.nan])
+def test_invalid_times_give_nan_hour(time):
+    assert hour_from_time(pd.Series([time], dtype=object)).isna().all()
+
+
+def test_flags_match_legacy():
+    values = pd.Series(['Y', 'N', None, 'y', '', np.nan, 'Y'], dtype=object)
+    assert flag_from_yn(values).tolist() == [True, False, False, False, False, False, True]
+    assert_matches_legacy(flag_from_yn(values), _legacy_flag(values))
+
+
+def test_random_inputs_match_legacy():
+    results = verify_against_legacy(rows=20_000, seed=1)
+    assert list(results['field']) == ['season', 'time_period', 'flag']
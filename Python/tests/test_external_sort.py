@@ -0,0 +1,55 @@
+"""ExternalSorter against the in-memory sort it replaces"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from collision_etl.external_sort import ExternalSorter
+
+pytest.importorskip('pyarrow')
+
+BY = ['crash_date', 'city']
+
+
+def collisions(rows=60_000, seed=0):
+    """Master-like frame with many rows per (crash_date, city) key"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2022-01-01', periods=90, freq='D')
+    df = pd.DataFrame({
+        'crash_date': dates[rng.integers(0, len(dates), rows)],
+        'city': rng.choice(['Austin', 'Chicago', 'NYC'], rows),
+        'crash_id': np.arange(rows),
+        'street': rng.choice(['MAIN ST', 'BROADWAY', 'LAKE SHORE DR', 'CONGRESS AVE'], rows),
+    })
+    df.loc[rng.random(rows) < 0.01, 'crash_date'] = pd.NaT
+    return df
+
+
+def external_sort(df, memory_mb, chunk_rows=5_000, block_rows=None):
+    with ExternalSorter(BY, memory_mb) as sorter:
+        for start in range(0, len(df), chunk_rows):
+            sorter.add(df.iloc[start:start + chunk_rows])
+        blocks = list(sorter.merged(block_rows))
+        return pd.concat(blocks, ignore_index=True), len(sorter.runs)
+
+
+@pytest.mark.parametrize('memory_mb,block_rows', [(1, None), (1, 2_000), (2, 7_000)])
+def test_multi_run_matches_in_memory_sort(memory_mb, block_rows):
+    df = collisions()
+    result, runs = external_sort(df, memory_mb, block_rows=block_rows)
+    assert runs > 1
+    expected = df.sort_values(BY, kind='mergesort').reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_single_run_matches_in_memory_sort():
+    df = collisions(rows=5_000)
+    result, runs = external_sort(df, memory_mb=1_000)
+    assert runs == 1
+    pd.testing.assert_frame_equal(result, df.sort_values(BY, kind='mergesort').reset_index(drop=True))
+
+
+def test_empty_input_yields_nothing():
+    with ExternalSorter(BY, memory_mb=1) as sorter:
+        sorter.add(collisions(rows=0))
+        assert list(sorter.merged()) == []
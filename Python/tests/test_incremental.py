@@ -0,0 +1,38 @@
+"""Row fingerprints of the incremental refresh"""
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.incremental import DeltaTracker, row_hashes
+
+
+def test_row_hashes_ignore_inferred_dtypes():
+    # The same raw rows as read_csv infers them with and without a blank in the chunk
+    as_int = pd.DataFrame({'id': [1, 2], 'injured': [0, 3], 'street': ['MAIN ST', 'BROADWAY']})
+    as_float = pd.DataFrame({'id': [1, 2], 'injured': [0.0, 3.0], 'street': ['MAIN ST', 'BROADWAY']})
+    as_text = pd.DataFrame({'id': ['1', '2'], 'injured': ['0', ' 3'], 'street': ['MAIN ST', 'BROADWAY']})
+    assert (row_hashes(as_int) == row_hashes(as_float)).all()
+    assert (row_hashes(as_int) == row_hashes(as_text)).all()
+
+
+def test_row_hashes_see_changed_and_missing_values():
+    base = pd.DataFrame({'id': [1, 2, 3], 'injured': [0.0, 3.0, 1.5]})
+    changed = pd.DataFrame({'id': [1, 2, 3], 'injured': [0.0, np.nan, 2.5]})
+    assert (row_hashes(base) != row_hashes(changed)).tolist() == [False, True, True]
+
+
+def test_tracker_selects_new_and_changed_rows(tmp_path):
+    state_file = str(tmp_path / 'pipeline_state.json')
+    state = {'cities': {}, 'master': {}}
+    first = pd.DataFrame({'COLLISION_ID': [1, 2, 3], 'injured': [0, 1, 2]})
+    tracker = DeltaTracker('NYC', state_file)
+    assert len(tracker(first)) == 3
+    tracker.commit(state)
+    
+    # Same rows re-read as floats, one changed, one new
+    second = pd.DataFrame({'COLLISION_ID': [1.0, 2.0, 3.0, 4.0], 'injured': [0.0, 5.0, 2.0, np.nan]})
+    tracker = DeltaTracker('NYC', state_file)
+    assert tracker(second)['COLLISION_ID'].tolist() == [2.0, 4.0]
+    assert (tracker.new_rows, tracker.changed_rows) == (1, 1)
+    tracker.commit(state)
+    assert state['cities']['NYC']['raw_rows'] == 4
@@ -0,0 +1,47 @@
+"""Bulk loads store the same rows whichever engine takes them"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from collision_etl.loader import ConnectionPool, bulk_load
+
+
+def frame():
+    return pd.DataFrame({
+        'accident_key': np.arange(1, 6, dtype=np.int32),
+        'latitude': [30.2, np.nan, 41.8, 40.7, np.nan],
+        'crash_date': pd.to_datetime(['2023-01-02', None, '2023-03-04', '2024-05-06', '2024-07-08']),
+        'has_fatality': [True, False, False, True, False],
+        'street_name': pd.Categorical(['MAIN ST', None, 'BROADWAY', 'MAIN ST', 'IH 35']),
+        'total_injuries': pd.array([1, None, 0, 2, 3], dtype='Int16'),
+    })
+
+
+EXPECTED = [
+    (1, 30.2, '2023-01-02', 1, 'MAIN ST', 1),
+    (2, None, None, 0, None, None),
+    (3, 41.8, '2023-03-04', 0, 'BROADWAY', 0),
+    (4, 40.7, '2024-05-06', 1, 'MAIN ST', 2),
+    (5, None, '2024-07-08', 0, 'IH 35', 3),
+]
+
+
+def load_rows(database, engine, batch_size):
+    with ConnectionPool(database, engine, size=1) as pool:
+        loaded, _ = bulk_load(frame(), 'Fct_Accident', pool, batch_size)
+        with pool.connection() as conn:
+            rows = conn.execute('SELECT * FROM "Fct_Accident" ORDER BY accident_key').fetchall()
+    return loaded, [tuple(row) for row in rows]
+
+
+@pytest.mark.parametrize('batch_size', [2, 50_000])
+def test_sqlite_load(tmp_path, batch_size):
+    assert load_rows(str(tmp_path / 'warehouse.db'), 'sqlite', batch_size) == (5, EXPECTED)
+
+
+@pytest.mark.parametrize('batch_size', [2, 50_000])
+def test_duckdb_native_load_matches_sqlite(tmp_path, batch_size):
+    pytest.importorskip('duckdb')
+    pytest.importorskip('pyarrow')
+    assert load_rows(str(tmp_path / 'warehouse.duckdb'), 'duckdb', batch_size) == (5, EXPECTED)
@@ -0,0 +1,35 @@
+"""Rollups keep every crash, including rows with missing dimensions"""
+
+import numpy as np
+import pandas as pd
+
+from collision_etl.rollups import MEASURES, build_rollups
+
+
+def master_frame():
+    return pd.DataFrame({
+        'city': ['Austin', 'Austin', 'Chicago', 'NewYork', 'NewYork'],
+        'year': [2023, np.nan, 2023, 2024, 2024],
+        'month': [1, np.nan, 2, np.nan, 3],
+        'time_period': pd.Categorical(['Morning', 'Night', 'Night', 'Evening', 'Evening']),
+        'season': pd.Categorical(['Winter', 'Fall', 'Winter', 'Fall', 'Spring']),
+        'contributing_factor_1': ['SPEEDING', 'UNKNOWN', np.nan, 'UNKNOWN', 'SPEEDING'],
+        'has_fatality': [True, False, False, True, False],
+        'total_injuries': [1, 2, 0, 3, 1],
+        'total_deaths': [1, 0, 0, 1, 0],
+        'total_casualties': [2, 2, 0, 4, 1],
+    })
+
+
+def test_every_rollup_covers_every_crash():
+    master = master_frame()
+    expected = {'crashes': len(master), 'fatal_crashes': 2, 'total_injuries': 7, 'total_deaths': 2,
+                'total_casualties': 9}
+    for name, table in build_rollups(master).items():
+        assert table[MEASURES].sum().to_dict() == expected, name
+
+
+def test_missing_year_and_month_form_their_own_group():
+    months = build_rollups(master_frame())['Rollup_City_Year_Month']
+    missing = months[months['year'].isna() | months['month'].isna()]
+    assert sorted(zip(missing['city'], missing['crashes'])) == [('Austin', 1), ('NewYork', 1)]